@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Copies the local PicklePersistence file into the SQLite persistence
+Usage: python -m app.scripts.convert_persistence
+"""
+
+from ..telefix.core.persistence import SqlitePersistence
+
+pickle_path = "/Users/osuz/PycharmProjects/YaServiceRu/app/persistence/local.pkl"
+sqlite_path = "/Users/osuz/PycharmProjects/YaServiceRu/app/persistence/local.sqlite"
+
+
+if __name__ == "__main__":
+    SqlitePersistence(sqlite_path).import_pickle(pickle_path)
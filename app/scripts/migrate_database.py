@@ -0,0 +1,19 @@
+"""
+Migrates the local database schema to the latest version
+Usage: python -m app.scripts.migrate_database
+"""
+
+from ..telefix.database import migrations
+
+
+def migrate_database():
+    migrations.main(
+        [
+            "--app_config_path",
+            "/Users/osuz/PycharmProjects/YaServiceRu/app/config/local",
+        ]
+    )
+
+
+if __name__ == "__main__":
+    migrate_database()
@@ -1,3 +1,5 @@
+# Imported first, the startup timeline starts with the package imports
+from .common.startup import STARTUP_TIMELINE
 from .core import *
 from .daemons import *
 from .common import *
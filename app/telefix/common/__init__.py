@@ -1,4 +1,22 @@
+from .startup import STARTUP_TIMELINE, StartupTimeline
 from .yaml_loader import YamlLoader
-from .types import TgHandlerPriority, StdModuleType, TgModuleType
+from .types import (
+    MessageKind,
+    RestartMode,
+    TgHandlerPriority,
+    StdModuleType,
+    TgModuleType,
+    UpdateKind,
+)
 
-__all__ = ["YamlLoader", "TgHandlerPriority", "StdModuleType", "TgModuleType"]
+__all__ = [
+    "STARTUP_TIMELINE",
+    "StartupTimeline",
+    "YamlLoader",
+    "MessageKind",
+    "RestartMode",
+    "TgHandlerPriority",
+    "StdModuleType",
+    "TgModuleType",
+    "UpdateKind",
+]
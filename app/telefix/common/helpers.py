@@ -1,12 +1,13 @@
 import datetime
+import functools
 from loguru import logger
 from typing import Tuple
 
 from telegram import Update
 from telegram.ext import ContextTypes
-import tiktoken
 
 from ..database import utils as tgdb
+from ..database.contractors import ContractorRegistry
 
 
 def get_timestamp_str(dt=None) -> str:
@@ -26,11 +27,10 @@ async def exists_order_id(
     return True, order
 
 
-def clearance_contractor(user_id: int, db_auth: dict) -> bool:
+def clearance_contractor(user_id: int, contractor_registry: ContractorRegistry) -> bool:
     """Verify if the user sending the user is a Contractor and has clearance"""
     logger.info(" ")
-    all_contractor_id = tgdb.get_all_contractor_id(db_auth)
-    return user_id in all_contractor_id
+    return user_id in contractor_registry
 
 
 def clearance_center(user_id: int, tg_id_dev) -> bool:
@@ -42,5 +42,12 @@ def clearance_center(user_id: int, tg_id_dev) -> bool:
 def num_tokens_from_string(string: str, model_name: str) -> int:
     """Returns the number of tokens in a text string."""
     logger.info(" ")
-    encoding = tiktoken.encoding_for_model(model_name)
-    return len(encoding.encode(string))
+    return len(_get_encoding(model_name).encode(string))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    # Imported on first use, tiktoken is only needed once the chat is used
+    import tiktoken
+
+    return tiktoken.encoding_for_model(model_name)
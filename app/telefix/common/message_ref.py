@@ -0,0 +1,82 @@
+from itertools import groupby
+from typing import Iterable, Union
+
+from loguru import logger
+
+from telegram import Bot, Message
+from telegram.error import BadRequest
+
+from .types import MessageKind
+
+# Telegram deletes at most 100 messages per deleteMessages call
+_DELETE_BATCH_SIZE = 100
+
+
+class MessageRef:
+    """
+    Reference to a message sent by the bot, to be deleted later on.
+
+    Kept in `user_data` instead of the `telegram.Message` itself, whose whole object graph (chat,
+    sender, entities, markup...) would otherwise be pickled into the persistence with it.
+
+    Attributes:
+        chat_id (int): The chat of the message.
+        message_id (int): The message id within the chat.
+        kind (MessageKind): What the message is.
+
+    Methods:
+        from_message(message, kind): Reference to a sent message.
+    """
+
+    __slots__ = ("chat_id", "message_id", "kind")
+
+    def __init__(self, chat_id: int, message_id: int, kind: MessageKind = MessageKind.TEXT):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.kind = kind
+
+    @classmethod
+    def from_message(cls, message: Message, kind: MessageKind = MessageKind.TEXT) -> "MessageRef":
+        return cls(message.chat_id, message.message_id, kind)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MessageRef):
+            return NotImplemented
+        return (self.chat_id, self.message_id) == (other.chat_id, other.message_id)
+
+    def __hash__(self) -> int:
+        return hash((self.chat_id, self.message_id))
+
+    def __repr__(self) -> str:
+        return f"MessageRef({self.chat_id}, {self.message_id}, {self.kind!r})"
+
+
+async def delete_messages(
+    bot: Bot, messages: Iterable[Union[MessageRef, Message]]
+) -> None:
+    """
+    Deletes the referenced messages, in as few Bot API calls as possible.
+
+    `telegram.Message` objects are accepted too, as found in the data persisted before the
+    references were introduced. Messages already deleted or too old to be deleted are ignored.
+
+    Parameters:
+    - bot : Bot : The bot which sent the messages.
+    - messages : Iterable[Union[MessageRef, Message]] : The messages to delete.
+    """
+    refs = sorted(
+        (
+            MessageRef.from_message(message) if isinstance(message, Message) else message
+            for message in messages
+        ),
+        key=lambda ref: ref.chat_id,
+    )
+    for chat_id, chat_refs in groupby(refs, key=lambda ref: ref.chat_id):
+        message_ids = list(dict.fromkeys(ref.message_id for ref in chat_refs))
+        for i in range(0, len(message_ids), _DELETE_BATCH_SIZE):
+            try:
+                await bot.delete_messages(
+                    chat_id, message_ids[i : i + _DELETE_BATCH_SIZE]
+                )
+            except BadRequest as e:
+                logger.warning(f"Could not delete messages in chat {chat_id}: {e}")
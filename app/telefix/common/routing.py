@@ -0,0 +1,103 @@
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from telegram import Message, Update
+from telegram.ext import BaseHandler, filters
+
+Callback = Callable[[Update, Any], Awaitable[Any]]
+
+
+class CommandFilter(filters.MessageFilter):
+    """
+    Messages starting with one of the given commands, e.g. "/wiki", "/wiki@bot" or "/restart hard".
+
+    The command is looked up in a set, the cost of the filter thus does not grow with the number
+    of commands, unlike an alternation regex.
+
+    Attributes:
+        commands (frozenset): The command names, without the leading slash.
+    """
+
+    __slots__ = ("commands",)
+
+    def __init__(self, commands: Iterable[str]):
+        self.commands = frozenset(command.lower() for command in commands)
+        super().__init__(name=f"CommandFilter({sorted(self.commands)})")
+
+    def filter(self, message: Message) -> bool:
+        if not message.text or not message.text.startswith("/"):
+            return False
+        command = message.text[1:].split(maxsplit=1)[0] if len(message.text) > 1 else ""
+        return command.split("@", 1)[0].lower() in self.commands
+
+
+def text_filter(texts: Iterable[str]) -> filters.Text:
+    """
+    Messages whose whole text is one of the given texts (e.g. the reply keyboard buttons).
+
+    Parameters:
+    - texts : Iterable[str] : The texts matched exactly.
+
+    Returns:
+    - filters.Text : The filter, looking the text up in a set rather than matching a regex.
+    """
+    return filters.Text(frozenset(texts))
+
+
+class CallbackQueryRouter(BaseHandler[Update, Any, Any]):
+    """
+    Dispatches callback queries to their callback by the exact `callback_data`, through a dict.
+
+    Replaces one `CallbackQueryHandler` per callback_data, whose patterns are tried one after the
+    other on every callback query: the cost of the routing thus no longer grows with the number of
+    routes (e.g. the wiki pages). Regex patterns can still be added, they are only tried when no
+    exact route matches, in the order they were added.
+
+    Works within a `ConversationHandler`, returning the callback's result as the new state.
+
+    Attributes:
+        routes (Dict[str, Callback]): The callbacks by exact callback_data.
+        patterns (List[Tuple[Pattern, Callback]]): The fallback callbacks by regex.
+
+    Methods:
+        add(data, callback): Routes the callback_data to the callback.
+        add_pattern(pattern, callback): Routes the callback_data matching the regex to the callback.
+    """
+
+    __slots__ = ("routes", "patterns")
+
+    def __init__(self, block: bool = True):
+        super().__init__(self._dispatch, block=block)
+        self.routes: Dict[str, Callback] = {}
+        self.patterns: List[Tuple[Pattern, Callback]] = []
+
+    def add(self, data: str, callback: Callback) -> None:
+        # The first route added wins, as the first matching CallbackQueryHandler did
+        self.routes.setdefault(data, callback)
+
+    def add_pattern(self, pattern: str, callback: Callback) -> None:
+        self.patterns.append((re.compile(pattern), callback))
+
+    def check_update(self, update: object) -> Optional[Callback]:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        callback = self.routes.get(data)
+        if callback is not None:
+            return callback
+        for pattern, callback in self.patterns:
+            if pattern.match(data):
+                return callback
+        return None
+
+    async def handle_update(
+        self, update: Update, application: Any, check_result: Callback, context: Any
+    ) -> Any:
+        self.collect_additional_context(context, update, application, check_result)
+        return await check_result(update, context)
+
+    async def _dispatch(self, update: Update, context: Any) -> None:
+        # Only there for BaseHandler, handle_update calls the routed callback directly
+        pass
@@ -0,0 +1,41 @@
+import time
+from typing import List, Tuple
+
+from loguru import logger
+
+
+class StartupTimeline:
+    """
+    Records how long each step of the startup took, from the import of the package.
+
+    Attributes:
+        started (float): `time.monotonic()` at the creation of the timeline.
+        marks (List[Tuple[str, float]]): The steps, with their seconds since the start.
+
+    Methods:
+        mark(step): Records that a step just completed.
+        report(): Logs the steps with their duration.
+        reset(): Starts a new timeline, e.g. for a soft restart.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, step: str) -> None:
+        self.marks.append((step, time.monotonic() - self.started))
+
+    def report(self) -> None:
+        lines = []
+        previous = 0.0
+        for step, elapsed in self.marks:
+            lines.append(f"{elapsed:8.3f}s (+{elapsed - previous:.3f}s) {step}")
+            previous = elapsed
+        logger.info("Startup timeline:\n" + "\n".join(lines))
+
+
+# Created by the first import of the package, see telefix/__init__.py
+STARTUP_TIMELINE = StartupTimeline()
@@ -2,6 +2,7 @@ from enum import Enum
 from types import SimpleNamespace
 
 TgHandlerPriority = SimpleNamespace(
+    ACTIVITY_TRACKING=-4,
     DB_MESSAGE_COLLECTION=-3,
     RESTART=-2,
     PROMPT_VALIDATION=-1,
@@ -13,6 +14,9 @@ TgHandlerPriority = SimpleNamespace(
     GLOBAL_FALLBACK=5,
 )
 
+# Value of bot_data["restart"] once the application stopped
+RestartMode = SimpleNamespace(NONE=None, SOFT="soft", HARD="hard")
+
 
 class TgModuleType(Enum):
     GLOBAL_FALLBACK = 0
@@ -24,7 +28,25 @@ class TgModuleType(Enum):
     DATABASE = 6
     ERROR_LOGGING = 7
     CHATBOT = 8
+    MAINTENANCE = 9
 
 
 class StdModuleType(Enum):
     VECTOR_DATABASE = 0
+    DATABASE = 1
+    ORDER_REPOSITORY = 2
+    SCHEMA_MIGRATOR = 3
+    CONTRACTOR_REGISTRY = 4
+
+
+# Kinds of update a stored text comes from, part of the messages' key
+class UpdateKind(str, Enum):
+    MESSAGE = "message"
+    CALLBACK_QUERY = "callback_query"
+
+
+# Kinds of message referenced in `user_data` to be deleted later on
+class MessageKind(str, Enum):
+    TEXT = "text"
+    PHOTO = "photo"
+    PROMPT = "prompt"
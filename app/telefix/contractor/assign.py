@@ -1,3 +1,5 @@
+from functools import partial
+
 from loguru import logger
 
 from telegram import (
@@ -17,6 +19,8 @@ from telegram.ext import (
 
 from telefix.common import helpers
 from telefix.database import utils as tldb
+from telefix.database.contractors import ContractorRegistry
+from telefix.database.orders import OrderRepository, ReassignOutcome
 
 constants = ConfigParser()
 constants.read("constants.ini")
@@ -262,7 +266,11 @@ async def assign_to_contractor(
         return ConversationHandler.END
 
 
-async def assignment_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def assignment_answer(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    order_repository: OrderRepository,
+) -> None:
     """STUFF"""
     logger_assign.info("assignment_answer()")
     logger_assign.info(f"context.bot_data: {context.bot_data}")
@@ -275,19 +283,25 @@ async def assignment_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
     new_Contractor_username = tldb.get_contractor_data(new_ContractorID)[1]
 
     if answer:
-        # Change the ContractID for the Order
-        tldb.update_order_ContractorID(OrderID, new_ContractorID)
-        # Keep a record of this transaction
-        tldb.insert_assign(old_ContractorID, OrderID, new_ContractorID)
-
-        # Notify both contractors of successful assignment
-        await update.effective_message.reply_text(
-            "Order successfully assigned to you ✅"
-        )
-        await context.bot.sendMessage(
-            old_ContractorID,
-            f"Order successfully assigned to {new_Contractor_username} ✅",
+        # Change the ContractID for the Order and keep a record of this transaction, atomically
+        outcome = await order_repository.reassign_order(
+            OrderID, old_ContractorID, new_ContractorID
         )
+        if outcome == ReassignOutcome.ASSIGNED:
+            # Notify both contractors of successful assignment
+            await update.effective_message.reply_text(
+                "Order successfully assigned to you ✅"
+            )
+            await context.bot.sendMessage(
+                old_ContractorID,
+                f"Order successfully assigned to {new_Contractor_username} ✅",
+            )
+        elif outcome == ReassignOutcome.ALREADY_ASSIGNED:
+            await update.effective_message.reply_text("Order already assigned to you")
+        else:
+            await update.effective_message.reply_text(
+                "Order no longer available for assignment ❌"
+            )
     else:
         context.bot_data["Current Order"] = ""
         del context.bot_data["assignment_" + str(update.effective_user.id)]
@@ -329,8 +343,12 @@ assign_conversation_handler = ConversationHandler(
     conversation_timeout=15,
 )
 
-assignment_response_handler = MessageHandler(
-    filters.User(user_id=tldb.get_all_contractor_id())
-    & (filters.Regex(r"^(✅)$") | filters.Regex(r"^(❌)$")),
-    assignment_answer,
-)
+def get_assignment_response_handler(
+    contractor_registry: ContractorRegistry, order_repository: OrderRepository
+) -> MessageHandler:
+    """The registry's filter follows the contractors table, no restart needed to add a contractor"""
+    return MessageHandler(
+        contractor_registry.filter
+        & (filters.Regex(r"^(✅)$") | filters.Regex(r"^(❌)$")),
+        partial(assignment_answer, order_repository=order_repository),
+    )
@@ -1,22 +1,29 @@
+from functools import partial
+
 from loguru import logger
 
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 
 from telefix.common import helpers
+from telefix.database.contractors import ContractorRegistry
 
 constants = ConfigParser()
 constants.read("constants.ini")
 
 
-async def commands(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def commands(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    contractor_registry: ContractorRegistry,
+) -> None:
     """Sends a message with all the available user for a Contractor"""
     logger_assign.info("user()")
     user_id = update.effective_user.id
 
-    if not helpers.clearance_contractor(user_id) or not helpers.clearance_center(
-        user_id
-    ):
+    if not helpers.clearance_contractor(
+        user_id, contractor_registry
+    ) or not helpers.clearance_center(user_id):
         await update.effective_message.reply_text("You cannot use this user")
         return
 
@@ -31,4 +38,7 @@ async def commands(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.effective_message.reply_text(text)
 
 
-commands_handler = CommandHandler("user", commands)
+def get_commands_handler(contractor_registry: ContractorRegistry) -> CommandHandler:
+    return CommandHandler(
+        "user", partial(commands, contractor_registry=contractor_registry)
+    )
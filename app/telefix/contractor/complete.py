@@ -1,3 +1,5 @@
+from functools import partial
+
 from loguru import logger
 
 from telegram import Update
@@ -5,12 +7,17 @@ from telegram.ext import ContextTypes, CommandHandler
 
 from telefix.common import helpers
 from telefix.database import utils as tldb
+from telefix.database.contractors import ContractorRegistry
 
 constants = ConfigParser()
 constants.read("constants.ini")
 
 
-async def complete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def complete(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    contractor_registry: ContractorRegistry,
+) -> None:
     """Marks and Order as Completed with a timestamp.
     Can only be used by CenterID or ContractorID assigned the Order"""
     logger_assign.info("complete()")
@@ -18,7 +25,7 @@ async def complete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     CenterID = constants.get("ID", "OLEG_RU")
 
-    if not helpers.clearance_contractor(user_id):
+    if not helpers.clearance_contractor(user_id, contractor_registry):
         await update.effective_message.reply_text("You cannot use this user")
         return
 
@@ -32,4 +39,7 @@ async def complete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.effective_message.reply_text("Not your Order")
 
 
-complete_handler = CommandHandler("complete", complete)
+def get_complete_handler(contractor_registry: ContractorRegistry) -> CommandHandler:
+    return CommandHandler(
+        "complete", partial(complete, contractor_registry=contractor_registry)
+    )
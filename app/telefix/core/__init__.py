@@ -1,5 +1,14 @@
 from .bot_config_manager import load_config, AppConfig
 from .bot_launcher import BotLauncher
 from .module_manager import ModuleManager
+from .persistence import SqlitePersistence
+from .update_processor import UserOrderedUpdateProcessor
 
-__all__ = ["load_config", "AppConfig", "BotLauncher", "ModuleManager"]
+__all__ = [
+    "load_config",
+    "AppConfig",
+    "BotLauncher",
+    "ModuleManager",
+    "SqlitePersistence",
+    "UserOrderedUpdateProcessor",
+]
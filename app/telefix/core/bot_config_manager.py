@@ -8,7 +8,7 @@ from loguru import logger
 
 from pydantic import ValidationError
 
-from .config_template import AppConfig
+from .config_template import AppConfig, DatabaseConfig
 from ..common.yaml_loader import YamlLoader
 
 load_dotenv()
@@ -55,6 +55,24 @@ def load_config(**kwargs) -> AppConfig:
         sys.exit(1)
 
 
+def load_database_config(file_path) -> DatabaseConfig:
+    """
+    Loads only the database configuration file, for the tools that do not run the bot
+    (e.g. the schema migrations).
+
+    Parameters:
+    - file_path : The path to the database YAML configuration file.
+    """
+    with open(file_path, "r") as config_file:
+        config = yaml.safe_load(config_file)
+        _process_config(config)
+    try:
+        return DatabaseConfig(**config["database"])
+    except ValidationError as e:
+        logger.error(f"Configuration validation error: {e}")
+        sys.exit(1)
+
+
 def _process_env_vars(config_dict):
     # Replace placeholders with environment variables
     for key, value in config_dict.items():
@@ -1,15 +1,24 @@
+import asyncio
 import logging
 import os
+import signal
 import sys
+from typing import Callable, Optional
 
 from loguru import logger
 
 from telegram import Update
-from telegram.ext import Application, PicklePersistence
+from telegram.ext import Application, BasePersistence, PicklePersistence
 
 from .bot_config_manager import AppConfig
+from .config_template import CoreConfig
 from .module_manager import ModuleManager
+from .persistence import SqlitePersistence
+from .sharding import RESTART_EXIT_CODE, Shard, ShardUpdater, shard_path
+from .update_processor import UserOrderedUpdateProcessor
 
+from ..common.startup import STARTUP_TIMELINE
+from ..common.types import RestartMode
 from ..common.logging import InterceptHandler, LOGGING_FORMAT, setup_logging
 
 # from telefix.user.admin import orders
@@ -22,18 +31,30 @@ class BotLauncher:
 
     This class handles the configuration and setup of a Telegram bot application,
     including logging setup, adding module handlers, and managing post-initialization
-    activities. It also provides functionality to restart the application if needed.
+    activities. It also provides functionality to restart the application if needed: /restart
+    rebuilds the application in process, /restart hard re-executes the process.
 
     Attributes:
         config (BotConfigurationManager): Manages the bot's configuration settings.
         module_manager (ModuleManager): Manages the modules that add functionality to the bot.
         log_level (logging.Level): Specifies the logging level for the application.
+        shard (Shard, optional): The shard served, when run as a worker of the `ShardSupervisor`.
+        config_loader (Callable[[], AppConfig], optional): Reloads the configuration on soft
+            restarts.
 
     Methods:
         add_tg_module_handlers(application): Adds Telegram module handlers to the application.
         setup_logging(): Sets up logging with specified format and handlers.
         post_init(application): Loads configurations into core data_reader after initialization.
-        launch(): Initializes and starts the bot application, handling restarts if necessary.
+        post_shutdown(application): Releases the modules' resources after the application stopped.
+        run_webhook(application): Serves the updates pushed by Telegram until stopped.
+        run_shard(application): Processes the updates routed to the shard until stopped.
+        launch(): Initializes and starts the bot application, polling or serving a webhook
+            according to `core.update_mode`, handling restarts if necessary.
+        soft_restart(): Reloads the configuration and the Telegram modules, in process.
+        shard_config(config): Points the files written by the modules to the shard's own.
+        create_persistence(): The persistence configured by `core.persistence_backend`.
+        build_application(persistence): A new application with the modules' handlers.
     """
 
     def __init__(
@@ -41,39 +62,149 @@ class BotLauncher:
         config: AppConfig,
         module_manager: ModuleManager,
         log_level: str = "INFO",
+        shard: Optional[Shard] = None,
+        config_loader: Optional[Callable[[], AppConfig]] = None,
     ):
-        self.config = config
+        self.shard = shard
+        self.config = self.shard_config(config)
         self.module_manager = module_manager
         self.log_level = log_level
+        self.config_loader = config_loader
 
     def launch(self):
         self.setup_logging()
 
-        persistence = PicklePersistence(
-            filepath=self.config.core.persistence
+        while True:
+            # A new persistence for every application, which loads the data flushed by the previous one
+            application = self.build_application(self.create_persistence())
+            if self.shard is not None:
+                self.run_shard(application)
+            elif self.config.core.update_mode == "webhook":
+                self.run_webhook(application)
+            else:
+                application.run_polling(
+                    allowed_updates=Update.ALL_TYPES, close_loop=False
+                )
+
+            restart = application.bot_data.get("restart", RestartMode.NONE)
+            if restart != RestartMode.SOFT:
+                break
+            self.soft_restart()
+
+        # Left open by the runs for the modules kept across soft restarts
+        asyncio.get_event_loop().close()
+
+        if restart == RestartMode.HARD:
+            if self.shard is not None:
+                # The supervisor restarts all the processes
+                sys.exit(RESTART_EXIT_CODE)
+            os.execl(sys.executable, sys.executable, *sys.argv)
+
+    def soft_restart(self) -> None:
+        """
+        Prepares a new application after /restart, without restarting the process.
+
+        The configuration is reloaded and the Telegram modules are created anew, while the standard
+        modules (vector database and its model, database pool, contractor registry...) are kept
+        running on the same event loop. Changes to the settings of the standard modules only take
+        effect after a hard restart (/restart hard). An invalid configuration is ignored, the
+        current one being kept.
+        """
+        logger.info("Soft restart")
+        STARTUP_TIMELINE.reset()
+        if self.config_loader is not None:
+            try:
+                self.config = self.shard_config(self.config_loader())
+            except Exception as e:
+                logger.error(f"Could not reload the configuration, keeping the current one: {e}")
+            STARTUP_TIMELINE.mark("config reloaded")
+        self.module_manager.reload(self.config)
+
+    def shard_config(self, config: AppConfig) -> AppConfig:
+        """
+        Points the files written by the modules to the shard's own, the way the persistence is, so
+        that the workers do not write over each other. The configuration is updated in place.
+        """
+        if self.shard is not None:
+            journal = config.database.journal
+            journal.directory = shard_path(journal.directory, self.shard)
+            embedding_cache = config.vector_database.embedding_cache
+            if embedding_cache.path is not None:
+                embedding_cache.path = shard_path(embedding_cache.path, self.shard)
+        return config
+
+    def create_persistence(self) -> BasePersistence:
+        # Every shard persists the data of its own users
+        persistence_path = (
+            self.config.core.persistence
+            if self.shard is None
+            else shard_path(self.config.core.persistence, self.shard)
         )
+        if self.config.core.persistence_backend == "sqlite":
+            return SqlitePersistence(
+                persistence_path,
+                load_recent_days=self.config.core.persistence_load_recent_days,
+            )
+        return PicklePersistence(filepath=persistence_path)
 
+    def build_application(self, persistence: BasePersistence) -> Application:
+        builder = Application.builder().token(
+            self.config.core.secret.token_telegram.get_secret_value()
+        )
+        bot_api_settings = get_bot_api_settings(self.config.core)
+        if bot_api_settings:
+            builder = builder.base_url(bot_api_settings["base_url"]).base_file_url(
+                bot_api_settings["base_file_url"]
+            )
         application = (
-            Application.builder()
-            .token(
-                self.config.core.secret.token_telegram.get_secret_value()
+            builder.persistence(persistence)
+            .concurrent_updates(
+                UserOrderedUpdateProcessor(self.config.core.max_concurrent_updates)
             )
-            .persistence(persistence)
             .arbitrary_callback_data(True)
             .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
             .build()
         )
 
         # Call the method to add module handlers
         self.add_tg_module_handlers(application)
+        STARTUP_TIMELINE.mark("handlers added")
 
         # TODO make the wiki objects compatible with inline queries
         # application.add_handler(wiki_share.share_inline_query_handler, CLIENT_WIKI)
 
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        return application
 
-        if application.bot_data["restart"]:
-            os.execl(sys.executable, sys.executable, *sys.argv)
+    def run_shard(self, application: Application) -> None:
+        """
+        Processes the updates routed to the shard by the supervisor, until it asks to stop or
+        /restart is sent.
+
+        The updates are received by a `ShardUpdater` in place of the application's own. Ctrl+C
+        reaches the whole process group, it is left to the supervisor which first stops receiving
+        updates and only then stops the workers, once it routed everything it received.
+        """
+        application.updater = ShardUpdater(
+            application.bot,
+            application.update_queue,
+            self.shard,
+            on_stop=application.stop_running,
+        )
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        application.run_polling(stop_signals=[signal.SIGTERM], close_loop=False)
+
+    def run_webhook(self, application: Application) -> None:
+        """
+        Serves the updates pushed by Telegram on `docker.port` until stopped.
+
+        Telegram posts the updates to `webhook.url`/`webhook.url_path`, the webhook is registered on
+        startup. Requests without the `token_webhook` secret token are rejected. On SIGINT/SIGTERM
+        (or /restart) the server stops accepting updates first, the updates already received are
+        then processed before the modules are shut down. The webhook is left registered, so that
+        other instances behind the same URL keep receiving updates.
+        """
+        application.run_webhook(**get_webhook_settings(self.config.core), close_loop=False)
 
     def setup_logging(self):
         """
@@ -99,7 +230,20 @@ class BotLauncher:
         The configs in dict form are now accessible codebase wide.
         """
         application.bot_data["config"] = self.config
-        application.bot_data["restart"] = False
+        application.bot_data["restart"] = RestartMode.NONE
+        await self.module_manager.post_init(application)
+        STARTUP_TIMELINE.mark("receiving updates")
+        STARTUP_TIMELINE.report()
+
+    async def post_shutdown(self, application: Application) -> None:
+        """
+        Releases the resources held by the modules (e.g. database connections) once the
+        application has stopped.
+        """
+        await self.module_manager.post_shutdown(
+            application,
+            keep_std_modules=application.bot_data.get("restart") == RestartMode.SOFT,
+        )
 
     def add_tg_module_handlers(self, application: Application) -> None:
         """
@@ -121,3 +265,42 @@ class BotLauncher:
         for handler in handlers:
             logger.info(f"Adding {handler.TYPE}")
             application.add_handlers(handlers=handler.get_handlers())
+
+
+def get_bot_api_settings(core_config: CoreConfig) -> dict:
+    """
+    Returns the `telegram.Bot` arguments pointing it to `core.bot_api_url`, empty for Telegram's.
+
+    Parameters:
+    - core_config : CoreConfig : The core configuration.
+    """
+    if core_config.bot_api_url is None:
+        return {}
+    bot_api_url = core_config.bot_api_url.rstrip("/")
+    return {
+        "base_url": f"{bot_api_url}/bot",
+        "base_file_url": f"{bot_api_url}/file/bot",
+    }
+
+
+def get_webhook_settings(core_config: CoreConfig) -> dict:
+    """
+    Returns the arguments of `run_webhook` / `Updater.start_webhook` for the webhook mode.
+
+    Parameters:
+    - core_config : CoreConfig : The core configuration, with the webhook settings.
+    """
+    webhook_config = core_config.webhook
+    logger.info(
+        f"Serving webhook on {webhook_config.listen}:{core_config.docker.port}"
+        f"/{webhook_config.url_path}"
+    )
+    return {
+        "listen": webhook_config.listen,
+        "port": core_config.docker.port,
+        "url_path": webhook_config.url_path,
+        "webhook_url": f"{webhook_config.url.rstrip('/')}/{webhook_config.url_path}",
+        "secret_token": core_config.secret.token_webhook.get_secret_value(),
+        "max_connections": webhook_config.max_connections,
+        "allowed_updates": Update.ALL_TYPES,
+    }
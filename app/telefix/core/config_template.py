@@ -1,5 +1,5 @@
-from typing import Dict, List, Optional
-from pydantic import BaseModel, SecretStr
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, SecretStr, model_validator
 
 
 class TgIdConfig(BaseModel):
@@ -35,31 +35,111 @@ class DockerConfig(BaseModel):
     port: int
 
 
+class WebhookConfig(BaseModel):
+    url: str
+    listen: str = "0.0.0.0"
+    url_path: str = "telegram"
+    max_connections: int = 40
+
+
+class MaintenanceConfig(BaseModel):
+    interval_s: int = 3600
+    first_run_delay_s: int = 300
+    user_ttl_days: float = 180
+    max_conversation_len: int = 21
+    max_history_len: int = 20
+    archive_directory: Optional[str] = None
+
+
 class SecretConfig(BaseModel):
     api_openai: SecretStr
     token_telegram: SecretStr
     token_payment_provider: SecretStr
     password_smtp: SecretStr
+    token_webhook: Optional[SecretStr] = None
 
 
 class CoreConfig(BaseModel):
     contact: ContactInfo
     media: str
     persistence: str
+    persistence_backend: Literal["pickle", "sqlite"] = "pickle"
+    persistence_load_recent_days: Optional[float] = 30
     logs: str
     docker: Optional[DockerConfig]
+    update_mode: Literal["polling", "webhook"] = "polling"
+    max_concurrent_updates: int = 32
+    workers: int = 1
+    # Self-hosted Bot API server (or the load test's stand-in), Telegram's when None
+    bot_api_url: Optional[str] = None
+    webhook: Optional[WebhookConfig] = None
+    maintenance: MaintenanceConfig = MaintenanceConfig()
     secret: SecretConfig
 
+    @model_validator(mode="after")
+    def check_webhook(self) -> "CoreConfig":
+        if self.update_mode != "webhook":
+            return self
+        if self.docker is None or self.webhook is None:
+            raise ValueError("The webhook mode requires the docker and webhook settings")
+        if self.secret.token_webhook is None:
+            raise ValueError("The webhook mode requires the token_webhook secret")
+        return self
+
 
 class DatabaseSecretConfig(BaseModel):
     password: SecretStr
 
 
+class DatabasePoolConfig(BaseModel):
+    min_size: int = 2
+    max_size: int = 10
+    timeout: float = 30.0
+
+
+class DatabaseIngestionConfig(BaseModel):
+    queue_size: int = 10000
+    batch_size: int = 500
+    flush_interval_ms: int = 500
+    overflow: Literal["drop_newest", "drop_oldest", "block"] = "drop_oldest"
+    store_messages: bool = True
+
+
+class DatabaseJournalConfig(BaseModel):
+    enabled: bool = False
+    directory: str = "/app/journal"
+    max_segment_mb: int = 64
+    max_segment_age_s: int = 3600
+    queue_size: int = 10000
+    batch_size: int = 500
+    flush_interval_ms: int = 1000
+    compression_level: int = 3
+
+
+class DatabaseUserCacheConfig(BaseModel):
+    max_size: int = 100000
+    warm_up_size: int = 10000
+
+
+class DatabaseContractorsConfig(BaseModel):
+    refresh_interval: float = 300.0
+
+
+class DatabaseMigrationsConfig(BaseModel):
+    apply_on_startup: bool = True
+
+
 class DatabaseConfig(BaseModel):
     host: str
     dbname: str
     user: str
     port: int
+    pool: DatabasePoolConfig = DatabasePoolConfig()
+    ingestion: DatabaseIngestionConfig = DatabaseIngestionConfig()
+    journal: DatabaseJournalConfig = DatabaseJournalConfig()
+    user_cache: DatabaseUserCacheConfig = DatabaseUserCacheConfig()
+    migrations: DatabaseMigrationsConfig = DatabaseMigrationsConfig()
+    contractors: DatabaseContractorsConfig = DatabaseContractorsConfig()
     secret: DatabaseSecretConfig
 
 
@@ -81,11 +161,40 @@ class ClassConfig(BaseModel):
     moduleConfig: Dict[str, ModuleConfig]
 
 
+class VectorDatabasePopulationConfig(BaseModel):
+    batch_size: int = 100
+    num_workers: int = 2
+    sync: bool = True
+
+
+class VectorDatabaseLocalIndexConfig(BaseModel):
+    enabled: bool = False
+    dtype: Literal["float32", "float16"] = "float32"
+
+
+class VectorDatabaseEmbeddingCacheConfig(BaseModel):
+    max_size: int = 10000
+    path: Optional[str] = None
+    disk_size: int = 100000
+
+
+class VectorDatabaseEmbeddingServiceConfig(BaseModel):
+    max_batch_size: int = 32
+    max_wait_ms: float = 5.0
+    num_threads: Optional[int] = None
+
+
 class VectorDatabaseConfig(BaseModel):
     api_url: str
     sentence_transformer: str
     semantic_threshold: float
     query_limit: int
+    population: VectorDatabasePopulationConfig = VectorDatabasePopulationConfig()
+    local_index: VectorDatabaseLocalIndexConfig = VectorDatabaseLocalIndexConfig()
+    embedding_cache: VectorDatabaseEmbeddingCacheConfig = VectorDatabaseEmbeddingCacheConfig()
+    embedding_service: VectorDatabaseEmbeddingServiceConfig = (
+        VectorDatabaseEmbeddingServiceConfig()
+    )
     classes: Dict[str, ClassConfig]
     filters: Dict[str, List[str]]
 
@@ -3,10 +3,13 @@ from typing import Any, List, Dict, Tuple
 
 from loguru import logger
 
+from telegram.ext import Application
+
 from .bot_config_manager import AppConfig
 
 from ..vector_database import VectorDatabase
 from ..user.chatbot import ChatGPTModelConfig
+from ..common.startup import STARTUP_TIMELINE
 from ..common.types import TgModuleType, StdModuleType
 
 
@@ -31,8 +34,11 @@ class ModuleManager:
         self.std_modules = std_modules
         self.std_module_instances = {}
         self.tg_modules = tg_modules
+        self.tg_module_instances = []
         self.config = config
         self.log_level = log_level
+        # The standard modules outlive the application on soft restarts
+        self._std_modules_started = False
 
     def _init_std_module_objects(self) -> None:
         """
@@ -54,10 +60,47 @@ class ModuleManager:
                     query_limit=vector_database_config.query_limit,
                     classes_config=vector_database_config.classes,
                     filters_config=vector_database_config.filters,
+                    batch_size=vector_database_config.population.batch_size,
+                    num_workers=vector_database_config.population.num_workers,
+                    sync=vector_database_config.population.sync,
+                    use_local_index=vector_database_config.local_index.enabled,
+                    local_index_dtype=vector_database_config.local_index.dtype,
+                    embedding_cache_size=vector_database_config.embedding_cache.max_size,
+                    embedding_cache_path=vector_database_config.embedding_cache.path,
+                    embedding_cache_disk_size=vector_database_config.embedding_cache.disk_size,
+                    embedding_batch_size=vector_database_config.embedding_service.max_batch_size,
+                    embedding_max_wait_ms=vector_database_config.embedding_service.max_wait_ms,
+                    embedding_threads=vector_database_config.embedding_service.num_threads,
                 )
                 self.std_module_instances[
                     StdModuleType.VECTOR_DATABASE
                 ] = vector_database_instance
+            elif module.TYPE == StdModuleType.DATABASE:
+                database_config = self.config.database
+                self.std_module_instances[StdModuleType.DATABASE] = module(
+                    host=database_config.host,
+                    dbname=database_config.dbname,
+                    user=database_config.user,
+                    port=database_config.port,
+                    password=database_config.secret.password.get_secret_value(),
+                    min_size=database_config.pool.min_size,
+                    max_size=database_config.pool.max_size,
+                    timeout=database_config.pool.timeout,
+                )
+            elif module.TYPE == StdModuleType.SCHEMA_MIGRATOR:
+                self.std_module_instances[StdModuleType.SCHEMA_MIGRATOR] = module(
+                    self.std_module_instances[StdModuleType.DATABASE],
+                    self.config.database.migrations.apply_on_startup,
+                )
+            elif module.TYPE == StdModuleType.CONTRACTOR_REGISTRY:
+                self.std_module_instances[StdModuleType.CONTRACTOR_REGISTRY] = module(
+                    self.std_module_instances[StdModuleType.DATABASE],
+                    self.config.database.contractors.refresh_interval,
+                )
+            elif module.TYPE == StdModuleType.ORDER_REPOSITORY:
+                self.std_module_instances[StdModuleType.ORDER_REPOSITORY] = module(
+                    self.std_module_instances[StdModuleType.DATABASE]
+                )
 
     def _get_tg_commands_and_messages(self) -> Tuple[List, List]:
         """
@@ -92,7 +135,9 @@ class ModuleManager:
         Returns:
         - tuple: A tuple containing a list of normal instances and the special error handler.
         """
-        self._init_std_module_objects()
+        if not self.std_module_instances:
+            self._init_std_module_objects()
+            STARTUP_TIMELINE.mark("standard modules created")
         commands, messages = self._get_tg_commands_and_messages()
         tg_modules = {module.TYPE: module for module in self.tg_modules}
 
@@ -115,7 +160,7 @@ class ModuleManager:
                         pathlib.Path(self.config.core.media),
                     ),
                     self.std_module_instances[StdModuleType.VECTOR_DATABASE],
-                    global_fallback.ignore_messages_re,
+                    global_fallback.ignore_messages,
                 )
                 handlers.append(prompt_validator)
             elif module.TYPE == TgModuleType.START:
@@ -133,15 +178,78 @@ class ModuleManager:
                         pathlib.Path(self.config.core.media),
                     )
                 )
+            elif module.TYPE == TgModuleType.DATABASE:
+                handlers.append(
+                    module(
+                        self.std_module_instances[StdModuleType.DATABASE],
+                        self.config.database.ingestion,
+                        self.config.database.user_cache,
+                        self.config.database.journal,
+                    )
+                )
+            elif module.TYPE == TgModuleType.MAINTENANCE:
+                handlers.append(module(self.config.core.maintenance))
             elif module.TYPE == TgModuleType.CHATBOT:
                 handlers.append(
                     module(
                         self.config.deployment,
                         pathlib.Path(self.config.core.media),
-                        global_fallback.ignore_messages_re,
+                        global_fallback.ignore_messages,
                     )
                 )
             else:
                 handlers.append(module())
 
+        self.tg_module_instances = handlers
         return handlers, error_handler
+
+    async def post_init(self, application: Application) -> None:
+        """
+        Runs the `post_init` hook of every module instance that defines one.
+
+        Modules holding resources bound to the event loop (e.g. the database pool, background tasks)
+        can only be started once the application is running. Standard modules are started first
+        since the Telegram modules depend on them. Standard modules still running from a previous
+        application (soft restart) are not started again.
+        """
+        instances = list(self.tg_module_instances)
+        if not self._std_modules_started:
+            instances = [*self.std_module_instances.values(), *instances]
+            self._std_modules_started = True
+        for instance in instances:
+            if hasattr(instance, "post_init"):
+                logger.info(f"Starting {instance.TYPE}")
+                await instance.post_init(application)
+                STARTUP_TIMELINE.mark(f"{instance.TYPE} started")
+
+    async def post_shutdown(
+        self, application: Application, keep_std_modules: bool = False
+    ) -> None:
+        """
+        Runs the `post_shutdown` hook of every module instance that defines one,
+        in the reverse order of their start.
+
+        Parameters:
+        - application : Application : The application shutting down.
+        - keep_std_modules : bool : Only stops the Telegram modules, the standard modules being kept
+          for the next application (soft restart).
+        """
+        instances = list(self.tg_module_instances)
+        if not keep_std_modules:
+            instances = [*self.std_module_instances.values(), *instances]
+            self._std_modules_started = False
+        for instance in reversed(instances):
+            if hasattr(instance, "post_shutdown"):
+                logger.info(f"Stopping {instance.TYPE}")
+                await instance.post_shutdown(application)
+
+    def reload(self, config: AppConfig) -> None:
+        """
+        Takes a new configuration for the Telegram modules, created anew by the next
+        `get_tg_module_handlers`. The standard modules are kept along with their configuration.
+
+        Parameters:
+        - config : AppConfig : The reloaded application configuration.
+        """
+        self.config = config
+        self.tg_module_instances = []
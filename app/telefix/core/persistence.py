@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import pickle
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from loguru import logger
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+_KEY_VALUE_TABLES = ("user_data", "chat_data", "bot_data", "callback_data")
+
+# Key of the single row of the bot_data and callback_data tables
+_SINGLE_ROW_KEY = 0
+
+
+class SqlitePersistence(BasePersistence):
+    """
+    Persistence storing every user's and chat's data as its own row of a SQLite database.
+
+    Unlike the `PicklePersistence`, which re-pickles the whole state into one file on every update,
+    only the rows whose content actually changed since they were last written are written: every
+    update is pickled and compared to the digest of the stored row, the changed rows of an update
+    run are then written together in a single transaction. Flush cost is thus proportional to the
+    active users, not to all the users.
+
+    PTB loads all the user and chat data at startup. Only the rows updated within the last
+    `load_recent_days` are loaded then, the others are loaded when their user or chat shows up again,
+    through `refresh_user_data` / `refresh_chat_data`, before any handler sees the data.
+
+    The database is only accessed from a single worker thread, to keep the event loop free.
+
+    Attributes:
+        filepath (pathlib.Path): The SQLite database file.
+        load_recent_days (float): Age of the user and chat data loaded at startup, all if None.
+
+    Methods:
+        import_pickle(filepath): Copies the data of a `PicklePersistence` file into the database.
+        purge_user_data(updated_before, archive): Deletes the rows of the users not loaded and not
+            updated since a date.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        load_recent_days: Optional[float] = 30,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = 60,
+    ):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = pathlib.Path(filepath)
+        self.load_recent_days = load_recent_days
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="persistence"
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        # Digest of the stored pickle of every known row, by (table, key)
+        self._digests: Dict[Tuple[str, Hashable], bytes] = {}
+        # Rows to write by (table, key), None to delete the row
+        self._dirty: Dict[Tuple[str, Hashable], Optional[bytes]] = {}
+        self._loaded: Dict[str, set] = {"user_data": set(), "chat_data": set()}
+        self._write_task: Optional[asyncio.Task] = None
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return await self._load_recent("user_data")
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return await self._load_recent("chat_data")
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        data = await self._run(self._select_row, "bot_data", _SINGLE_ROW_KEY)
+        return self._unpickle("bot_data", _SINGLE_ROW_KEY, data) if data else {}
+
+    async def get_callback_data(self) -> Optional[Tuple[List[Tuple], Dict]]:
+        data = await self._run(self._select_row, "callback_data", _SINGLE_ROW_KEY)
+        return self._unpickle("callback_data", _SINGLE_ROW_KEY, data) if data else None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        rows = await self._run(self._select_conversations, name)
+        return {
+            tuple(json.loads(key)): self._unpickle("conversations", (name, key), state)
+            for key, state in rows
+        }
+
+    async def update_user_data(self, user_id: int, data: Dict) -> None:
+        self._stage("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict) -> None:
+        self._stage("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data: Dict) -> None:
+        self._stage("bot_data", _SINGLE_ROW_KEY, data)
+
+    async def update_callback_data(self, data: Tuple[List[Tuple], Dict]) -> None:
+        self._stage("callback_data", _SINGLE_ROW_KEY, data)
+
+    async def update_conversation(
+        self, name: str, key: Tuple, new_state: Optional[object]
+    ) -> None:
+        self._stage("conversations", (name, json.dumps(key)), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage("user_data", user_id, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage("chat_data", chat_id, None)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict) -> None:
+        await self._load_missing("user_data", user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict) -> None:
+        await self._load_missing("chat_data", chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data: Dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        while self._write_task is not None:
+            await self._write_task
+        # The rows left by a failed write
+        await self._write_pending()
+        await self._run(self._close)
+
+    def import_pickle(self, filepath: str) -> None:
+        """Copies the data of a PicklePersistence file (single_file=True) into the database"""
+        with open(filepath, "rb") as file:
+            data = pickle.load(file)
+        rows = {}
+        for table in ("user_data", "chat_data"):
+            for key, value in data.get(table, {}).items():
+                rows[(table, key)] = pickle.dumps(value)
+        for table in ("bot_data", "callback_data"):
+            if data.get(table) is not None:
+                rows[(table, _SINGLE_ROW_KEY)] = pickle.dumps(data[table])
+        for name, conversations in data.get("conversations", {}).items():
+            for key, state in conversations.items():
+                rows[("conversations", (name, json.dumps(key)))] = pickle.dumps(state)
+        self._executor.submit(self._write_rows, rows).result()
+        self._executor.submit(self._close).result()
+        logger.info(f"Imported {len(rows)} rows from {filepath}")
+
+    async def purge_user_data(
+        self,
+        updated_before: float,
+        archive: Optional[Callable[[Dict[int, Dict]], None]] = None,
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        Deletes the stored data of the users not updated since `updated_before`, except the users
+        loaded, whose data is in the application's `user_data`: those are evicted from there.
+
+        The rows older than `load_recent_days` are never loaded unless their user shows up again,
+        this is how they expire.
+
+        Parameters:
+        - updated_before : float : The timestamp the rows were last written before.
+        - archive : Callable[[Dict[int, Dict]], None] : Called, in the worker thread, with every
+          batch of data before it is deleted. A batch is kept when it raises.
+        - batch_size : int : Number of rows read and deleted at a time.
+
+        Returns:
+        - int : The number of rows deleted.
+        """
+        loaded = frozenset(self._loaded["user_data"])
+        return await self._run(
+            self._purge_rows, "user_data", updated_before, loaded, archive, batch_size
+        )
+
+    async def _load_recent(self, table: str) -> Dict[int, Dict[Any, Any]]:
+        since = (
+            None
+            if self.load_recent_days is None
+            else time.time() - self.load_recent_days * 24 * 3600
+        )
+        rows = await self._run(self._select_rows, table, since)
+        self._loaded[table].update(key for key, _ in rows)
+        logger.info(f"Loaded {len(rows)} rows of {table}")
+        return {key: self._unpickle(table, key, data) for key, data in rows}
+
+    async def _load_missing(self, table: str, key: int, data: Dict) -> None:
+        if key in self._loaded[table]:
+            return
+        self._loaded[table].add(key)
+        stored = await self._run(self._select_row, table, key)
+        if stored:
+            # Whatever was set in the meantime takes precedence over the stored data
+            data.update({**self._unpickle(table, key, stored), **data})
+
+    def _unpickle(self, table: str, key: Hashable, data: bytes) -> Any:
+        self._digests[(table, key)] = _digest(data)
+        return pickle.loads(data)
+
+    def _stage(self, table: str, key: Hashable, value: Optional[object]) -> None:
+        if value is None:
+            self._digests.pop((table, key), None)
+            self._dirty[(table, key)] = None
+        else:
+            data = pickle.dumps(value)
+            digest = _digest(data)
+            if self._digests.get((table, key)) == digest:
+                return
+            self._digests[(table, key)] = digest
+            self._dirty[(table, key)] = data
+
+        # The update_* calls of an update run all happen in the same iteration of the event loop,
+        # writing in a task thus gathers them into a single transaction
+        if self._write_task is None:
+            self._write_task = asyncio.create_task(self._write_dirty())
+
+    async def _write_dirty(self) -> None:
+        written = False
+        try:
+            await asyncio.sleep(0)
+            written = await self._write_pending()
+        finally:
+            self._write_task = None
+        # The rows staged during the write found it running, they are written right after it
+        if written and self._dirty:
+            self._write_task = asyncio.create_task(self._write_dirty())
+
+    async def _write_pending(self) -> bool:
+        """Writes the staged rows, returns False when the write failed"""
+        rows, self._dirty = self._dirty, {}
+        if not rows:
+            return True
+        try:
+            await self._run(self._write_rows, rows)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(rows)} persistence rows: {e}")
+            # Retried with the next update run, unless overwritten meanwhile
+            self._dirty = {**rows, **self._dirty}
+            for table, key in rows:
+                self._digests.pop((table, key), None)
+            return False
+        return True
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, function, *args
+        )
+
+    # The methods below run in the worker thread
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.filepath)
+            self._conn.execute("pragma journal_mode = wal")
+            self._conn.execute("pragma synchronous = normal")
+            with self._conn:
+                for table in _KEY_VALUE_TABLES:
+                    self._conn.execute(
+                        f"create table if not exists {table} ("
+                        "key integer primary key, data blob not null, updated_at real not null)"
+                    )
+                self._conn.execute(
+                    "create table if not exists conversations ("
+                    "name text not null, key text not null, data blob not null, "
+                    "updated_at real not null, primary key (name, key))"
+                )
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _select_rows(self, table: str, since: Optional[float]) -> List[Tuple]:
+        if since is None:
+            return self._connection().execute(f"select key, data from {table}").fetchall()
+        return (
+            self._connection()
+            .execute(f"select key, data from {table} where updated_at >= ?", (since,))
+            .fetchall()
+        )
+
+    def _select_row(self, table: str, key: int) -> Optional[bytes]:
+        row = (
+            self._connection()
+            .execute(f"select data from {table} where key = ?", (key,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def _select_conversations(self, name: str) -> List[Tuple]:
+        return (
+            self._connection()
+            .execute("select key, data from conversations where name = ?", (name,))
+            .fetchall()
+        )
+
+    def _write_rows(self, rows: Dict[Tuple[str, Hashable], Optional[bytes]]) -> None:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            for (table, key), data in rows.items():
+                if table == "conversations":
+                    name, key = key
+                    if data is None:
+                        conn.execute(
+                            "delete from conversations where name = ? and key = ?",
+                            (name, key),
+                        )
+                    else:
+                        conn.execute(
+                            "insert or replace into conversations values (?, ?, ?, ?)",
+                            (name, key, data, now),
+                        )
+                elif data is None:
+                    conn.execute(f"delete from {table} where key = ?", (key,))
+                else:
+                    conn.execute(
+                        f"insert or replace into {table} values (?, ?, ?)",
+                        (key, data, now),
+                    )
+
+
+    def _purge_rows(
+        self,
+        table: str,
+        updated_before: float,
+        loaded: frozenset,
+        archive: Optional[Callable[[Dict[Hashable, Any]], None]],
+        batch_size: int,
+    ) -> int:
+        conn = self._connection()
+        purged = 0
+        after = float("-inf")
+        while True:
+            rows = conn.execute(
+                f"select key, data from {table} where updated_at < ? and key > ? "
+                "order by key limit ?",
+                (updated_before, after, batch_size),
+            ).fetchall()
+            if not rows:
+                return purged
+            after = rows[-1][0]
+            stale = {key: data for key, data in rows if key not in loaded}
+            if not stale:
+                continue
+            if archive is not None:
+                archive({key: pickle.loads(data) for key, data in stale.items()})
+            with conn:
+                conn.executemany(
+                    f"delete from {table} where key = ? and updated_at < ?",
+                    [(key, updated_before) for key in stale],
+                )
+            purged += len(stale)
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
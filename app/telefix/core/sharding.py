@@ -0,0 +1,119 @@
+import asyncio
+import pathlib
+import queue
+import threading
+from typing import Any, Callable, NamedTuple, Optional
+
+from loguru import logger
+
+from telegram import Update
+from telegram.ext import ExtBot, Updater
+
+# Exit code of a shard worker stopped by /restart, the supervisor then restarts every process
+RESTART_EXIT_CODE = 3
+
+# Seconds between two checks of the stop flag by the thread reading the shard's queue
+_QUEUE_POLL_INTERVAL = 0.5
+
+
+class Shard(NamedTuple):
+    index: int
+    count: int
+    # Queue of the update dicts routed to the shard, None asks the worker to stop
+    queue: Any
+
+
+def shard_index(update: Update, count: int) -> int:
+    """
+    Returns the shard processing the update, by user, or by chat for the updates without a user.
+
+    All the updates of a user go to the same shard, whose persistence thus holds all of the user's
+    data. The updates with neither user nor chat go to the first shard.
+    """
+    if update.effective_user is not None:
+        return update.effective_user.id % count
+    if update.effective_chat is not None:
+        return update.effective_chat.id % count
+    return 0
+
+
+def shard_path(path: str, shard: Shard) -> str:
+    """Returns the shard's own variant of a file path, e.g. dev.sqlite -> dev.0-of-4.sqlite"""
+    path = pathlib.Path(path)
+    return str(path.with_name(f"{path.stem}.{shard.index}-of-{shard.count}{path.suffix}"))
+
+
+class ShardUpdater(Updater):
+    """
+    Updater of a shard worker, feeding the application with the updates routed to its shard by the
+    `ShardSupervisor` instead of fetching them from Telegram.
+
+    It is started by `Application.run_polling`, the worker thus gets the whole PTB lifecycle
+    (persistence, jobs, signals, `stop_running`) unchanged. The queue is read by a daemon thread,
+    since `multiprocessing` queues are blocking.
+
+    Attributes:
+        shard (Shard): The shard of the worker.
+        on_stop (Callable[[], None]): Called once the supervisor asked the worker to stop.
+
+    Methods:
+        start_polling(**kwargs): Starts reading the shard's queue, the arguments are ignored.
+        stop(): Stops reading the shard's queue.
+    """
+
+    __slots__ = ("shard", "on_stop", "_reader", "_stopping")
+
+    def __init__(
+        self,
+        bot: ExtBot,
+        update_queue: asyncio.Queue,
+        shard: Shard,
+        on_stop: Callable[[], None],
+    ):
+        super().__init__(bot, update_queue)
+        self.shard = shard
+        self.on_stop = on_stop
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    async def start_polling(self, **_) -> asyncio.Queue:
+        if self.running:
+            raise RuntimeError("This Updater is already running!")
+        self._running = True
+        self._stopping.clear()
+        self._reader = threading.Thread(
+            target=self._read,
+            args=(asyncio.get_running_loop(),),
+            name=f"shard-{self.shard.index}-reader",
+            daemon=True,
+        )
+        self._reader.start()
+        logger.info(f"Shard {self.shard.index + 1}/{self.shard.count} started")
+        return self.update_queue
+
+    async def stop(self) -> None:
+        if not self.running:
+            raise RuntimeError("This Updater is not running!")
+        self._running = False
+        self._stopping.set()
+        await asyncio.to_thread(self._reader.join)
+        self._reader = None
+
+    def _read(self, loop: asyncio.AbstractEventLoop) -> None:
+        while not self._stopping.is_set():
+            try:
+                data = self.shard.queue.get(timeout=_QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if data is None:
+                loop.call_soon_threadsafe(self.on_stop)
+                return
+            loop.call_soon_threadsafe(self._put, data)
+
+    def _put(self, data: dict) -> None:
+        update = Update.de_json(data, self.bot)
+        # As done by PTB's own updater, for the arbitrary callback data
+        if isinstance(self.bot, ExtBot):
+            self.bot.insert_callback_data(update)
+        self.update_queue.put_nowait(update)
+
@@ -0,0 +1,142 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from telegram import Bot, Update
+from telegram.ext import Updater
+
+from .bot_launcher import get_bot_api_settings, get_webhook_settings
+from .config_template import AppConfig
+from .sharding import RESTART_EXIT_CODE, Shard, shard_index
+
+# Seconds between two checks of the workers
+_MONITOR_INTERVAL = 1.0
+
+
+class ShardSupervisor:
+    """
+    Receives the updates once, by polling or webhook, and routes them to `workers` processes each
+    running the whole bot (handlers, database pool, persistence...) for its share of the users.
+
+    The updates are routed by `shard_index`: all the updates of a user are processed by the same
+    worker, in order, and its data is only ever held and persisted by that worker. The CPU bound work
+    (sentence embeddings, token counting, pickling) is thus spread over as many cores as workers.
+    The number of workers must stay the same between runs, the persisted data being split by shard.
+
+    A worker which dies is started again on the same queue, the updates still waiting in it are
+    processed by the new worker. Those the dead worker had already taken off the queue (being
+    processed, or waiting in its application's update queue) are lost. /restart, handled by a
+    worker, restarts the supervisor and all its workers.
+
+    Attributes:
+        config (AppConfig): The application configuration.
+        run_worker (Callable[[Shard], None]): Runs the bot of a shard, started in every worker
+            process. Must be picklable, e.g. a module level function.
+        workers (int): The number of worker processes.
+
+    Methods:
+        launch(): Starts the workers and routes the updates until SIGINT/SIGTERM or /restart.
+    """
+
+    def __init__(
+        self, config: AppConfig, run_worker: Callable[[Shard], None], workers: int
+    ):
+        self.config = config
+        self.run_worker = run_worker
+        self.workers = workers
+
+        # Fresh interpreters, the workers do not inherit the supervisor's event loop and threads
+        self._context = multiprocessing.get_context("spawn")
+        self._shards: List[Shard] = []
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._restart = False
+
+    def launch(self) -> None:
+        self._shards = [
+            Shard(index, self.workers, self._context.Queue())
+            for index in range(self.workers)
+        ]
+        self._processes = [None] * self.workers
+        for shard in self._shards:
+            self._start_worker(shard)
+
+        asyncio.run(self._serve())
+
+        if self._restart:
+            os.execl(sys.executable, sys.executable, *sys.argv)
+
+    def _start_worker(self, shard: Shard) -> None:
+        process = self._context.Process(
+            target=self.run_worker,
+            args=(shard,),
+            name=f"telefix-shard-{shard.index}",
+        )
+        process.start()
+        self._processes[shard.index] = process
+        logger.info(f"Started worker {shard.index} (pid {process.pid})")
+
+    async def _serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(stop_signal, stop.set)
+
+        update_queue = asyncio.Queue()
+        bot = Bot(
+            self.config.core.secret.token_telegram.get_secret_value(),
+            **get_bot_api_settings(self.config.core),
+        )
+        async with Updater(bot, update_queue) as updater:
+            if self.config.core.update_mode == "webhook":
+                await updater.start_webhook(**get_webhook_settings(self.config.core))
+            else:
+                await updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            router = asyncio.create_task(self._route(update_queue))
+            monitor = asyncio.create_task(self._monitor(stop))
+
+            await stop.wait()
+            logger.info("Stopping the supervisor")
+            await updater.stop()
+            # Everything received is routed before the workers are asked to stop
+            await update_queue.join()
+            router.cancel()
+            monitor.cancel()
+
+        for shard in self._shards:
+            shard.queue.put(None)
+        for process in self._processes:
+            await asyncio.to_thread(process.join)
+        for shard in self._shards:
+            shard.queue.close()
+        logger.info("All workers stopped")
+
+    async def _route(self, update_queue: asyncio.Queue) -> None:
+        while True:
+            update = await update_queue.get()
+            try:
+                self._shards[shard_index(update, self.workers)].queue.put(
+                    update.to_dict()
+                )
+            finally:
+                update_queue.task_done()
+
+    async def _monitor(self, stop: asyncio.Event) -> None:
+        while True:
+            await asyncio.sleep(_MONITOR_INTERVAL)
+            for shard, process in zip(self._shards, self._processes):
+                if process.is_alive():
+                    continue
+                if process.exitcode == RESTART_EXIT_CODE:
+                    logger.info(f"Worker {shard.index} requested a restart")
+                    self._restart = True
+                    stop.set()
+                    return
+                logger.error(
+                    f"Worker {shard.index} exited with code {process.exitcode}, restarting it"
+                )
+                self._start_worker(shard)
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from loguru import logger
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes the updates of different users concurrently, and the updates of a same user one after
+    the other, in the order they were received.
+
+    A user waiting for a slow handler (e.g. an OpenAI completion) thus does not hold back the other
+    users, while the handlers of a user never run concurrently on its `user_data` and conversation
+    state. Updates without a user (e.g. channel posts) are serialized per chat, those with neither
+    are not serialized.
+
+    An update first waits for the previous updates of its user, only then for one of the
+    `max_concurrent_updates` slots: a user flooding the bot only ever takes up one slot.
+
+    Attributes:
+        max_concurrent_updates (int): Maximum number of updates processed at once.
+        stats (dict): Queue depth metrics, see `stats`.
+
+    Methods:
+        process_update(update, coroutine): Processes the update once its user's previous updates
+            are processed and a slot is free.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        # Updates received and not processed yet, by user
+        self._pending: Dict[Hashable, int] = {}
+        self._pending_count = 0
+        self._max_pending_count = 0
+        self._processed_count = 0
+
+    @property
+    def stats(self) -> dict:
+        """
+        Snapshot of the queue depth:
+        - pending: updates received and not processed yet, including those being processed.
+        - processing: updates being processed.
+        - waiting_users: users with updates waiting behind one of theirs.
+        - max_user_pending: largest number of pending updates of a single user.
+        - max_pending: largest number of pending updates so far.
+        - processed: updates processed so far.
+        """
+        return {
+            "pending": self._pending_count,
+            "processing": self.current_concurrent_updates,
+            "waiting_users": sum(count > 1 for count in self._pending.values()),
+            "max_user_pending": max(self._pending.values(), default=0),
+            "max_pending": self._max_pending_count,
+            "processed": self._processed_count,
+        }
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = _ordering_key(update)
+        self._pending_count += 1
+        self._max_pending_count = max(self._max_pending_count, self._pending_count)
+        try:
+            if key is None:
+                await super().process_update(update, coroutine)
+                return
+            self._pending[key] = self._pending.get(key, 0) + 1
+            # asyncio.Lock wakes its waiters in FIFO order, the updates of a user are thus
+            # processed in the order they were handed over
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    await super().process_update(update, coroutine)
+            finally:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                    del self._locks[key]
+        finally:
+            self._pending_count -= 1
+            self._processed_count += 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        logger.info(f"Update processor stopped: {self.stats}")
+
+
+def _ordering_key(update: object) -> Optional[Hashable]:
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return "user", update.effective_user.id
+    if update.effective_chat is not None:
+        return "chat", update.effective_chat.id
+    return None
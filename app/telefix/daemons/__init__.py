@@ -1,11 +1,13 @@
 from .error_logging import ErrorHandler
 from .global_fallback import GlobalFallbackHandler
+from .maintenance import MaintenanceHandler
 from .prompt_validator import PromptValidatorHandler
 from .restart import RestartHandler
 
 __all__ = [
     "ErrorHandler",
     "GlobalFallbackHandler",
+    "MaintenanceHandler",
     "PromptValidatorHandler",
     "RestartHandler",
 ]
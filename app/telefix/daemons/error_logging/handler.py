@@ -2,7 +2,7 @@ from functools import partial
 import smtplib as smtp
 
 from .error_logging import error_notification
-from app.telefix.common.types import TgModuleType
+from ...common.types import TgModuleType
 
 
 class ErrorHandler:
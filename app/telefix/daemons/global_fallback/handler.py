@@ -2,7 +2,8 @@ from typing import List
 
 from telegram.ext import MessageHandler, filters
 
-from app.telefix.common.types import TgHandlerPriority, TgModuleType
+from ...common.routing import CommandFilter, text_filter
+from ...common.types import TgHandlerPriority, TgModuleType
 from .unknown_command import unknown_command
 
 
@@ -12,13 +13,12 @@ class GlobalFallbackHandler:
     def __init__(self, commands: List, messages: List):
         self.COMMANDS = commands or []
         self.MESSAGES = messages or []
-        self.ignore_commands_re = (
-            r"^(" + "|".join(rf"\/{command}" for command in self.COMMANDS) + ")$"
-        )
-        self.ignore_messages_re = r"^(" + "|".join(self.MESSAGES) + ")$"
+        # Built once from all the modules, matched through set lookups on every update
+        self.ignore_commands = CommandFilter(self.COMMANDS)
+        self.ignore_messages = text_filter(self.MESSAGES)
 
         self.global_fallback_handler = MessageHandler(
-            filters.COMMAND & (~filters.Regex(self.ignore_commands_re)), unknown_command
+            filters.COMMAND & (~self.ignore_commands), unknown_command
         )
 
     def get_handlers(self):
@@ -0,0 +1,3 @@
+from .handler import MaintenanceHandler
+
+__all__ = ["MaintenanceHandler"]
@@ -0,0 +1,46 @@
+from functools import partial
+
+from loguru import logger
+
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+
+from ...common.types import TgHandlerPriority, TgModuleType
+from ...core.config_template import MaintenanceConfig
+from .maintenance import run_maintenance, track_activity
+
+
+class MaintenanceHandler:
+    """
+    Keeps the users' data bounded: records every user's last activity and periodically evicts the
+    data of the inactive users and trims the histories of the others, on the JobQueue.
+
+    Attributes:
+        config (MaintenanceConfig): The job's interval, the TTL and the maximum history lengths.
+
+    Methods:
+        get_handlers(): The activity tracking handler.
+        post_init(application): Schedules the maintenance job.
+    """
+
+    TYPE = TgModuleType.MAINTENANCE
+
+    def __init__(self, config: MaintenanceConfig):
+        self.config = config
+        self.activity_tracking_handler = TypeHandler(Update, track_activity)
+
+    def get_handlers(self):
+        return {TgHandlerPriority.ACTIVITY_TRACKING: [self.activity_tracking_handler]}
+
+    async def post_init(self, application: Application) -> None:
+        if application.job_queue is None:
+            logger.warning(
+                'No JobQueue, install "python-telegram-bot[job-queue]" to run the maintenance'
+            )
+            return
+        application.job_queue.run_repeating(
+            partial(run_maintenance, config=self.config),
+            interval=self.config.interval_s,
+            first=self.config.first_run_delay_s,
+            name="maintenance",
+        )
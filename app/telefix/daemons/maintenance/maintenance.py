@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import pathlib
+import pickle
+import sqlite3
+import time
+from functools import partial
+from typing import Dict
+
+from loguru import logger
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from ...core.config_template import MaintenanceConfig
+from ...core.persistence import SqlitePersistence
+from ...user.wiki.constants import BROWSER_HISTORY_NAME
+
+LAST_ACTIVITY_NAME = "Last_Activity"
+
+# Last_Activity is only rewritten once it is older than this, so that it does not make the user's
+# persisted data change on every update
+ACTIVITY_RESOLUTION_S = 3600
+
+# Conversations with ChatGPT, whose first message is the system prompt
+CONVERSATION_NAMES = ("GPT_conversation", "GPT_premium_conversation")
+
+
+async def track_activity(_: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Records when the user was last seen, the TTL of its data runs from there"""
+    if context.user_data is None:
+        return
+    now = time.time()
+    if now - context.user_data.get(LAST_ACTIVITY_NAME, 0) >= ACTIVITY_RESOLUTION_S:
+        context.user_data[LAST_ACTIVITY_NAME] = now
+
+
+def trim_user_data(user_data: Dict, config: MaintenanceConfig) -> bool:
+    """
+    Bounds the histories kept in a user's data, in place.
+
+    The first message of the ChatGPT conversations (the system prompt) and the first page of the wiki
+    history (the entry page, where going back ends) are kept, along with the most recent entries.
+    The device context has one entry per page of the wiki history after the first one, it is trimmed
+    alongside.
+
+    Parameters:
+    - user_data : Dict : The user's data.
+    - config : MaintenanceConfig : The maximum lengths of the histories.
+
+    Returns:
+    - bool : Whether anything was trimmed.
+    """
+    trimmed = False
+    for name in CONVERSATION_NAMES:
+        trimmed |= _trim(user_data, name, config.max_conversation_len, keep_first=True)
+    trimmed |= _trim(
+        user_data, BROWSER_HISTORY_NAME, config.max_history_len, keep_first=True
+    )
+    trimmed |= _trim(
+        user_data, "Device_Context", config.max_history_len - 1, keep_first=False
+    )
+    return trimmed
+
+
+def _trim(user_data: Dict, name: str, max_len: int, keep_first: bool) -> bool:
+    history = user_data.get(name)
+    if not isinstance(history, list) or len(history) <= max_len:
+        return False
+    tail = history[len(history) - max_len + keep_first :] if max_len > keep_first else []
+    # Assigned instead of trimmed in place, the list may be shared (e.g. a conversation start)
+    user_data[name] = history[:1] + tail if keep_first else tail
+    return True
+
+
+async def run_maintenance(
+    context: ContextTypes.DEFAULT_TYPE, config: MaintenanceConfig
+) -> None:
+    """
+    Job evicting the data of the users inactive for longer than the TTL and trimming the others'.
+
+    The evicted data is dropped from memory and from the persistence, after being archived when an
+    archive directory is configured. Users never seen since the activity tracking started get the
+    full TTL from the first run. With the `SqlitePersistence`, whose old rows are only loaded when
+    their user shows up again, the rows not written for longer than the TTL are purged from the
+    database directly, archived the same way.
+
+    Parameters:
+    - context : ContextTypes.DEFAULT_TYPE : The job's context.
+    - config : MaintenanceConfig : The TTL, maximum history lengths and archive directory.
+    """
+    application = context.application
+    started = time.monotonic()
+    now = time.time()
+    expiry = now - config.user_ttl_days * 24 * 3600
+    evicted: Dict[int, Dict] = {}
+    changed_user_ids = []
+    trimmed_count = 0
+    trimmed_bytes = 0
+
+    for user_id, user_data in list(application.user_data.items()):
+        if LAST_ACTIVITY_NAME not in user_data:
+            user_data[LAST_ACTIVITY_NAME] = now
+            changed_user_ids.append(user_id)
+        last_activity = user_data[LAST_ACTIVITY_NAME]
+        if last_activity < expiry:
+            evicted[user_id] = dict(user_data)
+            continue
+        # The histories are replaced rather than trimmed in place, a shallow copy keeps them
+        before = dict(user_data)
+        if trim_user_data(user_data, config):
+            changed_user_ids.append(user_id)
+            trimmed_count += 1
+            # Only the trimmed users are measured, pickling everyone's data would block the loop
+            trimmed_bytes += _size(before) - _size(user_data)
+
+    if evicted and config.archive_directory:
+        try:
+            await asyncio.to_thread(_archive, config.archive_directory, evicted)
+        except OSError as e:
+            # Kept until the next run rather than lost
+            logger.error(f"Failed to archive {len(evicted)} users' data: {e}")
+            evicted = {}
+    for user_id in evicted:
+        application.drop_user_data(user_id)
+    # Dropped, the evicted data is no longer changed by the handlers and is measured off the loop
+    evicted_bytes = await asyncio.to_thread(sum, map(_size, evicted.values()))
+    # Only the data of the users of the processed updates is persisted otherwise
+    application.mark_data_for_update_persistence(user_ids=changed_user_ids)
+
+    purged = 0
+    if isinstance(application.persistence, SqlitePersistence):
+        archive = (
+            partial(_archive, config.archive_directory) if config.archive_directory else None
+        )
+        try:
+            purged = await application.persistence.purge_user_data(expiry, archive)
+        except (OSError, sqlite3.Error) as e:
+            # Retried by the next run
+            logger.error(f"Failed to purge the stored data of inactive users: {e}")
+
+    logger.info(
+        f"Maintenance: evicted {len(evicted)} and trimmed {trimmed_count} of "
+        f"{len(application.user_data) + len(evicted)} users' data, reclaimed {evicted_bytes + trimmed_bytes} bytes, "
+        f"purged {purged} stored users' data in {time.monotonic() - started:.2f}s"
+    )
+
+
+def _size(user_data: Dict) -> int:
+    try:
+        return len(pickle.dumps(user_data))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return 0
+
+
+def _archive(directory: str, evicted: Dict[int, Dict]) -> None:
+    """Appends the evicted data to the day's archive, read back with successive pickle.load"""
+    path = pathlib.Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / f"user_data_{datetime.date.today():%Y%m%d}.pickle", "ab") as file:
+        pickle.dump(evicted, file)
+
@@ -2,21 +2,21 @@ from functools import partial
 
 from telegram.ext import MessageHandler, filters
 
-from app.telefix.common.types import TgHandlerPriority, TgModuleType
+from ...common.types import TgHandlerPriority, TgModuleType
 from .prompt_validator import validate_prompt
 
 
 class PromptValidatorHandler:
     TYPE = TgModuleType.PROMPT_VALIDATOR
 
-    def __init__(self, chatgpt_model_config, vector_db_client, ignore_messages_re):
+    def __init__(self, chatgpt_model_config, vector_db_client, ignore_messages):
         self.chatgpt_model_config = chatgpt_model_config
         self.vector_db_client = vector_db_client
 
-        self.ignore_messages_re = ignore_messages_re
+        self.ignore_messages = ignore_messages
         # Pass additional arguments to the coroutine validate_prompt()
         self.validate_prompt_handler = MessageHandler(
-            ~filters.COMMAND & ~filters.Regex(self.ignore_messages_re),
+            ~filters.COMMAND & ~self.ignore_messages,
             partial(
                 validate_prompt,
                 chatgpt_model_config=self.chatgpt_model_config,
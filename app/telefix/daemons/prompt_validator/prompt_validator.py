@@ -5,7 +5,7 @@ from loguru import logger
 from telegram import Update
 from telegram.ext import ContextTypes, ApplicationHandlerStop
 
-from app.telefix.common.helpers import num_tokens_from_string
+from ...common.helpers import num_tokens_from_string
 
 
 async def validate_prompt(
@@ -60,7 +60,14 @@ async def validate_prompt(
         logger.info(f"({user.id}, {user.name}, {user.first_name}) - prompt too long")
         raise ApplicationHandlerStop
 
-    if not check_prompt_semantic(prompt, vector_db_client):
+    if not vector_db_client.ready.is_set():
+        await update.message.reply_text(
+            "Бот ещё запускается, пожалуйста, повторите вопрос через минуту."
+        )
+        logger.info("Vector database not ready yet, prompt rejected")
+        raise ApplicationHandlerStop
+
+    if not await check_prompt_semantic(prompt, vector_db_client):
         await update.message.reply_text(
             "Извините, но ваш вопрос выходит за рамки моей компетенции.\n"
             "Пожалуйста, задайте вопрос, связанный с ПО компьютеров, смартфонов, планшетов "
@@ -114,12 +121,12 @@ def check_prompt_tokens(prompt: str, chatgpt_model_config) -> Tuple[bool, int]:
         return False, prompt_tokens
 
 
-def check_prompt_semantic(prompt: str, vector_db_client) -> bool:
+async def check_prompt_semantic(prompt: str, vector_db_client) -> bool:
     """
     Check the semantic validity of the given prompt using vector similarity.
 
     This function evaluates if the provided prompt is semantically valid by encoding the prompt
-    into a vector and comparing it to predefined English and Russian filters using the vector
+    into a vector, off the event loop and batched with the concurrent prompts, and comparing it to predefined English and Russian filters using the vector
     database client. The function calculates the average certainty of the prompt being
     semantically close to the filters and compares it against a predefined semantic threshold.
 
@@ -136,7 +143,7 @@ def check_prompt_semantic(prompt: str, vector_db_client) -> bool:
 
     # Vector Query
     logger.info(f"ENCODING PROMPT: {prompt}")
-    embeddings = vector_db_client.embedding_model.encode(prompt)
+    embeddings = await vector_db_client.embed(prompt)
 
     # Retrieve English filters
     logger.info("COMPARING TO ENGLISH FILTERS")
@@ -3,10 +3,14 @@ from loguru import logger
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from ...common.types import RestartMode
+
 
 async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.message.from_user
     logger.info(f"({user.id}, {user.name}, {user.first_name})")
 
-    context.bot_data["restart"] = True
+    # "/restart hard" re-executes the process, otherwise the application is rebuilt in process
+    hard = context.args == ["hard"]
+    context.bot_data["restart"] = RestartMode.HARD if hard else RestartMode.SOFT
     context.application.stop_running()
@@ -1,5 +1,13 @@
+from .contractors import ContractorRegistry
 from .handler import DatabaseHandler
+from .migrations import SchemaMigrator
+from .orders import OrderRepository
+from .pool import DatabasePool
 
 __all__ = [
+    "ContractorRegistry",
     "DatabaseHandler",
+    "DatabasePool",
+    "OrderRepository",
+    "SchemaMigrator",
 ]
@@ -0,0 +1,196 @@
+"""
+Awaitable counterparts of the functions in `utils`.
+
+Every function borrows a connection from the application's `DatabasePool` instead of opening a new one,
+so they can be awaited from the PTB handlers without blocking the event loop.
+The order related functions live in `orders.OrderRepository`.
+"""
+
+from loguru import logger
+
+import psycopg
+
+from typing import List, Optional, Tuple
+
+from .pool import DatabasePool
+from .utils import MESSAGE_INSERT_QUERY, USER_UPSERT_QUERY
+
+
+async def insert_new_user(
+    user_id: int,
+    user_name: str,
+    first_name: str,
+    last_name: str,
+    db_pool: DatabasePool,
+) -> None:
+    """
+    Inserts a new user into the database, or refreshes their names if they changed.
+
+    A single upsert statement: existing users whose username, first and last name are unchanged
+    are left untouched.
+
+    Parameters:
+    - user_id : int : The unique identifier of the user.
+    - user_name : str : The username of the user.
+    - first_name : str : The first name of the user.
+    - last_name : str : The last name of the user.
+    - db_pool : DatabasePool : The application's connection pool.
+
+    Returns:
+    - None
+    """
+    logger.info(" ")
+    try:
+        async with db_pool.connection() as conn:
+            await conn.execute(
+                USER_UPSERT_QUERY, (user_id, user_name, first_name, last_name)
+            )
+    except psycopg.Error as e:
+        logger.error(e)
+
+
+async def get_recent_users(limit: int, db_pool: DatabasePool) -> List[Tuple]:
+    """Returns the (user_id, user_name, first_name, last_name) of the most recently joined users"""
+    logger.debug(" ")
+    async with db_pool.connection() as conn:
+        result = await conn.execute(
+            "select user_id, user_name, first_name, last_name from users "
+            "order by join_date desc nulls last limit %s",
+            (limit,),
+        )
+        return await result.fetchall()
+
+
+async def get_user_data(user_id: int, db_pool: DatabasePool) -> Optional[Tuple]:
+    logger.info(" ")
+    async with db_pool.connection() as conn:
+        result = await conn.execute(
+            "select * from users where user_id = %s", (user_id,)
+        )
+        return await result.fetchone()
+
+
+async def insert_user_phone_number(
+    user_id: int, phone_number: int, db_pool: DatabasePool
+) -> None:
+    logger.debug(" ")
+    async with db_pool.connection() as conn:
+        await conn.execute(
+            "update users set phone_number = %s where user_id = %s;",
+            (phone_number, user_id),
+        )
+        logger.info("Phone number added into Database")
+
+
+async def get_customer_data(user_id: int, db_pool: DatabasePool) -> Optional[Tuple]:
+    logger.debug(" ")
+    async with db_pool.connection() as conn:
+        result = await conn.execute(
+            "select users.user_id, users.user_name, users.first_name, users.last_name,"
+            "users.phone_number, users.join_date, "
+            "customers.warning "
+            "from users, customers "
+            "where user_id = %s and customer_id = %s",
+            (
+                user_id,
+                user_id,
+            ),
+        )
+        return await result.fetchone()
+
+
+async def get_contractor_data(user_id: int, db_pool: DatabasePool) -> Optional[Tuple]:
+    logger.debug(" ")
+    async with db_pool.connection() as conn:
+        result = await conn.execute(
+            "select users.user_id, users.user_name, users.first_name, users.last_name, users.phone_number, users.join_date, "
+            "contractors.warning "
+            "from users, contractors "
+            "where user_id = %s and contractor_id = %s",
+            (
+                user_id,
+                user_id,
+            ),
+        )
+        return await result.fetchone()
+
+
+async def get_all_contractor_id(db_pool: DatabasePool) -> List:
+    logger.debug(" ")
+    async with db_pool.connection() as conn:
+        result = await conn.execute("select contractor_id from contractors")
+        return [i[0] for i in await result.fetchall()]
+
+
+async def check_assign(
+    old_contractor_id: int,
+    order_id: int,
+    new_contractor_id: int,
+    db_pool: DatabasePool,
+) -> bool:
+    logger.debug(" ")
+    async with db_pool.connection() as conn:
+        result = await conn.execute(
+            "select * from assign where old_contractor_id = %s and order_id = %s and new_contractor_id = %s",
+            (old_contractor_id, order_id, new_contractor_id),
+        )
+        return bool(await result.fetchone())
+
+
+async def insert_message(
+    chat_id: int,
+    message_id: int,
+    update_kind: str,
+    user_id: int,
+    text: str,
+    db_pool: DatabasePool,
+) -> None:
+    """
+    Inserts a message into the database, skipping it if already stored.
+
+    Parameters:
+    - chat_id : int : The ID of the chat the message belongs to.
+    - message_id : int : The ID of the message in the chat.
+    - update_kind : str : The kind of update the text comes from, see `UpdateKind`.
+    - user_id : int : The ID of the user who sent the message.
+    - text : str : The text content of the message.
+    - db_pool : DatabasePool : The application's connection pool.
+
+    Returns:
+    - None
+    """
+    logger.debug(" ")
+    try:
+        async with db_pool.connection() as conn:
+            await conn.execute(
+                MESSAGE_INSERT_QUERY, (chat_id, message_id, update_kind, user_id, text)
+            )
+    except psycopg.Error as e:
+        logger.error(e)
+
+
+async def insert_users_and_messages(
+    users: List[Tuple], messages: List[Tuple], db_pool: DatabasePool
+) -> None:
+    """
+    Writes a batch of collected users and messages in a single transaction.
+
+    Both lists are sent with `executemany`, which psycopg pipelines into one round trip per list.
+    Users are written first so the messages referencing them never precede their author. Existing
+    users are upserted and existing messages skipped instead of aborting the whole batch.
+
+    Parameters:
+    - users : List[Tuple] : (user_id, user_name, first_name, last_name) rows.
+    - messages : List[Tuple] : (chat_id, message_id, update_kind, user_id, message_text) rows.
+    - db_pool : DatabasePool : The application's connection pool.
+
+    Raises:
+    - psycopg.Error: Raised when the batch could not be written, the transaction is rolled back.
+    """
+    logger.debug(f"inserting {len(users)} users and {len(messages)} messages")
+    async with db_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            if users:
+                await cursor.executemany(USER_UPSERT_QUERY, users)
+            if messages:
+                await cursor.executemany(MESSAGE_INSERT_QUERY, messages)
@@ -0,0 +1,96 @@
+import asyncio
+from typing import FrozenSet, Optional
+
+from loguru import logger
+
+import psycopg
+from telegram.ext import Application, filters
+
+from . import async_utils as tldb
+from ..common.types import StdModuleType
+from .pool import DatabasePool
+
+CONTRACTORS_CHANNEL = "contractors_changed"
+
+
+class ContractorRegistry:
+    """
+    In-memory set of the contractor ids, so that authorising a contractor costs a set lookup
+    instead of a database query.
+
+    The set is loaded at startup and reloaded whenever the `contractors` table changes, signalled by
+    the trigger of the "contractors change notifications" migration on the `contractors_changed`
+    channel, and every `refresh_interval` seconds in case a notification was missed (e.g. while
+    the listening connection was down). New contractors are thus recognised without a restart.
+
+    `filter` is a PTB `filters.User` kept in sync with the set, to be used directly in handlers.
+
+    Attributes:
+        db_pool (DatabasePool): Pool used to load the contractor ids.
+        refresh_interval (float): Maximum seconds between two reloads.
+        contractor_ids (FrozenSet[int]): The current contractor ids.
+        filter (filters.User): Filter letting only the contractors' updates through.
+
+    Methods:
+        refresh(): Reloads the contractor ids from the database.
+        post_init(application): Loads the ids and starts listening for changes.
+        post_shutdown(application): Stops listening.
+    """
+
+    TYPE = StdModuleType.CONTRACTOR_REGISTRY
+
+    def __init__(self, db_pool: DatabasePool, refresh_interval: float):
+        self.db_pool = db_pool
+        self.refresh_interval = refresh_interval
+        self.contractor_ids: FrozenSet[int] = frozenset()
+        self.filter = filters.User(allow_empty=False)
+        self._listener: Optional[asyncio.Task] = None
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.contractor_ids
+
+    async def refresh(self) -> None:
+        try:
+            contractor_ids = frozenset(await tldb.get_all_contractor_id(self.db_pool))
+        except (psycopg.Error, RuntimeError) as e:
+            logger.error(f"Failed to refresh the contractor ids, keeping the current ones: {e}")
+            return
+        if contractor_ids != self.contractor_ids:
+            logger.info(f"Contractors updated: {len(contractor_ids)} contractor(s)")
+        self.contractor_ids = contractor_ids
+        self.filter.user_ids = contractor_ids
+
+    async def post_init(self, _: Application) -> None:
+        await self.refresh()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def post_shutdown(self, _: Application) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    **self.db_pool.db_auth, autocommit=True
+                ) as conn:
+                    await conn.execute(f"listen {CONTRACTORS_CHANNEL}")
+                    # Changes may have been missed while not listening
+                    await self.refresh()
+                    while True:
+                        # Returns on the first notification or after refresh_interval
+                        async for _ in conn.notifies(
+                            timeout=self.refresh_interval, stop_after=1
+                        ):
+                            pass
+                        await self.refresh()
+            except psycopg.Error as e:
+                logger.error(f"Contractors listener disconnected: {e}")
+                await asyncio.sleep(self.refresh_interval)
+                await self.refresh()
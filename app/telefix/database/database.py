@@ -9,22 +9,30 @@ from typing import Tuple, Optional
 from telegram import Update, User, Message
 from telegram.ext import ContextTypes
 
-from . import utils as tldb
+from . import async_utils as tldb
+from ..common.types import UpdateKind
+from .ingestion import MessageRecord, UpdateIngestor, UserRecord
+from .journal import UpdateJournal
+from .pool import DatabasePool
+from .user_cache import KnownUserCache
 
 
-async def get_postgres(_: Update, context: ContextTypes.DEFAULT_TYPE) -> dict:
-    return {
-        "host": context.bot_data["config"].database.host,
-        "dbname": context.bot_data["config"].database.dbname,
-        "user": context.bot_data["config"].database.user,
-        "port": context.bot_data["config"].database.port,
-        "password": context.bot_data["config"].database.secret.password.get_secret_value(),
-    }
-
-
-async def collect_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def collect_data(
+    update: Update,
+    _: ContextTypes.DEFAULT_TYPE,
+    ingestor: UpdateIngestor,
+    user_cache: KnownUserCache,
+    journal: Optional[UpdateJournal] = None,
+    store_messages: bool = True,
+) -> None:
     """Is called everytime a message/Update is sent to bot.
-    Writes user info and message to DB"""
+    Queues user info and message to be written to DB by the ingestion pipeline.
+    Users already stored with the same names are not queued again.
+    The whole update is also journaled if a journal is given, in which case the messages may be
+    kept out of the DB with `store_messages`"""
+
+    if journal is not None:
+        await journal.submit(update.to_dict())
 
     # Extract user and message information
     user, message = extract_user_and_message(update)
@@ -36,13 +44,14 @@ async def collect_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     # Log the callback data if it exists
     log_callback_data(update)
 
-    # Write to database
+    # Queue for the database
     if user and message:
-        db_auth = await get_postgres(update, context)
-        tldb.insert_new_user(
-            user.id, user.username, user.first_name, user.last_name, db_auth
-        )
-        tldb.insert_message(message.message_id, user.id, message.text, db_auth)
+        user_names = (user.username, user.first_name, user.last_name)
+        if not user_cache.is_known(user.id, user_names):
+            await ingestor.submit(UserRecord(user.id, *user_names))
+        message_record = store_messages and extract_message_record(update, user, message)
+        if message_record:
+            await ingestor.submit(message_record)
     else:
         logger.info("Update cannot be collected")
 
@@ -92,18 +101,41 @@ def extract_user_and_message(
     return user, message
 
 
+def extract_message_record(
+    update: Update, user: User, message: Message
+) -> Optional[MessageRecord]:
+    """
+    Builds the record of the text carried by the update, None if there is no text to store.
+
+    Callback queries are stored with their data as text. All the presses on an inline keyboard come
+    from the same message, so they are told apart by using the update_id as their message id.
+    """
+    if update.callback_query:
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        return MessageRecord(
+            message.chat_id, update.update_id, UpdateKind.CALLBACK_QUERY, user.id, data
+        )
+
+    if not isinstance(message.text, str):
+        return None
+    return MessageRecord(
+        message.chat_id, message.message_id, UpdateKind.MESSAGE, user.id, message.text
+    )
+
+
 async def collect_phone_number(
-    update: Update, context: ContextTypes.DEFAULT_TYPE
+    update: Update, _: ContextTypes.DEFAULT_TYPE, db_pool: DatabasePool
 ) -> None:
     """Checks if Phone# in DB and adds it to appropriate UserID"""
     logger.debug(" ")
     user = update.effective_user
     phone_number = int(update.message.contact.phone_number)
-    db_auth = await get_postgres(update, context)
 
     # Check if PhoneNumber already in Database
-    if tldb.get_user_data(user.id, db_auth)[4] is None:
-        tldb.insert_user_phone_number(user.id, phone_number, db_auth)
+    if (await tldb.get_user_data(user.id, db_pool))[4] is None:
+        await tldb.insert_user_phone_number(user.id, phone_number, db_pool)
     else:
         await update.message.reply_text("Phone number already in Database")
 
@@ -0,0 +1,227 @@
+"""
+Streaming export of the messages and orders for offline analysis.
+
+The rows are streamed with `COPY ... TO STDOUT` straight into a gzip compressed CSV file, optionally
+converted to Parquet (requires pyarrow). The date range is exported one time window at a time,
+each window being its own short COPY in autocommit mode, so that no long transaction holds back
+the bot's writes and the memory used stays the same whatever the table size.
+
+Usage:
+    telefix-export -c /app/config/dev -t messages -s 2024-01-01 -e 2024-02-01 [-f parquet] [-o .]
+"""
+
+import argparse
+import datetime
+import gzip
+import pathlib
+import shutil
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from loguru import logger
+
+import psycopg
+from psycopg import sql
+
+from .utils import create_db_connection
+
+# Exportable tables with the column their date range applies to
+EXPORT_TABLES: Dict[str, str] = {
+    "messages": "created_at",
+    "orders": "created_at",
+}
+
+# PostgreSQL type oids of the schema's columns, mapped to their pyarrow type name
+PARQUET_TYPES: Dict[int, str] = {
+    16: "bool",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    25: "string",
+    700: "float32",
+    701: "float64",
+    1043: "string",
+    1114: "timestamp[us]",
+}
+
+
+def export_csv(
+    db_auth: dict,
+    table: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    output: pathlib.Path,
+    window: datetime.timedelta,
+) -> int:
+    """
+    Exports the rows of `table` dated within [start, end) into a gzip compressed CSV file.
+
+    Parameters:
+    - db_auth : dict : The database authentication credentials.
+    - table : str : One of `EXPORT_TABLES`.
+    - start : datetime.datetime : Start of the range, included.
+    - end : datetime.datetime : End of the range, excluded.
+    - output : pathlib.Path : The CSV file written.
+    - window : datetime.timedelta : The range covered by each COPY.
+
+    Returns:
+    - int : The number of bytes of uncompressed CSV exported.
+
+    Raises:
+    - ValueError : If the window is not positive.
+    """
+    if window <= datetime.timedelta(0):
+        raise ValueError(f"The export window must be positive, got {window}")
+    date_column = sql.Identifier(EXPORT_TABLES[table])
+    written = 0
+    with create_db_connection(db_auth) as conn, gzip.open(output, "wb") as file:
+        # Every COPY is a transaction of its own, only as long as its window
+        conn.autocommit = True
+        cursor = conn.cursor()
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + window, end)
+            query = sql.SQL(
+                "copy (select * from {table} where {date} >= %s and {date} < %s order by {date}) "
+                "to stdout with (format csv, header {header})"
+            ).format(
+                table=sql.Identifier(table),
+                date=date_column,
+                # The header is only written once, by the first window
+                header=sql.SQL("true" if window_start == start else "false"),
+            )
+            with cursor.copy(query, (window_start, window_end)) as copy:
+                for data in copy:
+                    file.write(data)
+                    written += len(data)
+            logger.debug(f"Exported {table} from {window_start} to {window_end}")
+            window_start = window_end
+    return written
+
+
+def get_columns(db_auth: dict, table: str) -> List[Tuple[str, int]]:
+    """Returns the (name, type oid) of the columns of `table`"""
+    with create_db_connection(db_auth) as conn:
+        cursor = conn.execute(
+            sql.SQL("select * from {table} limit 0").format(table=sql.Identifier(table))
+        )
+        return [(column.name, column.type_code) for column in cursor.description]
+
+
+def csv_to_parquet(
+    csv_path: pathlib.Path, columns: List[Tuple[str, int]], output: pathlib.Path
+) -> None:
+    """Converts the exported CSV to Parquet, one block of rows at a time"""
+    from pyarrow import csv, parquet
+    import pyarrow
+
+    column_types = {
+        name: pyarrow.type_for_alias(PARQUET_TYPES.get(type_code, "string"))
+        for name, type_code in columns
+    }
+    reader = csv.open_csv(
+        csv_path,
+        convert_options=csv.ConvertOptions(
+            column_types=column_types,
+            true_values=["t"],
+            false_values=["f"],
+            # COPY writes NULL unquoted and empty strings quoted
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    with parquet.ParquetWriter(output, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def export(
+    db_auth: dict,
+    table: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    output_dir: pathlib.Path,
+    file_format: str,
+    window: datetime.timedelta,
+) -> pathlib.Path:
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Cannot export {table}, choose from {list(EXPORT_TABLES)}")
+
+    name = f"{table}_{start:%Y%m%d}_{end:%Y%m%d}"
+    csv_path = output_dir / f"{name}.csv.gz"
+    written = export_csv(db_auth, table, start, end, csv_path, window)
+    logger.info(f"Exported {written} bytes of {table} into {csv_path}")
+    if file_format == "csv":
+        return csv_path
+
+    parquet_path = output_dir / f"{name}.parquet"
+    # pyarrow reads plain CSV in blocks, the compressed export is inflated to a temporary file
+    with tempfile.NamedTemporaryFile(suffix=".csv") as plain_csv:
+        with gzip.open(csv_path, "rb") as compressed:
+            shutil.copyfileobj(compressed, plain_csv)
+        plain_csv.flush()
+        csv_to_parquet(
+            pathlib.Path(plain_csv.name), get_columns(db_auth, table), parquet_path
+        )
+    csv_path.unlink()
+    logger.info(f"Converted into {parquet_path}")
+    return parquet_path
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def main(argv=None):
+    from ..core.bot_config_manager import load_database_config
+
+    parser = argparse.ArgumentParser(description="Exports a table for analysis")
+    parser.add_argument(
+        "-c",
+        "--app_config_path",
+        help="Application base configuration path",
+        default="/app/config/dev",
+    )
+    parser.add_argument("-t", "--table", choices=list(EXPORT_TABLES), required=True)
+    parser.add_argument(
+        "-s", "--start", type=datetime.datetime.fromisoformat, required=True
+    )
+    parser.add_argument("-e", "--end", type=datetime.datetime.fromisoformat, required=True)
+    parser.add_argument("-f", "--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("-o", "--output_dir", type=pathlib.Path, default=pathlib.Path("."))
+    parser.add_argument(
+        "-w",
+        "--window_hours",
+        type=_positive_int,
+        default=24,
+        help="Hours of data exported per COPY",
+    )
+    args = parser.parse_args(argv)
+
+    database_config = load_database_config(
+        pathlib.Path(args.app_config_path) / "database.yaml"
+    )
+    db_auth = {
+        "host": database_config.host,
+        "dbname": database_config.dbname,
+        "user": database_config.user,
+        "port": database_config.port,
+        "password": database_config.secret.password.get_secret_value(),
+    }
+    try:
+        export(
+            db_auth,
+            args.table,
+            args.start,
+            args.end,
+            args.output_dir,
+            args.format,
+            datetime.timedelta(hours=args.window_hours),
+        )
+    except psycopg.Error as e:
+        logger.error(f"Export failed: {e}")
+        sys.exit(1)
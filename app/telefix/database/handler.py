@@ -1,18 +1,83 @@
+from functools import partial
+
 from telegram import Update
-from telegram.ext import TypeHandler
+from telegram.ext import Application, TypeHandler
 
 from ..common.types import TgHandlerPriority, TgModuleType
+from ..core.config_template import (
+    DatabaseIngestionConfig,
+    DatabaseJournalConfig,
+    DatabaseUserCacheConfig,
+)
 from .database import collect_data
+from .ingestion import UpdateIngestor
+from .journal import UpdateJournal
+from .pool import DatabasePool
+from .user_cache import KnownUserCache
 
 
 class DatabaseHandler:
     TYPE = TgModuleType.DATABASE
 
-    def __init__(self):
-        self.data_collection_handler = TypeHandler(Update, collect_data)
+    def __init__(
+        self,
+        db_pool: DatabasePool,
+        ingestion_config: DatabaseIngestionConfig,
+        user_cache_config: DatabaseUserCacheConfig,
+        journal_config: DatabaseJournalConfig,
+    ):
+        self.db_pool = db_pool
+        self.user_cache = KnownUserCache(
+            db_pool,
+            max_size=user_cache_config.max_size,
+            warm_up_size=user_cache_config.warm_up_size,
+        )
+        self.ingestor = UpdateIngestor(
+            db_pool,
+            queue_size=ingestion_config.queue_size,
+            batch_size=ingestion_config.batch_size,
+            flush_interval_ms=ingestion_config.flush_interval_ms,
+            overflow=ingestion_config.overflow,
+            user_cache=self.user_cache,
+        )
+        self.journal = (
+            UpdateJournal(
+                journal_config.directory,
+                max_segment_mb=journal_config.max_segment_mb,
+                max_segment_age_s=journal_config.max_segment_age_s,
+                queue_size=journal_config.queue_size,
+                batch_size=journal_config.batch_size,
+                flush_interval_ms=journal_config.flush_interval_ms,
+                compression_level=journal_config.compression_level,
+            )
+            if journal_config.enabled
+            else None
+        )
+        self.data_collection_handler = TypeHandler(
+            Update,
+            partial(
+                collect_data,
+                ingestor=self.ingestor,
+                user_cache=self.user_cache,
+                journal=self.journal,
+                store_messages=ingestion_config.store_messages,
+            ),
+        )
         # Note check if needs to be implemented once overall features done
         # collection_phone_number_handler = MessageHandler(filters.CONTACT, collect_phone_number)
         # user_status_handler = ChatMemberHandler(user_status, ChatMemberHandler.CHAT_MEMBER)
 
     def get_handlers(self):
         return {TgHandlerPriority.DB_MESSAGE_COLLECTION: [self.data_collection_handler]}
+
+    async def post_init(self, application: Application) -> None:
+        await self.user_cache.post_init(application)
+        await self.ingestor.post_init(application)
+        if self.journal is not None:
+            await self.journal.post_init(application)
+
+    async def post_shutdown(self, application: Application) -> None:
+        if self.journal is not None:
+            await self.journal.post_shutdown(application)
+        await self.ingestor.post_shutdown(application)
+        await self.user_cache.post_shutdown(application)
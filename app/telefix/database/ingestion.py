@@ -0,0 +1,168 @@
+import asyncio
+from typing import List, NamedTuple, Optional, Union
+
+from loguru import logger
+
+import psycopg
+from telegram.ext import Application
+
+from ..common.types import UpdateKind
+from . import async_utils as tldb
+from .pool import DatabasePool
+from .user_cache import KnownUserCache
+
+
+class UserRecord(NamedTuple):
+    user_id: int
+    user_name: Optional[str]
+    first_name: str
+    last_name: Optional[str]
+
+
+class MessageRecord(NamedTuple):
+    chat_id: int
+    message_id: int
+    update_kind: UpdateKind
+    user_id: int
+    text: str
+
+
+IngestionRecord = Union[UserRecord, MessageRecord]
+
+
+class UpdateIngestor:
+    """
+    Write-behind pipeline taking the collected users and messages off the critical path of the updates.
+
+    `collect_data` only enqueues records into a bounded in-memory queue. A background flusher task
+    drains the queue and writes the records in bulk, as soon as `batch_size` records are waiting or
+    `flush_interval_ms` elapsed since the first record of the batch, whichever comes first.
+
+    When the queue is full the `overflow` policy decides what happens to the new record:
+        - "drop_newest": the new record is discarded.
+        - "drop_oldest": the oldest queued record is discarded to make room for the new one.
+        - "block": the caller waits until the flusher made room.
+
+    Attributes:
+        db_pool (DatabasePool): Pool used by the flusher to write the batches.
+        queue_size (int): Maximum number of records held in memory.
+        batch_size (int): Number of records triggering an immediate flush.
+        flush_interval (float): Maximum seconds a record waits before being flushed.
+        overflow (str): Backpressure policy applied when the queue is full.
+        user_cache (KnownUserCache): Optional cache told about every user successfully written.
+        stats (dict): Counters of enqueued, written, dropped and failed records.
+
+    Methods:
+        submit(record): Enqueues a record according to the overflow policy.
+        post_init(application): Starts the flusher task.
+        post_shutdown(application): Stops the flusher and writes everything still queued.
+    """
+
+    def __init__(
+        self,
+        db_pool: DatabasePool,
+        queue_size: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        overflow: str,
+        user_cache: Optional[KnownUserCache] = None,
+    ):
+        self.db_pool = db_pool
+        self.user_cache = user_cache
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow = overflow
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def submit(self, record: IngestionRecord) -> None:
+        if self._queue is None:
+            logger.warning("Ingestion pipeline not started, record dropped")
+            self.stats["dropped"] += 1
+            return
+
+        if self._queue.full():
+            if self.overflow == "block":
+                await self._queue.put(record)
+                self.stats["enqueued"] += 1
+                return
+            self.stats["dropped"] += 1
+            if self.overflow == "drop_newest":
+                logger.warning("Ingestion queue full, dropping newest record")
+                return
+            logger.warning("Ingestion queue full, dropping oldest record")
+            self._queue.get_nowait()
+
+        self._queue.put_nowait(record)
+        self.stats["enqueued"] += 1
+
+    async def post_init(self, _: Application) -> None:
+        logger.info(
+            f"Starting ingestion flusher (batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval}s, overflow={self.overflow})"
+        )
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._flusher = asyncio.create_task(self._run())
+
+    async def post_shutdown(self, _: Application) -> None:
+        if self._flusher is None:
+            return
+        # The sentinel is queued after every pending record, so the flusher writes them all
+        # before stopping, and before the database pool is closed
+        await self._queue.put(None)
+        await self._flusher
+        self._flusher = None
+        logger.info(f"Ingestion pipeline stopped: {self.stats}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            record = await self._queue.get()
+            if record is None:
+                return
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    await self._flush(batch)
+                    return
+                batch.append(record)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[IngestionRecord]) -> None:
+        if not batch:
+            return
+
+        # Only keep the latest version of every user in the batch
+        users = {}
+        messages = []
+        for record in batch:
+            if isinstance(record, UserRecord):
+                users[record.user_id] = tuple(record)
+            else:
+                messages.append(tuple(record))
+
+        try:
+            await tldb.insert_users_and_messages(
+                list(users.values()), messages, self.db_pool
+            )
+            self.stats["written"] += len(batch)
+            if self.user_cache is not None:
+                for user_id, *names in users.values():
+                    self.user_cache.add(user_id, tuple(names))
+            logger.debug(
+                f"Flushed {len(users)} users and {len(messages)} messages: {self.stats}"
+            )
+        except (psycopg.Error, RuntimeError) as e:
+            self.stats["failed"] += len(batch)
+            logger.error(f"Failed to write ingestion batch of {len(batch)} records: {e}")
@@ -0,0 +1,312 @@
+"""
+Append-only journal of the raw updates received by the bot.
+
+The updates are stored as `Update.to_dict()` JSON lines, each batch compressed as one zstd frame and
+appended to the current segment file. Segments are rotated by size and age, and every segment
+`<name>.zst` has an index `<name>.idx` with one "first_update_id offset count" line per frame, so
+readers can seek to an update without decompressing what precedes it. A frame is only indexed once
+fully written, a torn write at the end of a segment is thus never read.
+
+Usage:
+    telefix-journal dump -d /app/journal [--after UPDATE_ID] > updates.jsonl
+    telefix-journal backfill -d /app/journal -c /app/config/dev [--after UPDATE_ID]
+
+Shard workers journal into directories of their own, e.g. /app/journal.0-of-4.
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import sys
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+from loguru import logger
+
+import zstandard
+from telegram import Update
+from telegram.ext import Application
+
+SEGMENT_SUFFIX = ".zst"
+INDEX_SUFFIX = ".idx"
+
+
+class JournalFrame(NamedTuple):
+    segment: pathlib.Path
+    first_update_id: int
+    offset: int
+    count: int
+
+
+class UpdateJournal:
+    """
+    Writes the updates to the journal in the background.
+
+    Like the `UpdateIngestor`, `submit` only enqueues the update, a background task writes the
+    batches as soon as `batch_size` updates are waiting or `flush_interval_ms` elapsed. The file
+    writes run in a worker thread to keep the event loop free. Updates are dropped when the queue
+    is full.
+
+    Attributes:
+        directory (pathlib.Path): Directory of the segment and index files.
+        max_segment_bytes (int): Size above which a new segment is started.
+        max_segment_age (float): Seconds after which a new segment is started.
+        queue_size (int): Maximum number of updates held in memory.
+        batch_size (int): Number of updates per compressed frame, at most.
+        flush_interval (float): Maximum seconds an update waits before being written.
+        stats (dict): Counters of journaled and dropped updates, and of segments opened.
+
+    Methods:
+        submit(update): Enqueues an update.
+        post_init(application): Starts the writer task.
+        post_shutdown(application): Writes everything still queued and closes the segment.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_mb: int,
+        max_segment_age_s: int,
+        queue_size: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        compression_level: int,
+    ):
+        self.directory = pathlib.Path(directory)
+        self.max_segment_bytes = max_segment_mb * 1024 * 1024
+        self.max_segment_age = max_segment_age_s
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.stats = {"journaled": 0, "dropped": 0, "segments": 0}
+
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._segment = None
+        self._index = None
+        self._segment_opened_at = 0.0
+
+    async def submit(self, update: dict) -> None:
+        if self._queue is None or self._queue.full():
+            self.stats["dropped"] += 1
+            return
+        self._queue.put_nowait(update)
+
+    async def post_init(self, _: Application) -> None:
+        logger.info(f"Starting update journal in {self.directory}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer = asyncio.create_task(self._run())
+
+    async def post_shutdown(self, _: Application) -> None:
+        if self._writer is None:
+            return
+        await self._queue.put(None)
+        await self._writer
+        self._writer = None
+        await asyncio.to_thread(self._close_segment)
+        logger.info(f"Update journal stopped: {self.stats}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            update = await self._queue.get()
+            if update is None:
+                return
+            batch = [update]
+            deadline = loop.time() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    update = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if update is None:
+                    stop = True
+                    break
+                batch.append(update)
+            try:
+                await asyncio.to_thread(self._write_frame, batch)
+                self.stats["journaled"] += len(batch)
+            except OSError as e:
+                self.stats["dropped"] += len(batch)
+                logger.error(f"Failed to journal {len(batch)} updates: {e}")
+            if stop:
+                return
+
+    def _write_frame(self, batch: List[dict]) -> None:
+        first_update_id = batch[0]["update_id"]
+        if self._segment is None or self._segment_full():
+            self._close_segment()
+            self._open_segment(first_update_id)
+
+        payload = "\n".join(json.dumps(update, default=str) for update in batch)
+        offset = self._segment.tell()
+        self._segment.write(self._compressor.compress(payload.encode()))
+        self._segment.flush()
+        # Indexed only once the frame is written
+        self._index.write(f"{first_update_id} {offset} {len(batch)}\n")
+        self._index.flush()
+
+    def _segment_full(self) -> bool:
+        return (
+            self._segment.tell() >= self.max_segment_bytes
+            or time.monotonic() - self._segment_opened_at >= self.max_segment_age
+        )
+
+    def _open_segment(self, first_update_id: int) -> None:
+        # Named after their first update so that they sort in update order, the time tells apart
+        # the segments of a journal restarted on the same update
+        name = f"{first_update_id:020d}-{int(time.time())}"
+        self._segment = open(self.directory / f"{name}{SEGMENT_SUFFIX}", "ab")
+        self._index = open(self.directory / f"{name}{INDEX_SUFFIX}", "a")
+        self._segment_opened_at = time.monotonic()
+        self.stats["segments"] += 1
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        self._segment.close()
+        self._index.close()
+        self._segment = None
+        self._index = None
+
+
+class JournalReader:
+    """
+    Reads back the updates of a journal, in order.
+
+    Methods:
+        frames(): The indexed frames of every segment.
+        read(after_update_id): Yields the journaled update dicts, skipping the frames entirely
+            before `after_update_id` without decompressing them.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = pathlib.Path(directory)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def frames(self) -> List[JournalFrame]:
+        frames = []
+        for index_path in sorted(self.directory.glob(f"*{INDEX_SUFFIX}")):
+            segment = index_path.with_suffix(SEGMENT_SUFFIX)
+            with open(index_path) as index:
+                for line in index:
+                    fields = line.split()
+                    # Ignores a line torn by a crash
+                    if len(fields) != 3:
+                        continue
+                    first_update_id, offset, count = map(int, fields)
+                    frames.append(JournalFrame(segment, first_update_id, offset, count))
+        return frames
+
+    def read(self, after_update_id: Optional[int] = None) -> Iterator[dict]:
+        frames = self.frames()
+        for i, frame in enumerate(frames):
+            next_frame = frames[i + 1] if i + 1 < len(frames) else None
+            # The frame only holds updates older than the next one's first when both are in the same
+            # segment, written in order by a single process
+            if (
+                after_update_id is not None
+                and next_frame is not None
+                and next_frame.segment == frame.segment
+                and next_frame.first_update_id <= after_update_id
+            ):
+                continue
+            for update in self._read_frame(frame, next_frame):
+                if after_update_id is None or update["update_id"] > after_update_id:
+                    yield update
+
+    def _read_frame(
+        self, frame: JournalFrame, next_frame: Optional[JournalFrame]
+    ) -> Iterator[dict]:
+        with open(frame.segment, "rb") as segment:
+            segment.seek(frame.offset)
+            if next_frame is not None and next_frame.segment == frame.segment:
+                data = segment.read(next_frame.offset - frame.offset)
+            else:
+                data = segment.read()
+        # Decompresses a single frame, anything after it (e.g. a torn frame) is left out
+        payload = self._decompressor.decompressobj().decompress(data)
+        for line in payload.decode().splitlines():
+            yield json.loads(line)
+
+
+def dump(directory: str, after_update_id: Optional[int]) -> None:
+    for update in JournalReader(directory).read(after_update_id):
+        sys.stdout.write(json.dumps(update) + "\n")
+
+
+async def backfill(
+    directory: str, db_auth: dict, after_update_id: Optional[int], batch_size: int
+) -> None:
+    """Writes the users and messages of the journaled updates into the database"""
+    from . import async_utils as tldb
+    from .database import extract_message_record, extract_user_and_message
+    from .pool import DatabasePool
+
+    db_pool = DatabasePool(**db_auth, min_size=1, max_size=1, timeout=30.0)
+    await db_pool.post_init(None)
+    users, messages, count = {}, [], 0
+    try:
+        for update_dict in JournalReader(directory).read(after_update_id):
+            update = Update.de_json(update_dict, None)
+            user, message = extract_user_and_message(update)
+            if not (user and message):
+                continue
+            users[user.id] = (user.id, user.username, user.first_name, user.last_name)
+            message_record = extract_message_record(update, user, message)
+            if message_record:
+                messages.append(tuple(message_record))
+            if len(users) + len(messages) >= batch_size:
+                await tldb.insert_users_and_messages(list(users.values()), messages, db_pool)
+                count += len(messages)
+                users, messages = {}, []
+        if users or messages:
+            await tldb.insert_users_and_messages(list(users.values()), messages, db_pool)
+            count += len(messages)
+    finally:
+        await db_pool.post_shutdown(None)
+    logger.info(f"Backfilled {count} messages")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reads the update journal")
+    parser.add_argument("command", choices=["dump", "backfill"])
+    parser.add_argument("-d", "--directory", required=True, help="Journal directory")
+    parser.add_argument(
+        "-a", "--after", type=int, help="Only the updates after this update_id"
+    )
+    parser.add_argument(
+        "-c",
+        "--app_config_path",
+        help="Application base configuration path, for backfill",
+        default="/app/config/dev",
+    )
+    parser.add_argument(
+        "-b", "--batch_size", type=int, default=500, help="Rows per backfill batch"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "dump":
+        dump(args.directory, args.after)
+        return
+
+    from ..core.bot_config_manager import load_database_config
+
+    database_config = load_database_config(
+        pathlib.Path(args.app_config_path) / "database.yaml"
+    )
+    db_auth = {
+        "host": database_config.host,
+        "dbname": database_config.dbname,
+        "user": database_config.user,
+        "port": database_config.port,
+        "password": database_config.secret.password.get_secret_value(),
+    }
+    asyncio.run(backfill(args.directory, db_auth, args.after, args.batch_size))
@@ -0,0 +1,341 @@
+"""
+Versioned migrations of the PostgreSQL schema.
+
+Every migration has a version number, the applied versions are recorded in the `schema_migrations`
+table. Applying the migrations is serialised across processes with an advisory lock, so several
+bot instances (or the CLI and a bot) starting at the same time never run the same migration twice.
+
+Usage: telefix-migrate -c /app/config/dev [--target VERSION] [--status]
+"""
+
+import argparse
+import asyncio
+import pathlib
+import re
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+import psycopg
+from psycopg import sql
+from telegram.ext import Application
+
+from ..common.types import StdModuleType
+from .pool import DatabasePool
+
+# Arbitrary application wide key of the advisory lock taken while migrating
+MIGRATION_LOCK_KEY = 7_202_310
+
+_CONCURRENT_INDEX = re.compile(
+    r"create (?:unique )?index concurrently if not exists (\w+)", re.IGNORECASE
+)
+
+
+class Migration(NamedTuple):
+    """
+    A schema change.
+
+    Transactional migrations are applied atomically together with their version record.
+    Migrations that cannot run inside a transaction block (e.g. CREATE INDEX CONCURRENTLY) are run
+    statement by statement, so they must be written to be re-runnable. A failed or cancelled
+    CREATE INDEX CONCURRENTLY leaves an invalid index behind, which IF NOT EXISTS would keep: it is
+    dropped before the statement is run again.
+    """
+
+    version: int
+    name: str
+    statements: Tuple[str, ...]
+    transactional: bool = True
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        1,
+        "initial schema",
+        (
+            "create table if not exists users ("
+            "user_id bigint primary key, "
+            "user_name text, "
+            "first_name text, "
+            "last_name text, "
+            "phone_number text, "
+            "join_date timestamp default now())",
+            "create table if not exists customers ("
+            "customer_id bigint primary key, "
+            "warning smallint default 0)",
+            "create table if not exists contractors ("
+            "contractor_id bigint primary key, "
+            "warning smallint default 0)",
+            "create table if not exists orders ("
+            "order_id serial primary key, "
+            "customer_id bigint, "
+            "contractor_id bigint, "
+            "os text, "
+            "device text, "
+            "category text, "
+            "problem text, "
+            "created_at timestamp default now(), "
+            "completed smallint default 0, "
+            "completed_date timestamp)",
+            "create table if not exists assign ("
+            "assign_id serial primary key, "
+            "old_contractor_id bigint, "
+            "order_id integer, "
+            "new_contractor_id bigint, "
+            "assign_date timestamp default now())",
+            "create table if not exists messages ("
+            "message_id bigint primary key, "
+            "user_id bigint, "
+            "message_text text, "
+            "created_at timestamp default now())",
+            # Databases created before the migrations may lack the columns the indexes rely on.
+            # The default is set separately, so that the existing messages are left undated
+            # rather than all dated by the migration
+            "alter table messages add column if not exists created_at timestamp",
+            "alter table messages alter column created_at set default now()",
+            "alter table orders add column if not exists completed smallint default 0",
+        ),
+    ),
+    Migration(
+        2,
+        "performance indexes",
+        (
+            "create index concurrently if not exists orders_customer_contractor_idx "
+            "on orders (customer_id, contractor_id, order_id)",
+            "create index concurrently if not exists orders_open_idx "
+            "on orders (order_id) where completed = 0 and contractor_id is null",
+            "create index concurrently if not exists orders_assigned_idx "
+            "on orders (order_id) where completed = 0 and contractor_id is not null",
+            "create index concurrently if not exists orders_contractor_open_idx "
+            "on orders (contractor_id, order_id) where completed = 0",
+            "create index concurrently if not exists messages_user_created_idx "
+            "on messages (user_id, created_at)",
+            "create index concurrently if not exists assign_order_idx "
+            "on assign (order_id)",
+            "create index concurrently if not exists users_join_date_idx "
+            "on users (join_date desc nulls last)",
+        ),
+        transactional=False,
+    ),
+    Migration(
+        3,
+        "contractors change notifications",
+        (
+            "create or replace function notify_contractors_changed() returns trigger as $$ "
+            "begin perform pg_notify('contractors_changed', ''); return null; end; "
+            "$$ language plpgsql",
+            "drop trigger if exists contractors_changed on contractors",
+            "create trigger contractors_changed "
+            "after insert or update or delete or truncate on contractors "
+            "for each statement execute procedure notify_contractors_changed()",
+        ),
+    ),
+    Migration(
+        4,
+        "messages keyed by chat and update kind",
+        (
+            "alter table messages add column if not exists chat_id bigint",
+            "alter table messages add column if not exists update_kind text not null default 'message'",
+            # Messages were only collected from private chats, where the chat is the user
+            "update messages set chat_id = user_id where chat_id is null",
+            "alter table messages alter column chat_id set not null",
+            "alter table messages drop constraint if exists messages_pkey",
+            "alter table messages add primary key (chat_id, message_id, update_kind)",
+        ),
+    ),
+    Migration(
+        5,
+        "export date range indexes",
+        (
+            # Rows are inserted in date order, BRIN indexes serve the exports' date ranges for a
+            # fraction of the size and write cost of B-trees
+            "create index concurrently if not exists messages_created_brin "
+            "on messages using brin (created_at)",
+            # Databases adopted by the first migration may lack the column, it is added here so
+            # that those which already ran it get it too. Without a default at first, the
+            # existing orders staying undated instead of all falling on the migration's day
+            "alter table orders add column if not exists created_at timestamp",
+            "alter table orders alter column created_at set default now()",
+            "create index concurrently if not exists orders_created_brin "
+            "on orders using brin (created_at)",
+        ),
+        transactional=False,
+    ),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version(conn: psycopg.AsyncConnection) -> int:
+    """Returns the latest applied migration version, 0 for an empty database"""
+    await conn.execute(
+        "create table if not exists schema_migrations ("
+        "version integer primary key, "
+        "name text not null, "
+        "applied_at timestamp not null default now())"
+    )
+    result = await conn.execute("select max(version) from schema_migrations")
+    return (await result.fetchone())[0] or 0
+
+
+async def apply_migrations(
+    conn: psycopg.AsyncConnection, target: Optional[int] = None
+) -> List[Migration]:
+    """
+    Applies the pending migrations up to `target`, the latest one by default.
+
+    Parameters:
+    - conn : psycopg.AsyncConnection : A connection in autocommit mode.
+    - target : Optional[int] : Version to migrate to.
+
+    Returns:
+    - List[Migration] : The migrations applied.
+
+    Raises:
+    - psycopg.Error: Raised when a migration fails, the migrations applied before it are kept.
+    """
+    target = LATEST_VERSION if target is None else target
+    applied = []
+
+    await conn.execute("select pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    try:
+        # Read under the lock, another process may just have migrated
+        current = await get_schema_version(conn)
+        for migration in MIGRATIONS:
+            if not current < migration.version <= target:
+                continue
+            logger.info(f"Applying migration {migration.version}: {migration.name}")
+            if migration.transactional:
+                async with conn.transaction():
+                    for statement in migration.statements:
+                        await conn.execute(statement)
+                    await _record(conn, migration)
+            else:
+                for statement in migration.statements:
+                    await _drop_invalid_index(conn, statement)
+                    await conn.execute(statement)
+                await _record(conn, migration)
+            applied.append(migration)
+    finally:
+        await conn.execute("select pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+
+    return applied
+
+
+async def _drop_invalid_index(conn: psycopg.AsyncConnection, statement: str) -> None:
+    """Drops the index a CREATE INDEX CONCURRENTLY statement creates, if left invalid"""
+    match = _CONCURRENT_INDEX.match(statement)
+    if match is None:
+        return
+    result = await conn.execute(
+        "select not indisvalid from pg_index where indexrelid = to_regclass(%s)",
+        (match.group(1),),
+    )
+    row = await result.fetchone()
+    if row is not None and row[0]:
+        logger.warning(f"Dropping the invalid index {match.group(1)} left by a failed build")
+        await conn.execute(
+            sql.SQL("drop index concurrently if exists {}").format(
+                sql.Identifier(match.group(1))
+            )
+        )
+
+
+async def _record(conn: psycopg.AsyncConnection, migration: Migration) -> None:
+    await conn.execute(
+        "insert into schema_migrations (version, name) values (%s, %s)",
+        (migration.version, migration.name),
+    )
+
+
+class SchemaMigrator:
+    """
+    Checks the schema version at startup, and brings it up to date if configured to.
+
+    Uses its own connection instead of the pool since the migrations need autocommit and
+    session level advisory locks. Must be listed after the `DatabasePool` and before the modules
+    querying the database.
+
+    Attributes:
+        db_pool (DatabasePool): The pool whose connection parameters are used.
+        apply_on_startup (bool): Applies the pending migrations if True, only reports them otherwise.
+        version (int): The schema version after startup, None before.
+
+    Methods:
+        post_init(application): Applies or reports the pending migrations.
+    """
+
+    TYPE = StdModuleType.SCHEMA_MIGRATOR
+
+    def __init__(self, db_pool: DatabasePool, apply_on_startup: bool):
+        self.db_pool = db_pool
+        self.apply_on_startup = apply_on_startup
+        self.version: Optional[int] = None
+
+    async def post_init(self, _: Application) -> None:
+        try:
+            async with await psycopg.AsyncConnection.connect(
+                **self.db_pool.db_auth, autocommit=True
+            ) as conn:
+                if self.apply_on_startup:
+                    await apply_migrations(conn)
+                self.version = await get_schema_version(conn)
+        except psycopg.Error as e:
+            logger.error(f"Schema migration failed: {e}")
+            return
+
+        if self.version < LATEST_VERSION:
+            logger.warning(
+                f"Database schema at version {self.version}, latest is {LATEST_VERSION}. "
+                f"Run telefix-migrate to update it"
+            )
+        else:
+            logger.info(f"Database schema at version {self.version}")
+
+
+async def _migrate(db_auth: dict, target: Optional[int], status: bool) -> None:
+    async with await psycopg.AsyncConnection.connect(**db_auth, autocommit=True) as conn:
+        if not status:
+            applied = await apply_migrations(conn, target)
+            logger.info(f"{len(applied)} migration(s) applied")
+        version = await get_schema_version(conn)
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version <= version else "pending"
+            logger.info(f"{migration.version:>4} {migration.name}: {state}")
+
+
+def main(argv=None):
+    from ..core.bot_config_manager import load_database_config
+
+    parser = argparse.ArgumentParser(description="Migrates the database schema")
+    parser.add_argument(
+        "-c",
+        "--app_config_path",
+        help="Application base configuration path",
+        default="/app/config/dev",
+    )
+    parser.add_argument(
+        "-t", "--target", type=int, help="Version to migrate to, the latest by default"
+    )
+    parser.add_argument(
+        "-s", "--status", action="store_true", help="Only lists the migrations state"
+    )
+    args = parser.parse_args(argv)
+
+    database_config = load_database_config(
+        pathlib.Path(args.app_config_path) / "database.yaml"
+    )
+    db_auth = {
+        "host": database_config.host,
+        "dbname": database_config.dbname,
+        "user": database_config.user,
+        "port": database_config.port,
+        "password": database_config.secret.password.get_secret_value(),
+    }
+
+    try:
+        asyncio.run(_migrate(db_auth, args.target, args.status))
+    except psycopg.Error as e:
+        logger.error(f"Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,191 @@
+from enum import Enum
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from ..common.types import StdModuleType
+from .pool import DatabasePool
+
+
+class ReassignOutcome(Enum):
+    ASSIGNED = 0
+    # This exact reassignment was already recorded
+    ALREADY_ASSIGNED = 1
+    # The order is completed, no longer held by the old contractor, or being reassigned concurrently
+    UNAVAILABLE = 2
+
+
+# Every step is a CTE of the same statement: one round trip and one transaction.
+# The order row is locked with SKIP LOCKED so a concurrent reassignment of the same order finds no
+# row instead of waiting for the other transaction, and reports UNAVAILABLE.
+REASSIGN_ORDER_QUERY = (
+    "with target as ("
+    "select order_id from orders "
+    "where order_id = %(order_id)s and contractor_id = %(old_contractor_id)s and completed = 0 "
+    "for update skip locked), "
+    "previous as ("
+    "select 1 from assign "
+    "where order_id = %(order_id)s and old_contractor_id = %(old_contractor_id)s "
+    "and new_contractor_id = %(new_contractor_id)s limit 1), "
+    "updated as ("
+    "update orders set contractor_id = %(new_contractor_id)s "
+    "where order_id in (select order_id from target) and not exists (select 1 from previous) "
+    "returning order_id), "
+    "audit as ("
+    "insert into assign (old_contractor_id, order_id, new_contractor_id) "
+    "select %(old_contractor_id)s, order_id, %(new_contractor_id)s from updated "
+    "returning assign_id) "
+    "select exists (select 1 from audit), exists (select 1 from previous)"
+)
+
+
+class OrderRepository:
+    """
+    Data access for the `orders` table, written so every query is served by an index.
+
+    Listings use keyset pagination: a page is requested with the last `order_id` of the previous
+    page instead of an offset, so fetching any page costs the same regardless of the table size.
+    The partial indexes matching the `completed = 0` predicates of the queries below are created by
+    the "performance indexes" migration.
+
+    Reassignments go through `reassign_order`, a single statement locking the order row so that
+    concurrent `/assign` answers can neither assign an order twice nor wait on each other.
+
+    Attributes:
+        db_pool (DatabasePool): The application's connection pool.
+        page_size (int): Default number of orders returned per listing page.
+
+    Methods:
+        insert_new_order(user_id, device_context, default_contractor_id): Creates an order, returns its id.
+        get_customer_last_order_id(user_id, contractor_id): Id of the customer's latest order.
+        get_order_data(order_id): Full row of an order.
+        get_open_orders(after_order_id, limit): Page of open orders without contractor.
+        get_assigned_orders(after_order_id, limit, contractor_id): Page of open orders with a contractor.
+        update_order_complete(order_id, timestamp): Marks an order as completed.
+        reassign_order(order_id, old_contractor_id, new_contractor_id): Moves an order to another contractor.
+    """
+
+    TYPE = StdModuleType.ORDER_REPOSITORY
+
+    def __init__(self, db_pool: DatabasePool, page_size: int = 50):
+        self.db_pool = db_pool
+        self.page_size = page_size
+
+    async def insert_new_order(
+        self, user_id: int, device_context: List, default_contractor_id: int
+    ) -> int:
+        logger.debug(" ")
+
+        # Check the length of device_context and assign default values if necessary
+        os_ = device_context[0] if len(device_context) > 0 else None
+        device = device_context[1] if len(device_context) > 1 else None
+        category = device_context[2] if len(device_context) > 2 else None
+        problem = device_context[-1] if len(device_context) > 3 else None
+
+        async with self.db_pool.connection() as conn:
+            result = await conn.execute(
+                "insert into orders (customer_id, contractor_id, os, device, category, problem) "
+                "values (%s, %s, %s, %s, %s, %s) returning order_id",
+                (user_id, default_contractor_id, os_, device, category, problem),
+            )
+            return (await result.fetchone())[0]
+
+    async def get_customer_last_order_id(
+        self, user_id: int, contractor_id: int
+    ) -> Optional[int]:
+        logger.debug(" ")
+        async with self.db_pool.connection() as conn:
+            result = await conn.execute(
+                "select order_id from orders where customer_id = %s and contractor_id = %s "
+                "order by order_id desc limit 1",
+                (user_id, contractor_id),
+            )
+            order = await result.fetchone()
+            return order[0] if order else None
+
+    async def get_order_data(self, order_id: int) -> Optional[Tuple]:
+        logger.debug(" ")
+        async with self.db_pool.connection() as conn:
+            result = await conn.execute(
+                "select * from orders where order_id = %s", (order_id,)
+            )
+            return await result.fetchone()
+
+    async def get_open_orders(
+        self, after_order_id: int = 0, limit: Optional[int] = None
+    ) -> List[Tuple]:
+        """Returns the open orders without contractor with an id above `after_order_id`, oldest first"""
+        logger.debug(" ")
+        async with self.db_pool.connection() as conn:
+            result = await conn.execute(
+                "select * from orders where completed = 0 and contractor_id is null "
+                "and order_id > %s order by order_id limit %s",
+                (after_order_id, limit or self.page_size),
+            )
+            return await result.fetchall()
+
+    async def get_assigned_orders(
+        self,
+        after_order_id: int = 0,
+        limit: Optional[int] = None,
+        contractor_id: Optional[int] = None,
+    ) -> List[Tuple]:
+        """
+        Returns the open orders assigned to a contractor with an id above `after_order_id`, oldest first.
+        Only the orders of `contractor_id` are returned if given.
+        """
+        logger.debug(" ")
+        async with self.db_pool.connection() as conn:
+            if contractor_id is None:
+                result = await conn.execute(
+                    "select * from orders where completed = 0 and contractor_id is not null "
+                    "and order_id > %s order by order_id limit %s",
+                    (after_order_id, limit or self.page_size),
+                )
+            else:
+                result = await conn.execute(
+                    "select * from orders where completed = 0 and contractor_id = %s "
+                    "and order_id > %s order by order_id limit %s",
+                    (contractor_id, after_order_id, limit or self.page_size),
+                )
+            return await result.fetchall()
+
+    async def update_order_complete(self, order_id: int, timestamp: str) -> None:
+        logger.debug(" ")
+        async with self.db_pool.connection() as conn:
+            await conn.execute(
+                "update orders set completed = %s, completed_date = %s where order_id = %s",
+                (1, timestamp, order_id),
+            )
+
+    async def reassign_order(
+        self, order_id: int, old_contractor_id: int, new_contractor_id: int
+    ) -> ReassignOutcome:
+        """
+        Moves an order from a contractor to another one and records the move in `assign`, atomically.
+
+        Parameters:
+        - order_id : int : The order to reassign.
+        - old_contractor_id : int : The contractor currently holding the order.
+        - new_contractor_id : int : The contractor taking the order over.
+
+        Returns:
+        - ReassignOutcome : ASSIGNED if the order was moved, why it was not otherwise.
+        """
+        logger.debug(" ")
+        async with self.db_pool.connection() as conn:
+            result = await conn.execute(
+                REASSIGN_ORDER_QUERY,
+                {
+                    "order_id": order_id,
+                    "old_contractor_id": old_contractor_id,
+                    "new_contractor_id": new_contractor_id,
+                },
+            )
+            assigned, previous = await result.fetchone()
+
+        if assigned:
+            return ReassignOutcome.ASSIGNED
+        if previous:
+            return ReassignOutcome.ALREADY_ASSIGNED
+        return ReassignOutcome.UNAVAILABLE
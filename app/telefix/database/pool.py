@@ -0,0 +1,79 @@
+from typing import Optional
+
+from loguru import logger
+
+from psycopg_pool import AsyncConnectionPool
+from telegram.ext import Application
+
+from ..common.types import StdModuleType
+
+
+class DatabasePool:
+    """
+    Owns the asynchronous PostgreSQL connection pool shared by the whole application.
+
+    The pool is created empty and is only opened in `post_init`, once the application's event loop
+    is running, and closed again in `post_shutdown`. Connections are borrowed with `connection()`
+    which commits on success and rolls back on error, then returns the connection to the pool.
+
+    Attributes:
+        db_auth (dict): Connection parameters passed to every new connection.
+        min_size (int): Number of connections kept open at all times.
+        max_size (int): Upper bound of connections opened under load.
+        timeout (float): Seconds to wait for a free connection before failing.
+
+    Methods:
+        connection(): Async context manager yielding a pooled connection.
+        post_init(application): Opens the pool.
+        post_shutdown(application): Closes the pool.
+    """
+
+    TYPE = StdModuleType.DATABASE
+
+    def __init__(
+        self,
+        host: str,
+        dbname: str,
+        user: str,
+        port: int,
+        password: str,
+        min_size: int,
+        max_size: int,
+        timeout: float,
+    ):
+        self.db_auth = {
+            "host": host,
+            "dbname": dbname,
+            "user": user,
+            "port": port,
+            "password": password,
+        }
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._pool: Optional[AsyncConnectionPool] = None
+
+    def connection(self):
+        if self._pool is None:
+            raise RuntimeError("Database pool used before being opened")
+        return self._pool.connection()
+
+    async def post_init(self, _: Application) -> None:
+        logger.info(
+            f"Opening database pool (min_size={self.min_size}, max_size={self.max_size})"
+        )
+        self._pool = AsyncConnectionPool(
+            kwargs=self.db_auth,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            timeout=self.timeout,
+            open=False,
+        )
+        await self._pool.open()
+
+    async def post_shutdown(self, _: Application) -> None:
+        if self._pool is None:
+            return
+        logger.info("Closing database pool")
+        await self._pool.close()
+        self._pool = None
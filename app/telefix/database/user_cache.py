@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from loguru import logger
+
+import psycopg
+from telegram.ext import Application
+
+from . import async_utils as tldb
+from .pool import DatabasePool
+
+UserNames = Tuple[Optional[str], str, Optional[str]]
+
+
+class KnownUserCache:
+    """
+    Process-level LRU of the users already stored in the database, with their current names.
+
+    Lets `collect_data` skip the database entirely for established users: a user is only written
+    again when they are unknown to the cache or when their username, first or last name changed.
+    Entries are added once the ingestion pipeline actually wrote them, so a failed batch is retried
+    with the next update of that user.
+
+    Attributes:
+        db_pool (DatabasePool): Pool used to warm the cache up at startup.
+        max_size (int): Maximum number of users kept, the least recently seen are evicted first.
+        warm_up_size (int): Number of most recently joined users loaded at startup.
+        stats (dict): Counters of hits, misses and evictions.
+
+    Methods:
+        is_known(user_id, names): Checks if the user is stored with the given names.
+        add(user_id, names): Records the user as stored with the given names.
+        hit_rate(): Share of lookups answered by the cache.
+        post_init(application): Warms the cache up from the database.
+    """
+
+    def __init__(self, db_pool: DatabasePool, max_size: int, warm_up_size: int):
+        self.db_pool = db_pool
+        self.max_size = max_size
+        self.warm_up_size = warm_up_size
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._users: "OrderedDict[int, UserNames]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def is_known(self, user_id: int, names: UserNames) -> bool:
+        if self._users.get(user_id) == names:
+            self._users.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return True
+        self.stats["misses"] += 1
+        return False
+
+    def add(self, user_id: int, names: UserNames) -> None:
+        self._users[user_id] = names
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    async def post_init(self, _: Application) -> None:
+        try:
+            users = await tldb.get_recent_users(
+                min(self.warm_up_size, self.max_size), self.db_pool
+            )
+        except psycopg.Error as e:
+            logger.error(f"Known user cache warm up failed, starting empty: {e}")
+            return
+        # Oldest first so the most recent users end up as the most recently used entries
+        for user_id, user_name, first_name, last_name in reversed(users):
+            self.add(user_id, (user_name, first_name, last_name))
+        logger.info(f"Known user cache warmed up with {len(self)} users")
+
+    async def post_shutdown(self, _: Application) -> None:
+        logger.info(
+            f"Known user cache: {len(self)} users, hit rate {self.hit_rate():.2%}, {self.stats}"
+        )
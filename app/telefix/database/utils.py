@@ -1,5 +1,3 @@
-from contextlib import closing
-
 import os
 from loguru import logger
 from pprint import pformat
@@ -19,15 +17,29 @@ def create_db_connection(db_auth):
     return psycopg.connect(**db_auth)
 
 
+USER_UPSERT_QUERY = (
+    "insert into users (user_id, user_name, first_name, last_name) values (%s, %s, %s, %s) "
+    "on conflict (user_id) do update set "
+    "user_name = excluded.user_name, first_name = excluded.first_name, last_name = excluded.last_name "
+    "where (users.user_name, users.first_name, users.last_name) "
+    "is distinct from (excluded.user_name, excluded.first_name, excluded.last_name)"
+)
+
+MESSAGE_INSERT_QUERY = (
+    "insert into messages (chat_id, message_id, update_kind, user_id, message_text) "
+    "values (%s, %s, %s, %s, %s) "
+    "on conflict (chat_id, message_id, update_kind) do nothing"
+)
+
+
 def insert_new_user(
     user_id: int, user_name: str, first_name: str, last_name: str, db_auth: dict
 ) -> None:
     """
-    Inserts a new user into the database if the user does not already exist.
+    Inserts a new user into the database, or refreshes their names if they changed.
 
-    This function checks if a user with the provided user_id already exists in the database.
-    If the user does not exist, it inserts the new user with the provided information into the users table.
-    If the user already exists, a debug log message is recorded.
+    This is a single upsert statement: if a user with the provided user_id already exists, their
+    username, first and last name are updated, but only when at least one of them differs.
 
     Parameters:
     - user_id : int : The unique identifier of the user.
@@ -46,17 +58,10 @@ def insert_new_user(
     try:
         with create_db_connection(db_auth) as conn:
             cursor = conn.cursor()
-            result = cursor.execute(
-                "select * from users where user_id = %s", (user_id,)
+            cursor.execute(
+                USER_UPSERT_QUERY, (user_id, user_name, first_name, last_name)
             )
-            if result.fetchone() is None:
-                cursor.execute(
-                    "insert into users (user_id, user_name, first_name, last_name) values (%s, %s, %s, %s);",
-                    (user_id, user_name, first_name, last_name),
-                )
-                conn.commit()
-            else:
-                logger.debug("Customer already in Database")
+            conn.commit()
     except psycopg.Error as e:
         logger.error(e)
 
@@ -105,18 +110,17 @@ def get_customer_last_order_id(user_id: int, contractor_id: int, db_auth: dict)
     with create_db_connection(db_auth) as conn:
         cursor = conn.cursor()
         result = cursor.execute(
-            "select * from orders where (customer_id = %s and contractor_id = %s)",
+            "select order_id from orders where customer_id = %s and contractor_id = %s "
+            "order by order_id desc limit 1",
             (user_id, contractor_id),
         )
-        orders = result.fetchall()
-        logger.debug(f"orders: {orders}")
 
-        return orders[-1][0]
+        return result.fetchone()[0]
 
 
 def insert_new_order(
     user_id: int, device_context: List, default_contractor_id: int, db_auth: dict
-) -> None:
+) -> int:
     logger.debug(" ")
 
     with create_db_connection(db_auth) as conn:
@@ -128,13 +132,16 @@ def insert_new_order(
         category = device_context[2] if len(device_context) > 2 else None
         problem = device_context[-1] if len(device_context) > 3 else None
 
-        cursor.execute(
+        result = cursor.execute(
             "insert into orders (customer_id, contractor_id, os, device, category, problem) "
-            "values (%s, %s, %s, %s, %s, %s);",
+            "values (%s, %s, %s, %s, %s, %s) returning order_id;",
             (user_id, default_contractor_id, os_, device, category, problem),
         )
+        order_id = result.fetchone()[0]
         conn.commit()
 
+        return order_id
+
 
 def get_order_data(order_id: int, db_auth: dict) -> List:
     logger.debug(" ")
@@ -243,74 +250,40 @@ def check_assign(
         return bool(result.fetchone())
 
 
-def insert_message(message_id: int, user_id: int, text: str, db_auth: dict) -> None:
+def insert_message(
+    chat_id: int,
+    message_id: int,
+    update_kind: str,
+    user_id: int,
+    text: str,
+    db_auth: dict,
+) -> None:
     """
     Inserts a message into the database.
 
-    This function handles the insertion of messages into the database called by the "data_collection" handler,
-    it also handles UniqueViolation error by incrementing the message_id and retries the insertion.
+    Messages are keyed by (chat_id, message_id, update_kind), so a message already stored is simply
+    skipped by the ON CONFLICT clause instead of raising and requiring a rollback.
 
     Parameters:
-    - message_id : int : The ID of the message.
+    - chat_id : int : The ID of the chat the message belongs to.
+    - message_id : int : The ID of the message in the chat.
+    - update_kind : str : The kind of update the text comes from, see `UpdateKind`.
     - user_id : int : The ID of the user who sent the message.
     - text : str : The text content of the message.
     - db_auth : dict : The database authentication credentials.
 
     Returns:
     - None
-
-    Raises:
-    - psycopg2.errors.UniqueViolation: Raised when a unique violation error occurs during insertion.
-    - Exception: Raised for unexpected errors during insertion.
     """
-
-    if (
-        not isinstance(message_id, int)
-        or not isinstance(user_id, int)
-        or not isinstance(text, str)
-    ):
-        logger.error("Invalid parameters")
-        return
-
     logger.debug(" ")
-    logger.debug(f"inserting: {message_id}, {user_id}, {text}")
+    logger.debug(f"inserting: {chat_id}, {message_id}, {update_kind}, {user_id}, {text}")
 
-    with closing(create_db_connection(db_auth)) as conn:
-        cursor = conn.cursor()
-
-        try:
-            # Try to insert the message
+    try:
+        with create_db_connection(db_auth) as conn:
+            cursor = conn.cursor()
             cursor.execute(
-                "insert into messages (message_id, user_id, message_text) values (%s, %s, %s)",
-                (message_id, user_id, text),
+                MESSAGE_INSERT_QUERY, (chat_id, message_id, update_kind, user_id, text)
             )
-            # If successful, commit the transaction
             conn.commit()
-        # TODO: Needs to handle InlineButton Callbacks that send a new message using the same message_id
-        # this hotfix works for now but needs to be improved
-        except psycopg.errors.UniqueViolation:
-            # Rollback the transaction
-            conn.rollback()
-
-            # Increment the message_id
-            message_id += 1
-            logger.debug(
-                f"UniqueViolation occurred. Retrying with incremented message_id {message_id}"
-            )
-
-            # Try to insert the message again
-            try:
-                cursor.execute(
-                    "insert into messages (message_id, user_id, message_text) values (%s, %s, %s)",
-                    (message_id, user_id, text),
-                )
-                # Commit the transaction
-                conn.commit()
-            except Exception as ex:
-                # Handle or log any exception that occurred in the second attempt
-                logger.debug(f"An error occurred during retry: {ex}")
-
-        except Exception as ex:
-            # Handle or log any other exception
-            logger.debug(f"An unexpected error occurred: {ex}")
-            conn.rollback()
+    except psycopg.Error as e:
+        logger.error(e)
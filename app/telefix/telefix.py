@@ -3,6 +3,8 @@
 import argparse
 import pathlib
 import sys
+from functools import partial
+from typing import Optional
 from warnings import filterwarnings
 
 from loguru import logger
@@ -10,51 +12,45 @@ from loguru import logger
 from telegram.warnings import PTBUserWarning
 
 from .common.logging import setup_logging
+from .common.startup import STARTUP_TIMELINE
+from .core.config_template import AppConfig
+from .core.sharding import Shard
+from .core.supervisor import ShardSupervisor
 
 from . import (
     BotLauncher,
     DatabaseHandler,
+    DatabasePool,
     ErrorHandler,
     GlobalFallbackHandler,
     load_config,
+    MaintenanceHandler,
     ModuleManager,
     PromptValidatorHandler,
     RequestHandler,
     RestartHandler,
+    SchemaMigrator,
     VectorDatabase,
     StartHandler,
     WikiHandler,
 )
 
 
-def main(argv=None):
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "-c",
-        "--app_config_path",
-        help="Application base configuration path",
-        default="/app/config/dev",
+def load_bot_config(app_config_path: pathlib.Path) -> AppConfig:
+    return load_config(
+        core=app_config_path / "core.yaml",
+        database=app_config_path / "database.yaml",
+        vector_database=app_config_path / "vector_database.yaml",
+        wiki=app_config_path / "wiki.yaml",
     )
-    parser.add_argument("-l", "--log_level", help="Logging level", default="INFO")
-    args = parser.parse_args(argv or sys.argv)
 
-    setup_logging(args.log_level)
-
-    app_config_path = pathlib.Path(args.app_config_path)
-    logger.info(f"Application config path: {app_config_path}")
-
-    core_config = app_config_path / "core.yaml"
-    database_config = app_config_path / "database.yaml"
-    vector_database_config = app_config_path / "vector_database.yaml"
-    wiki_module_path = app_config_path / "wiki.yaml"
-
-    bot_config = load_config(
-        core=core_config,
-        database=database_config,
-        vector_database=vector_database_config,
-        wiki=wiki_module_path,
-    )
 
+def create_bot_launcher(
+    app_config_path: pathlib.Path,
+    bot_config: AppConfig,
+    log_level: str,
+    shard: Optional[Shard] = None,
+) -> BotLauncher:
     tg_modules = [
         GlobalFallbackHandler,
         StartHandler,
@@ -63,17 +59,70 @@ def main(argv=None):
         RequestHandler,
         PromptValidatorHandler,
         DatabaseHandler,
+        MaintenanceHandler,
         ErrorHandler,
     ]
-    std_modules = [VectorDatabase]
-    module_manager = ModuleManager(
-        tg_modules, std_modules, bot_config, args.log_level
-    )
+    std_modules = [
+        VectorDatabase,
+        DatabasePool,
+        SchemaMigrator,
+        # ContractorRegistry and OrderRepository serve the contractor handlers, to be added once
+        # they are registered
+    ]
+    module_manager = ModuleManager(tg_modules, std_modules, bot_config, log_level)
 
     # Ignore "per_message=False" ConversationHandler warning message
     filterwarnings(
         action="ignore", message=r".*CallbackQueryHandler", category=PTBUserWarning
     )
 
-    bot_launcher = BotLauncher(bot_config, module_manager, args.log_level)
+    return BotLauncher(
+        bot_config,
+        module_manager,
+        log_level,
+        shard,
+        config_loader=partial(load_bot_config, app_config_path),
+    )
+
+
+def run_shard(app_config_path: str, log_level: str, shard: Shard) -> None:
+    """Runs the bot of a shard, in a worker process of the ShardSupervisor"""
+    setup_logging(log_level)
+    app_config_path = pathlib.Path(app_config_path)
+    bot_config = load_bot_config(app_config_path)
+    STARTUP_TIMELINE.mark("config loaded")
+    create_bot_launcher(app_config_path, bot_config, log_level, shard).launch()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c",
+        "--app_config_path",
+        help="Application base configuration path",
+        default="/app/config/dev",
+    )
+    parser.add_argument("-l", "--log_level", help="Logging level", default="INFO")
+    args = parser.parse_args(argv or sys.argv)
+
+    setup_logging(args.log_level)
+    STARTUP_TIMELINE.mark("package imported")
+
+    app_config_path = pathlib.Path(args.app_config_path)
+    logger.info(f"Application config path: {app_config_path}")
+
+    bot_config = load_bot_config(app_config_path)
+    STARTUP_TIMELINE.mark("config loaded")
+
+    if bot_config.core.workers > 1:
+        logger.info(f"Running {bot_config.core.workers} workers")
+        supervisor = ShardSupervisor(
+            bot_config,
+            partial(run_shard, str(app_config_path), args.log_level),
+            bot_config.core.workers,
+        )
+        supervisor.launch()
+        return
+
+    bot_launcher = create_bot_launcher(app_config_path, bot_config, args.log_level)
     bot_launcher.launch()
@@ -2,8 +2,8 @@ import pathlib
 from dataclasses import dataclass, field
 from typing import List
 
-from app.telefix.core.data_reader import ChatGPTDataReader
-from app.telefix.common.helpers import num_tokens_from_string
+from ...core.data_reader import ChatGPTDataReader
+from ...common.helpers import num_tokens_from_string
 
 
 @dataclass
@@ -71,8 +71,10 @@ class ChatGPTConfig:
     deployment: str
     path: pathlib
     model: ChatGPTModelConfig = field(init=False)
-    messages: ChatGPTMessagesConfig = ChatGPTMessagesConfig()
-    checkout_variables: ChatGPTCheckoutVariables = ChatGPTCheckoutVariables()
+    messages: ChatGPTMessagesConfig = field(default_factory=ChatGPTMessagesConfig)
+    checkout_variables: ChatGPTCheckoutVariables = field(
+        default_factory=ChatGPTCheckoutVariables
+    )
 
     def __post_init__(self):
         self.model = ChatGPTModelConfig(deployment=self.deployment, path=self.path)
@@ -7,7 +7,8 @@ from telegram.ext import (
 
 from .config import ChatGPTConfig
 from .callback.handler import ChatGptCallbackHandler
-from app.telefix.common.types import TgHandlerPriority, TgModuleType
+from ...common.routing import text_filter
+from ...common.types import TgHandlerPriority, TgModuleType
 
 from .types import ChatGptCallbackType
 
@@ -17,19 +18,19 @@ class ChatGptHandler:
     COMMANDS = ["chat", "chat_stop"]
     MESSAGES = ["🤖Чат с подержкой", "❌Отменить"]
 
-    def __init__(self, deployment: str, media: str, ignored_texts_re):
+    def __init__(self, deployment: str, media: str, ignored_texts):
         config = ChatGPTConfig(deployment, media)
         callback_handler = ChatGptCallbackHandler(config)
 
         callback_start = callback_handler.get_callback(ChatGptCallbackType.START)
         self.handler_command = CommandHandler(self.COMMANDS[0], callback_start)
         self.handler_message = MessageHandler(
-            filters.Regex(rf"^({self.MESSAGES[0]})$"), callback_start
+            text_filter([self.MESSAGES[0]]), callback_start
         )
 
         callback_request = callback_handler.get_callback(ChatGptCallbackType.REQUEST)
         self.request_handler = MessageHandler(
-            filters.TEXT & ~(filters.Regex(ignored_texts_re) | filters.COMMAND),
+            filters.TEXT & ~(ignored_texts | filters.COMMAND),
             callback_request,
         )
 
@@ -37,7 +38,7 @@ class ChatGptHandler:
             ChatGptCallbackType.PAYMENT_LAUNCH
         )
         self.payment_yes_handler = MessageHandler(
-            filters.Regex(f"^{config.messages.confirm_payment}$"),
+            text_filter([config.messages.confirm_payment]),
             callback_payment_launch,
         )
         self.precheckout_handler = PreCheckoutQueryHandler(
@@ -51,7 +52,7 @@ class ChatGptHandler:
         callback_stop = callback_handler.get_callback(ChatGptCallbackType.STOP)
         self.stop_handler_command = CommandHandler(self.COMMANDS[1], callback_stop)
         self.stop_handler_message = MessageHandler(
-            filters.Regex(rf"^({self.MESSAGES[1]})$"), callback_stop
+            text_filter([self.MESSAGES[1]]), callback_stop
         )
 
         callback_check_remaining_tokens = callback_handler.get_callback(
@@ -1,7 +1,8 @@
-from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler
 
-from app.telefix.user.request.request import request, confirm_request, cancel_request
-from app.telefix.common.types import TgHandlerPriority, TgModuleType
+from .request import request, confirm_request, cancel_request
+from ...common.routing import CallbackQueryRouter, text_filter
+from ...common.types import TgHandlerPriority, TgModuleType
 
 
 class RequestHandler:
@@ -12,20 +13,17 @@ class RequestHandler:
     def __init__(self):
         self.request_command_handler = CommandHandler(self.COMMANDS[0], request)
         self.request_replykeyboard_handler = MessageHandler(
-            filters.Regex(rf"^({self.MESSAGES[0]})$"), request
+            text_filter([self.MESSAGES[0]]), request
         )
         self.request_callback_handler = CallbackQueryHandler(
             request, pattern="REQUEST_COMMAND"
         )
 
-        self.confirm_request_handler = CallbackQueryHandler(
-            confirm_request, pattern="REQUEST_CALL_CONFIRM"
-        )
-        self.cancel_request_handler = CallbackQueryHandler(
-            cancel_request, pattern="REQUEST_CALL_CANCEL"
-        )
+        self.request_call_router = CallbackQueryRouter()
+        self.request_call_router.add("REQUEST_CALL_CONFIRM", confirm_request)
+        self.request_call_router.add("REQUEST_CALL_CANCEL", cancel_request)
         self.cancel_request_handler_message = MessageHandler(
-            filters.Regex(rf"^({self.MESSAGES[1]})$"), cancel_request
+            text_filter([self.MESSAGES[1]]), cancel_request
         )
 
     def get_handlers(self):
@@ -33,8 +31,7 @@ class RequestHandler:
             TgHandlerPriority.CLIENT_BASIC: [
                 self.request_command_handler,
                 self.request_replykeyboard_handler,
-                self.confirm_request_handler,
-                self.cancel_request_handler,
+                self.request_call_router,
                 self.cancel_request_handler_message,
             ],
         }
@@ -5,6 +5,9 @@ from loguru import logger
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from ...common.message_ref import MessageRef, delete_messages
+from ...common.types import MessageKind
+
 
 async def request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Sends an Inline message to confirm the call"""
@@ -25,7 +28,9 @@ async def request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "Подтвердить вызов специалиста?",
         reply_markup=reply_markup,
     )
-    context.user_data["Request_temp_messages"].append(temp_message)
+    context.user_data["Request_temp_messages"].append(
+        MessageRef.from_message(temp_message, MessageKind.PROMPT)
+    )
 
 
 async def confirm_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -49,9 +54,8 @@ async def confirm_request(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await query.answer(text="Служба поддержки свяжется с вами.", show_alert=True)
 
     # cleaning
-    for message in context.user_data["Request_temp_messages"]:
-        await message.delete()
-        context.user_data["Request_temp_messages"] = []
+    await delete_messages(context.bot, context.user_data["Request_temp_messages"])
+    context.user_data["Request_temp_messages"] = []
 
 
 def get_order_message_str(
@@ -107,6 +111,5 @@ async def cancel_request(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         logger.info(f"({user.id}, {user.name}, {user.first_name})")
 
     # cleaning
-    for message in context.user_data["Request_temp_messages"]:
-        await message.delete()
-        context.user_data["Request_temp_messages"] = []
+    await delete_messages(context.bot, context.user_data["Request_temp_messages"])
+    context.user_data["Request_temp_messages"] = []
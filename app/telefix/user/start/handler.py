@@ -3,8 +3,8 @@ from functools import partial
 
 from telegram.ext import CommandHandler
 
-from app.telefix.common.types import TgHandlerPriority, TgModuleType
-from app.telefix.core.data_reader import StartReader
+from ...common.types import TgHandlerPriority, TgModuleType
+from ...core.data_reader import StartReader
 from .start import start
 
 
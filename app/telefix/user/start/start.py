@@ -3,8 +3,8 @@ from loguru import logger
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from app.telefix.core.data_reader import StartReader
-from app.telefix.common.markups import DEFAULT_CLIENT_MARKUP
+from ...core.data_reader import StartReader
+from ...common.markups import DEFAULT_CLIENT_MARKUP
 
 
 async def start(
@@ -2,9 +2,10 @@ import os
 import pathlib
 from typing import Dict
 
-from telegram.ext import CommandHandler, ConversationHandler, MessageHandler, filters
+from telegram.ext import CommandHandler, ConversationHandler, MessageHandler
 
-from app.telefix.common.types import TgHandlerPriority, TgModuleType
+from ...common.routing import text_filter
+from ...common.types import TgHandlerPriority, TgModuleType
 from .constants import (
     STATE,
     BROWSER_HISTORY_NAME,
@@ -65,14 +66,12 @@ class WikiHandler:
         self.conversation_handler = ConversationHandler(
             entry_points=[
                 CommandHandler(self.COMMANDS[0], wiki),
-                MessageHandler(filters.Regex(rf"^({self.MESSAGES[0]})$"), wiki),
+                MessageHandler(text_filter([self.MESSAGES[0]]), wiki),
             ],
             states=website.state,
             fallbacks=[
                 CommandHandler(self.COMMANDS[1], cancel_command),
-                MessageHandler(
-                    filters.Regex(rf"^({self.MESSAGES[1]})$"), cancel_command
-                ),
+                MessageHandler(text_filter([self.MESSAGES[1]]), cancel_command),
             ],
             allow_reentry=True,
             conversation_timeout=15,
@@ -5,7 +5,10 @@ from typing import List
 
 from telegram import InlineKeyboardMarkup, Update, LabeledPrice
 from telegram.constants import ParseMode
-from telegram.ext import ContextTypes, CallbackQueryHandler
+from telegram.ext import ContextTypes
+
+from ...common.message_ref import MessageRef, delete_messages
+from ...common.types import MessageKind
 
 
 class Page:
@@ -23,7 +26,6 @@ class Page:
         invoice (optional): Information for handling invoice-related actions.
         return_state (optional): State to return after handling the page.
         browser_history_name (optional): Key name for storing browsing history in context.
-        handlers (List): List of Telegram's CallbackQueryHandlers for the page.
 
     Methods:
         handler_callback(update, context): Handles callbacks triggered by the page's buttons.
@@ -49,18 +51,6 @@ class Page:
         self.return_state = return_state
         self.browser_history_name = browser_history_name
         self.media_dir = media_dir
-        self.handlers = []
-
-        self.handlers.append(
-            CallbackQueryHandler(self.handler_callback, pattern=self.name)
-        )
-        if self.invoice:
-            self.handlers.append(
-                CallbackQueryHandler(
-                    self.invoice_handler_callback,
-                    pattern=self.invoice["callback_pattern"],
-                )
-            )
 
     async def handler_callback(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -91,7 +81,9 @@ class Page:
                         text=self.messages[key][1],
                         parse_mode=ParseMode.MARKDOWN_V2,
                     )
-                    context.user_data["Annexe_Messages"].append(message)
+                    context.user_data["Annexe_Messages"].append(
+                        MessageRef.from_message(message, MessageKind.TEXT)
+                    )
                 elif self.messages[key][0] == "picture":
                     # TODO Upgrade to use file_id, maybe be significantly faster
                     file_path = self.media_dir / self.messages[key][1]
@@ -99,7 +91,9 @@ class Page:
                         message = await context.bot.send_photo(
                             chat_id=update.effective_chat.id, photo=photo
                         )
-                    context.user_data["Annexe_Messages"].append(message)
+                    context.user_data["Annexe_Messages"].append(
+                        MessageRef.from_message(message, MessageKind.PHOTO)
+                    )
 
         await query.edit_message_text(
             text=self.title,
@@ -138,8 +132,7 @@ class Page:
 
         # Cleaning up
         await query.delete_message()
-        for message in context.user_data["Annexe_Messages"]:
-            await message.delete()
+        await delete_messages(context.bot, context.user_data["Annexe_Messages"])
         context.user_data["Annexe_Messages"] = []
 
         # optionally pass need_name=True, need_phone_number=True,
@@ -1,3 +1,4 @@
+import functools
 from loguru import logger
 from uuid import uuid4
 from typing import Union
@@ -8,12 +9,17 @@ from telegram.ext import ContextTypes, ConversationHandler, InlineQueryHandler
 
 from wiki import get_wiki_json_dict, get_answer_path
 
-WIKI_DATA_DICT = get_wiki_json_dict()
+
+@functools.lru_cache(maxsize=1)
+def get_wiki_data_dict() -> dict:
+    """The whole wiki, parsed on the first inline query rather than at import"""
+    return get_wiki_json_dict()
 
 
 async def share(update: Update, _: ContextTypes.DEFAULT_TYPE) -> Union[int, None]:
     """Handle the inline query. This is run when you type: @YaServiceRuBot <query>"""
     logger.info("share()")
+    WIKI_DATA_DICT = get_wiki_data_dict()
     query_text = update.inline_query.query
 
     results = []
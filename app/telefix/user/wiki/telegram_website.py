@@ -5,8 +5,10 @@ from typing import Dict
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.constants import ParseMode
-from telegram.ext import ContextTypes, CallbackQueryHandler, ConversationHandler
+from telegram.ext import ContextTypes, ConversationHandler
 
+from ...common.message_ref import delete_messages
+from ...common.routing import CallbackQueryRouter
 from .constants import BACK, CANCEL
 from .page import Page
 
@@ -22,7 +24,8 @@ class Website:
         browser_history_name (str): Key name for storing browsing history in user context.
         state_name (str): The name of the state associated with the website in the conversation handler.
         pages (dict): Dictionary of `Page` objects representing the pages of the website.
-        state (dict): State configuration for the conversation handler.
+        router (CallbackQueryRouter): Dispatches the callback queries to the pages by callback_data.
+        state (dict): State configuration for the conversation handler, holding the router.
 
     Methods:
         format_title(title): Formats the title string for display.
@@ -39,7 +42,10 @@ class Website:
         self.browser_history_name = browser_history_name
         self.media_dir = media_dir
         self.pages = {}
-        self.state = {self.state_name: []}
+        # A single handler for all the pages, looked up by callback_data instead of trying the
+        # pattern of every page in turn
+        self.router = CallbackQueryRouter()
+        self.state = {self.state_name: [self.router]}
         self.add_back_callback()
         self.add_cancel_callback()
 
@@ -87,7 +93,13 @@ class Website:
                 self.media_dir,
             )
 
-            self.state[self.state_name].extend(self.pages[name].handlers)
+            page = self.pages[name]
+            self.router.add(page.name, page.handler_callback)
+            if page.invoice:
+                # Configured as a pattern, only tried when no page matches exactly
+                self.router.add_pattern(
+                    page.invoice["callback_pattern"], page.invoice_handler_callback
+                )
 
     async def cancel_callback(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -102,9 +114,7 @@ class Website:
         return ConversationHandler.END
 
     def add_cancel_callback(self):
-        self.state[self.state_name].append(
-            CallbackQueryHandler(self.cancel_callback, pattern=CANCEL)
-        )
+        self.router.add(CANCEL, self.cancel_callback)
 
     async def back_callback(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -129,8 +139,7 @@ class Website:
         # Determine where clients wants to go
         target_handler_callback = browser_history[-1]
         # Delete the messages from the answer to avoid clutter
-        for message in context.user_data["Annexe_Messages"]:
-            await message.delete()
+        await delete_messages(context.bot, context.user_data["Annexe_Messages"])
         context.user_data["Annexe_Messages"] = []
         # Generate appropriate response
         await query.edit_message_text(
@@ -144,12 +153,8 @@ class Website:
         return self.state_name
 
     def add_back_callback(self):
-        self.state[self.state_name].append(
-            CallbackQueryHandler(self.back_callback, pattern=BACK)
-        )
+        self.router.add(BACK, self.back_callback)
 
     def add_page(self, page_name, page, callback):
         self.pages[page_name] = page
-        self.state[self.state_name].append(
-            CallbackQueryHandler(callback, pattern=page_name)
-        )
+        self.router.add(page_name, callback)
@@ -0,0 +1,85 @@
+import threading
+from typing import List, NamedTuple, Optional
+
+from loguru import logger
+
+
+class ObjectImportError(NamedTuple):
+    """
+    An object Weaviate refused, in the `batch`-th batch sent (from 1). A batch whose request failed
+    altogether is recorded as a single error without uuid.
+    """
+
+    batch: int
+    class_name: str
+    uuid: str
+    message: str
+
+
+class BatchImportReport:
+    """
+    Collects the results of a Weaviate batch import, as the callback of the client's batch.
+
+    Weaviate answers a batch with the result of every object, the objects it refused carrying their
+    errors instead of failing the whole request: they are kept here, by batch, to be reported once
+    the import is done.
+
+    Attributes:
+        class_name (str): The class the objects are imported into.
+        batches (int): Number of batches sent.
+        objects (int): Number of objects sent.
+        errors (List[ObjectImportError]): The objects refused.
+
+    Methods:
+        add_results(results): Callback of the client's batch, called with the results of a batch.
+        log(): Logs the outcome of the import, and every error.
+    """
+
+    def __init__(self, class_name: str):
+        self.class_name = class_name
+        self.batches = 0
+        self.objects = 0
+        self.errors: List[ObjectImportError] = []
+        # The batches are sent by several workers
+        self._lock = threading.Lock()
+
+    def add_results(self, results: Optional[list]) -> None:
+        with self._lock:
+            self.batches += 1
+            if results is None:
+                # The client gives up on the batch after its retries, none of its objects is known
+                self.errors.append(
+                    ObjectImportError(
+                        batch=self.batches,
+                        class_name=self.class_name,
+                        uuid="",
+                        message="The batch request failed, none of its objects were imported",
+                    )
+                )
+                return
+            for result in results:
+                self.objects += 1
+                errors = (result.get("result") or {}).get("errors") or {}
+                for error in errors.get("error", []):
+                    self.errors.append(
+                        ObjectImportError(
+                            batch=self.batches,
+                            class_name=result.get("class", self.class_name),
+                            uuid=result.get("id", ""),
+                            message=error.get("message", ""),
+                        )
+                    )
+
+    def log(self) -> None:
+        logger.info(
+            f"Imported {self.objects - len(self.errors)}/{self.objects} objects into "
+            f"'{self.class_name}' in {self.batches} batches"
+        )
+        for error in self.errors:
+            if not error.uuid:
+                logger.error(f"Batch {error.batch} of '{error.class_name}': {error.message}")
+                continue
+            logger.error(
+                f"Batch {error.batch}: object {error.uuid} of '{error.class_name}' refused: "
+                f"{error.message}"
+            )
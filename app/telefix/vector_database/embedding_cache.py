@@ -0,0 +1,203 @@
+import hashlib
+import json
+import pathlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+
+_KEY_SIZE = 16
+
+
+def normalize_text(text: str) -> str:
+    """The text as cached: NFKC normalized, case folded, whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class EmbeddingCache:
+    """
+    Cache of the sentence transformer's encodings, keyed by the normalized text and the model.
+
+    Texts differing only by case or whitespace share an entry. The most recently used encodings are
+    kept in memory; with a `path`, every encoding is also written to a disk tier holding the last
+    `disk_size` ones in memory-mapped files, which survive restarts and are read back on a memory
+    miss. The disk tier is a ring: when full, the oldest encodings are overwritten. Its files are
+    written by a single process, every shard has a directory of its own.
+
+    Attributes:
+        model_name (str): The sentence transformer, part of the keys.
+        max_size (int): Maximum number of encodings kept in memory.
+        path (pathlib.Path): Directory of the disk tier, None for memory only.
+        disk_size (int): Maximum number of encodings kept on disk.
+        stats (dict): Counters of memory hits, disk hits, misses and evictions.
+
+    Methods:
+        open(): Opens the disk tier, to be called before use.
+        get(text): The cached encoding of the text, None when missing.
+        put(text, vector): Caches the encoding of the text.
+        hit_rate(): Share of lookups answered by the cache.
+        flush(): Writes the disk tier's pending changes.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_size: int = 10000,
+        path: Optional[str] = None,
+        disk_size: int = 100000,
+    ):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.path = pathlib.Path(path) if path else None
+        self.disk_size = disk_size
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._vectors: "OrderedDict[bytes, ndarray]" = OrderedDict()
+        # Encodings are looked up from the event loop and computed in worker threads
+        self._lock = threading.Lock()
+
+        self._disk_keys: Optional["ndarray"] = None
+        self._disk_vectors: Optional["ndarray"] = None
+        self._disk_slots: Dict[bytes, int] = {}
+        self._next_slot = 0
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def open(self) -> None:
+        """Opens the disk tier, discarding it when made by another model"""
+        if self.path is None:
+            return
+        meta = self._read_meta()
+        if meta.get("model_name") != self.model_name or meta.get("disk_size") != self.disk_size:
+            # The vectors are only created once their dimension is known, by the first put
+            return
+        import numpy as np
+
+        try:
+            self._disk_keys = np.load(self.path / "keys.npy", mmap_mode="r+")
+            self._disk_vectors = np.load(self.path / "vectors.npy", mmap_mode="r+")
+        except (OSError, ValueError) as e:
+            logger.error(f"Embedding cache unreadable in {self.path}, starting empty: {e}")
+            self._disk_keys = self._disk_vectors = None
+            return
+        self._next_slot = meta["next_slot"] % self.disk_size
+        empty = bytes(_KEY_SIZE)
+        for slot, key in enumerate(self._disk_keys):
+            key = key.tobytes()
+            if key != empty:
+                self._disk_slots[key] = slot
+        logger.info(f"Embedding cache: {len(self._disk_slots)} encodings on disk in {self.path}")
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(
+            f"{self.model_name}\0{normalize_text(text)}".encode(), digest_size=_KEY_SIZE
+        ).digest()
+
+    def get(self, text: str) -> Optional["ndarray"]:
+        key = self.key(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector
+
+            slot = self._disk_slots.get(key)
+            if slot is not None and self._disk_keys[slot].tobytes() != key:
+                # The slot was overwritten since, the files being written to elsewhere
+                del self._disk_slots[key]
+                slot = None
+            if slot is None:
+                self.stats["misses"] += 1
+                return None
+            vector = self._disk_vectors[slot].copy()
+            self.stats["disk_hits"] += 1
+            self._remember(key, vector)
+            return vector
+
+    def put(self, text: str, vector: "ndarray") -> None:
+        import numpy as np
+
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self.path is not None and key not in self._disk_slots:
+                self._write_to_disk(key, vector)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._disk_vectors is None:
+                return
+            self._disk_vectors.flush()
+            self._disk_keys.flush()
+            self._write_meta()
+
+    def _remember(self, key: bytes, vector: "ndarray") -> None:
+        self._vectors[key] = vector
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self.max_size:
+            self._vectors.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _write_to_disk(self, key: bytes, vector: "ndarray") -> None:
+        import numpy as np
+
+        if self._disk_vectors is None or self._disk_vectors.shape[1] != vector.shape[-1]:
+            self._create_disk_tier(vector.shape[-1])
+
+        slot = self._next_slot
+        previous = self._disk_keys[slot].tobytes()
+        self._disk_slots.pop(previous, None)
+        # The key cleared first and written last, an interrupted write leaving the slot empty
+        # rather than wrong
+        self._disk_keys[slot] = 0
+        self._disk_vectors[slot] = vector
+        self._disk_keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        self._disk_slots[key] = slot
+        self._next_slot = (slot + 1) % self.disk_size
+
+    def _create_disk_tier(self, dimension: int) -> None:
+        import numpy as np
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._disk_keys = np.lib.format.open_memmap(
+            self.path / "keys.npy", mode="w+", dtype=np.uint8, shape=(self.disk_size, _KEY_SIZE)
+        )
+        self._disk_vectors = np.lib.format.open_memmap(
+            self.path / "vectors.npy",
+            mode="w+",
+            dtype=np.float32,
+            shape=(self.disk_size, dimension),
+        )
+        self._disk_slots.clear()
+        self._next_slot = 0
+        self._write_meta()
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self.path / "meta.json") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self) -> None:
+        with open(self.path / "meta.json", "w") as file:
+            json.dump(
+                {
+                    "model_name": self.model_name,
+                    "disk_size": self.disk_size,
+                    "next_slot": self._next_slot,
+                },
+                file,
+            )
@@ -0,0 +1,130 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+
+_Request = Tuple[str, asyncio.Future]
+
+
+class EmbeddingService:
+    """
+    Encodes texts off the event loop, the texts requested together being encoded in one batch.
+
+    A request waits up to `max_wait_ms` for others to join it, or less once `max_batch_size` texts
+    are waiting. The batch is then encoded by a single worker thread, so that the event loop keeps
+    handling updates during the forward pass. The texts requested while a batch is being encoded
+    form the next batch, sent as soon as the worker is free: batches grow with the load.
+
+    Attributes:
+        encode (Callable[[List[str]], Sequence[ndarray]]): Encodes a batch of texts, e.g. the
+            sentence transformer's `encode`.
+        max_batch_size (int): Maximum number of texts encoded together.
+        max_wait_s (float): Maximum time a request waits for others before being encoded.
+        num_threads (int): Number of threads torch uses for the forward pass, None for its default.
+        stats (dict): Counters of the texts requested and the batches encoded.
+
+    Methods:
+        embed(text): The encoding of the text, awaited.
+        mean_batch_size(): Mean number of texts by batch.
+        close(): Stops the worker thread, failing the pending requests.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], Sequence["ndarray"]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        num_threads: Optional[int] = None,
+    ):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self.num_threads = num_threads
+        self.stats = {"texts": 0, "batches": 0}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="embedding", initializer=self._init_worker
+        )
+        self._pending: List[_Request] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._encoding = False
+
+    def _init_worker(self) -> None:
+        if self.num_threads is not None:
+            import torch
+
+            torch.set_num_threads(self.num_threads)
+
+    async def embed(self, text: str) -> "ndarray":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.stats["texts"] += 1
+
+        # While a batch is encoded, the next one is sent once it is done
+        if not self._encoding:
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait_s, self._flush)
+        return await future
+
+    def mean_batch_size(self) -> float:
+        batches = self.stats["batches"]
+        return self.stats["texts"] / batches if batches else 0.0
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for _, future in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding service closed"))
+        self._pending.clear()
+        logger.info(
+            f"Embedding service: {self.stats}, mean batch size {self.mean_batch_size():.1f}"
+        )
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Requests cancelled meanwhile, e.g. by a shutdown, are not encoded
+        self._pending = [request for request in self._pending if not request[1].done()]
+        if self._encoding or not self._pending:
+            return
+
+        batch = self._pending[: self.max_batch_size]
+        del self._pending[: self.max_batch_size]
+        # A text requested several times is encoded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self._encoding = True
+        self.stats["batches"] += 1
+        encoded = asyncio.get_running_loop().run_in_executor(self._executor, self.encode, texts)
+        encoded.add_done_callback(partial(self._resolve, batch, texts))
+
+    def _resolve(self, batch: List[_Request], texts: List[str], encoded: asyncio.Future) -> None:
+        self._encoding = False
+        if encoded.cancelled():
+            error = RuntimeError("Embedding service closed")
+        else:
+            error = encoded.exception()
+
+        if error is not None:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            vectors = dict(zip(texts, encoded.result()))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(vectors[text])
+
+        # The requests made during the encoding already waited for it
+        if self._pending:
+            self._flush()
@@ -0,0 +1,91 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from numpy import ndarray
+    from torch import Tensor
+
+
+class LocalIndex:
+    """
+    In-process similarity index of the filters, answering the queries of `VectorDatabase.vector_query`
+    without a round trip to Weaviate.
+
+    The vectors of every class are normalized once and stored as consecutive rows of a single
+    contiguous matrix: a query is one matrix-vector product over the rows of its class. Certainties
+    follow Weaviate's for the cosine distance, (1 + cosine similarity) / 2.
+
+    Attributes:
+        dtype (str): Type of the matrix, float32, or float16 to halve its memory at a precision cost.
+        contents (List[str]): The content of every row.
+        classes (Dict[str, slice]): The rows of every class.
+        matrix (ndarray): The normalized vectors, one row by content.
+
+    Methods:
+        query(class_name, vector, certainty, query_limit): The contents closest to a vector, as
+            returned by Weaviate.
+    """
+
+    def __init__(
+        self, filters: Dict[str, Tuple[List[str], "ndarray"]], dtype: str = "float32"
+    ):
+        import numpy as np
+
+        self.dtype = dtype
+        self.contents: List[str] = []
+        self.classes: Dict[str, slice] = {}
+
+        blocks = []
+        for class_name, (contents, vectors) in filters.items():
+            start = len(self.contents)
+            self.contents.extend(contents)
+            self.classes[class_name] = slice(start, len(self.contents))
+            if contents:
+                blocks.append(np.asarray(vectors, dtype=np.float32).reshape(len(contents), -1))
+
+        matrix = np.concatenate(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = np.ascontiguousarray(matrix / np.maximum(norms, 1e-12), dtype=dtype)
+
+    def __contains__(self, class_name: str) -> bool:
+        return class_name in self.classes
+
+    def query(
+        self,
+        class_name: str,
+        vector: Union[list, "ndarray", "Tensor"],
+        certainty: float = 0.75,
+        query_limit: int = 10,
+    ) -> List[Dict[str, Union[str, Dict[str, float]]]]:
+        """
+        Finds the contents of a class closest to a vector.
+
+        Parameters:
+        - class_name : str : The class to search.
+        - vector : Union[list, ndarray, Tensor] : The vector of the query, e.g. an encoded prompt.
+        - certainty : float : The minimum certainty of the results.
+        - query_limit : int : The maximum number of results.
+
+        Returns:
+        - List[Dict[str, Union[str, Dict[str, float]]]] : The results by decreasing certainty, as
+          returned by Weaviate: `{"content": ..., "_additional": {"certainty": ...}}`.
+        """
+        import numpy as np
+
+        rows = self.classes[class_name]
+        if hasattr(vector, "cpu"):
+            vector = vector.cpu().numpy()
+        vector = np.asarray(vector, dtype=self.matrix.dtype).ravel()
+        norm = np.linalg.norm(vector)
+        if rows.start == rows.stop or not norm:
+            return []
+
+        certainties = (1 + self.matrix[rows] @ (vector / norm)) / 2
+        selected = np.flatnonzero(certainties >= certainty)
+        selected = selected[np.argsort(-certainties[selected], kind="stable")][:query_limit]
+        return [
+            {
+                "content": self.contents[rows.start + index],
+                "_additional": {"certainty": float(certainties[index])},
+            }
+            for index in selected
+        ]
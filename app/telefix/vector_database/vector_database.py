@@ -1,22 +1,29 @@
-import json
-import sys
+import asyncio
 from pprint import pformat
-from typing import List, Dict, Union
+from typing import TYPE_CHECKING, List, Dict, Optional, Set, Tuple, Union
 
 from loguru import logger
 
-from numpy import ndarray
-import torch
-from torch import Tensor
-from sentence_transformers import SentenceTransformer
-import weaviate
-from weaviate.util import generate_uuid5
+from telegram.ext import Application
 
+from ..common.startup import STARTUP_TIMELINE
 from ..common.types import StdModuleType
 from ..core.config_template import ClassConfig
+from .batch_import import BatchImportReport
+from .embedding_cache import EmbeddingCache
+from .embedding_service import EmbeddingService
+from .local_index import LocalIndex
+
+# torch, sentence_transformers and weaviate take seconds to import, they are only imported by the
+# background initialisation so that the bot starts answering right away
+if TYPE_CHECKING:
+    from numpy import ndarray
+    from torch import Tensor
 
 
 def get_available_device():
+    import torch
+
     logger.info(" ")
     if torch.cuda.is_available():
         return torch.device("cuda")
@@ -28,6 +35,22 @@ def get_available_device():
         return torch.device("cpu")
 
 
+def diff_objects(expected: Dict[str, str], stored: Set[str]) -> Tuple[List[str], List[str]]:
+    """
+    Compares the objects a class should hold to the ones it holds, by their ids.
+
+    Parameters:
+    - expected : Dict[str, str] : The contents the class should hold, by id.
+    - stored : Set[str] : The ids of the objects the class holds.
+
+    Returns:
+    - Tuple[List[str], List[str]] : The contents to insert, and the ids of the objects to delete.
+    """
+    to_insert = [content for uuid, content in expected.items() if uuid not in stored]
+    to_delete = sorted(stored.difference(expected))
+    return to_insert, to_delete
+
+
 class VectorDatabase:
     """
     Manages a vector database using Weaviate, a vector search engine, for semantic search and retrieval.
@@ -39,16 +62,39 @@ class VectorDatabase:
 
     This class is essential for applications involving semantic search and retrieval, such as chatbots or recommendation systems.
 
+    Connecting, loading the model and populating the database take a while, they are done in the
+    background once the application started: `ready` tells whether the database can be queried.
+
     Attributes:
+        ready (asyncio.Event): Set once the database is connected, populated and the model loaded.
         vector_db_client (weaviate.Client): Client for interacting with Weaviate database.
         embedding_model (SentenceTransformer): Model for generating sentence data.
         semantic_threshold (float): Threshold for semantic similarity in queries.
         query_limit (int): Limit for the number of results returned in queries.
+        batch_size (int): Number of objects encoded together and sent by batch when populating.
+        num_workers (int): Number of batches sent concurrently when populating.
+        sync (bool): Whether the filters are synchronised with the configuration on startup,
+            rather than the database rebuilt when a class is missing.
+        local_index (LocalIndex): The filters, queried in process instead of in Weaviate, when
+            `use_local_index`.
+        embedding_cache (EmbeddingCache): The encodings of the prompts already seen, None when
+            disabled.
+        embedding_service (EmbeddingService): Encodes the prompts by batches, off the event loop.
         classes (dict): Dictionary of classes (schema definitions) in the database.
         device (torch.device): The computational device used for model operations.
 
     Methods:
+        post_init(application): Starts the initialisation in the background.
+        post_shutdown(application): Stops waiting for the initialisation and the encodings, saves
+            the embedding cache.
+        embed(text): Encodes a text through the embedding cache and service, awaited.
         populate_vector_database(classes, filters): Populates the database with classes and filters.
+        sync_vector_database(classes, filters): Inserts and deletes the filters changed in the configuration.
+        build_local_index(filters): Encodes the filters into an in-process index.
+        import_objects(class_name, contents): Writes contents with their vectors through the batch API.
+        object_uuid(content): The id of the object of a content.
+        get_object_ids(class_name): Retrieves the ids of all objects of a class.
+        count_objects(class_name): Counts the objects of a class.
         vector_query(collection_name, vector, certainty, query_limit): Performs a vector similarity search.
         create_class(class_config): Creates a new class in the vector database schema.
         check_classes(classes): Checks if specified classes exist in the vector database.
@@ -69,29 +115,106 @@ class VectorDatabase:
         query_limit: int,
         classes_config: dict[str, ClassConfig],
         filters_config: Dict[str, List[str]],
+        batch_size: int = 100,
+        num_workers: int = 2,
+        sync: bool = True,
+        use_local_index: bool = False,
+        local_index_dtype: str = "float32",
+        embedding_cache_size: int = 0,
+        embedding_cache_path: Optional[str] = None,
+        embedding_cache_disk_size: int = 100000,
+        embedding_batch_size: int = 32,
+        embedding_max_wait_ms: float = 5.0,
+        embedding_threads: Optional[int] = None,
     ):
-        try:
-            logger.info("Connecting to vector database client...")
-            self.vector_db_client = weaviate.Client(api_url)
-        except Exception as e:
-            logger.exception(f"Failed to initialize Weaviate client: {e}")
-            sys.exit(1)
-        try:
-            self.embedding_model = SentenceTransformer(sentence_transformer)
-        except Exception as e:
-            logger.exception(f"Failed to load SentenceTransformer model: {e}")
-            sys.exit(1)
-
+        self.api_url = api_url
+        self.sentence_transformer = sentence_transformer
         self.semantic_threshold = semantic_threshold
         self.query_limit = query_limit
+        self.classes_config = classes_config
+        self.filters_config = filters_config
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.sync = sync
+        self.use_local_index = use_local_index
+        self.local_index_dtype = local_index_dtype
+        self.local_index: Optional[LocalIndex] = None
+        self.embedding_cache = (
+            EmbeddingCache(
+                sentence_transformer,
+                embedding_cache_size,
+                embedding_cache_path,
+                embedding_cache_disk_size,
+            )
+            if embedding_cache_size
+            else None
+        )
+        self.embedding_service = EmbeddingService(
+            self._encode_batch, embedding_batch_size, embedding_max_wait_ms, embedding_threads
+        )
         self.classes = {}
+        self.ready = asyncio.Event()
+
+        self.vector_db_client = None
+        self.embedding_model = None
+        self.device = None
+        self._initializer: Optional[asyncio.Task] = None
+
+    async def post_init(self, _: Application) -> None:
+        self._initializer = asyncio.create_task(self._initialize())
+
+    async def post_shutdown(self, _: Application) -> None:
+        # A model still loading is left to its thread
+        if self._initializer is not None and not self._initializer.done():
+            self._initializer.cancel()
+        self.embedding_service.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+            logger.info(
+                f"Embedding cache: {len(self.embedding_cache)} encodings in memory, "
+                f"hit rate {self.embedding_cache.hit_rate():.2%}, {self.embedding_cache.stats}"
+            )
+
+    async def _initialize(self) -> None:
+        try:
+            await asyncio.to_thread(self._connect_and_populate)
+        except Exception as e:
+            logger.exception(f"Vector database unavailable, prompts cannot be checked: {e}")
+            return
+        self.ready.set()
+        STARTUP_TIMELINE.mark("vector database ready")
+        STARTUP_TIMELINE.report()
+
+    def _connect_and_populate(self) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        if self.embedding_cache is not None:
+            self.embedding_cache.open()
         self.device = get_available_device()
+        self.embedding_model = SentenceTransformer(self.sentence_transformer)
+        STARTUP_TIMELINE.mark("sentence transformer loaded")
+
+        if not self.use_local_index:
+            self._connect()
+            return
 
+        self.local_index = self.build_local_index(self.filters_config)
+        STARTUP_TIMELINE.mark("local index built")
+        # The filters are queried locally, Weaviate being down only leaves it out of date
         try:
-            self.populate_vector_database(classes_config, filters_config)
+            self._connect()
         except Exception as e:
-            logger.exception(f"Error while populating vector database: {e}")
-            sys.exit(1)
+            logger.warning(f"Vector database unavailable, filters checked locally only: {e}")
+
+    def _connect(self) -> None:
+        import weaviate
+
+        logger.info("Connecting to vector database client...")
+        self.vector_db_client = weaviate.Client(self.api_url)
+        if self.sync:
+            self.sync_vector_database(self.classes_config, self.filters_config)
+        else:
+            self.populate_vector_database(self.classes_config, self.filters_config)
 
     def populate_vector_database(
             self, classes_config: dict[str, ClassConfig], filters_config: Dict[str, List[str]]
@@ -100,8 +223,8 @@ class VectorDatabase:
         Populate the vector database with specified classes and filters.
 
         This method reinitializes the vector database with given classes if they don't already exist, then writes
-        provided filters to the database. Each class and filter is validated before being added. If an error occurs
-        during the process, it raises an exception and logs an error message.
+        provided filters to the database through the batch API, see `import_objects`. If an error occurs during the
+        process, it raises an exception and logs an error message.
 
         Parameters:
             - classes (Dict[str, Dict]): A dictionary of class names and their configurations to be added to
@@ -110,10 +233,9 @@ class VectorDatabase:
             strings to be added to the corresponding classes in the vector database.
 
         Raises:
-            - ValueError: If a filter object fails the validation.
+            - ValueError: If the vector database refuses filter objects.
             - AssertionError: If no objects are found in the vector database after writing.
         """
-
         logger.info(" ")
 
         # FIXME
@@ -142,38 +264,222 @@ class VectorDatabase:
 
         logger.info("Writing filters to vector database...")
 
-        # Read filters from the provided dictionary and add them to vector_db
         for filter_name, filter_lst in filters_config.items():
-            for filter_str in filter_lst:
-                filter_object = {"content": filter_str}
-
-                # Validate the filter object before writing to vector_db
-                valid_filter_object = self.vector_db_client.data_object.validate(
-                    data_object=filter_object,
-                    class_name=filter_name,
-                    uuid=generate_uuid5(filter_object),
+            report = self.import_objects(filter_name, filter_lst)
+            if report.errors:
+                raise ValueError(
+                    f"{len(report.errors)} filters refused by the vector database"
                 )
 
-                # Log validation errors if any, else write data object to vector_db
-                if not valid_filter_object["valid"]:
-                    logger.error(json.dumps(valid_filter_object["error"], indent=2))
-                    raise ValueError("Vector Database object format not valid")
-
-                self.write_data_object(filter_object, filter_name)
-                logger.info(f"Filter '{filter_str}' added to class '{filter_name}'")
-
             # Ensure objects are written properly
-            if not self.get_all_objects_from_class(filter_name):
+            if not self.count_objects(filter_name):
                 raise AssertionError(
                     "No objects found in vector database after writing"
                 )
 
         logger.info("Vector database populated successfully")
 
+    def sync_vector_database(
+            self, classes_config: dict[str, ClassConfig], filters_config: Dict[str, List[str]]
+    ) -> None:
+        """
+        Synchronise the vector database with the configured classes and filters.
+
+        Missing classes are created, then the ids of the configured filters, derived from their
+        content, are compared to the ids stored in their class: only the filters added to the
+        configuration are inserted, and only the objects no longer configured are deleted. The time
+        taken is proportional to the changes, and the filters are never all missing at once.
+
+        Parameters:
+            - classes (Dict[str, Dict]): A dictionary of class names and their configurations.
+            - filters (Dict[str, List]): A dictionary containing filter names and lists of filter
+            strings their classes should hold.
+
+        Raises:
+            - ValueError: If the vector database refuses filter objects.
+        """
+        import weaviate
+
+        logger.info(" ")
+
+        self.classes = classes_config
+        for class_name, class_config in classes_config.items():
+            try:
+                self.vector_db_client.schema.get(class_name)
+            except weaviate.exceptions.UnexpectedStatusCodeException:
+                self.create_class(class_config)
+
+        for filter_name, filter_lst in filters_config.items():
+            expected = {self.object_uuid(content): content for content in filter_lst}
+            to_insert, to_delete = diff_objects(expected, self.get_object_ids(filter_name))
+
+            if to_insert:
+                report = self.import_objects(filter_name, to_insert)
+                if report.errors:
+                    raise ValueError(
+                        f"{len(report.errors)} filters refused by the vector database"
+                    )
+            for uuid in to_delete:
+                self.vector_db_client.data_object.delete(uuid=uuid, class_name=filter_name)
+
+            logger.info(
+                f"Class '{filter_name}' synchronised: {len(to_insert)} filters inserted, "
+                f"{len(to_delete)} deleted, {len(expected) - len(to_insert)} unchanged"
+            )
+
+        logger.info("Vector database synchronised successfully")
+
+    async def embed(self, text: str) -> "ndarray":
+        """
+        Encode a text unless its encoding is in the embedding cache, without blocking the event
+        loop: the texts requested together are encoded in one batch by the embedding service.
+
+        Parameters:
+        - text (str): The text, e.g. a prompt.
+
+        Returns:
+        - ndarray: Its encoding.
+        """
+        if self.embedding_cache is not None:
+            vector = self.embedding_cache.get(text)
+            if vector is not None:
+                return vector
+
+        vector = await self.embedding_service.embed(text)
+        if self.embedding_cache is not None:
+            self.embedding_cache.put(text, vector)
+        return vector
+
+    def _encode_batch(self, texts: List[str]) -> "ndarray":
+        return self.embedding_model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def build_local_index(self, filters_config: Dict[str, List[str]]) -> LocalIndex:
+        """
+        Encode the filters into an index queried in process by `vector_query`, sparing the round
+        trips to Weaviate of the prompt validation.
+
+        Parameters:
+        - filters_config (Dict[str, List[str]]): The filters, by class.
+
+        Returns:
+        - LocalIndex: The index of the filters.
+        """
+        filters = {}
+        for class_name, contents in filters_config.items():
+            contents = list(dict.fromkeys(contents))
+            vectors = self.embedding_model.encode(
+                contents,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            filters[class_name] = (contents, vectors)
+
+        local_index = LocalIndex(filters, self.local_index_dtype)
+        logger.info(
+            f"Local index of {len(local_index.contents)} filters built "
+            f"({local_index.matrix.nbytes} bytes)"
+        )
+        return local_index
+
+    def import_objects(self, class_name: str, contents: List[str]) -> BatchImportReport:
+        """
+        Write contents to a class through Weaviate's batch API, with their vectors.
+
+        The vectors are computed here by the sentence transformer encoding the prompts, by batches
+        of `batch_size`, instead of by the class' vectorizer, so that the filters and the prompts
+        compared to them share the same embedding. The objects are sent by batches of `batch_size`
+        by `num_workers` concurrent workers, their ids given by `object_uuid`.
+
+        Parameters:
+        - class_name (str): The class to write to.
+        - contents (List[str]): The contents of the objects, duplicates are written once.
+
+        Returns:
+        - BatchImportReport: The batches sent and the objects refused, by batch.
+        """
+        contents = list(dict.fromkeys(contents))
+        vectors = self.embedding_model.encode(
+            contents,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+        report = BatchImportReport(class_name)
+        self.vector_db_client.batch.configure(
+            batch_size=self.batch_size,
+            num_workers=self.num_workers,
+            dynamic=False,
+            callback=report.add_results,
+        )
+        with self.vector_db_client.batch as batch:
+            for content, vector in zip(contents, vectors):
+                data_object = {"content": content}
+                batch.add_data_object(
+                    data_object,
+                    class_name,
+                    uuid=self.object_uuid(content),
+                    vector=vector,
+                )
+
+        report.log()
+        return report
+
+    def object_uuid(self, content: str) -> str:
+        """
+        The id of the object holding a content: derived from the content and the sentence
+        transformer, whose change then replaces every object, their vectors being outdated.
+        """
+        from weaviate.util import generate_uuid5
+
+        return generate_uuid5({"content": content}, self.sentence_transformer)
+
+    def get_object_ids(self, class_name: str) -> Set[str]:
+        """
+        Retrieve the ids of all objects of a class, by pages of `batch_size`, without their
+        properties and vectors.
+        """
+        object_ids = set()
+        cursor = None
+
+        while True:
+            query = (
+                self.vector_db_client.query.get(class_name)
+                .with_additional(["id"])
+                .with_limit(self.batch_size)
+            )
+            if cursor is not None:
+                query = query.with_after(cursor)
+
+            results = query.do()
+            if "errors" in results:
+                raise RuntimeError(results["errors"][0]["message"])
+
+            objects = results["data"]["Get"][class_name]
+            if not objects:
+                return object_ids
+
+            object_ids.update(obj["_additional"]["id"] for obj in objects)
+            cursor = objects[-1]["_additional"]["id"]
+
+    def count_objects(self, class_name: str) -> int:
+        result = (
+            self.vector_db_client.query.aggregate(class_name).with_meta_count().do()
+        )
+        if "errors" in result:
+            raise RuntimeError(result["errors"][0]["message"])
+        return result["data"]["Aggregate"][class_name][0]["meta"]["count"]
+
     def vector_query(
         self,
         collection_name: str,
-        vector: Union[list[Tensor], ndarray, Tensor],
+        vector: Union[list["Tensor"], "ndarray", "Tensor"],
         certainty: float = 0.75,
         query_limit: int = 10,
     ) -> List[Dict[str, Union[str, float]]]:
@@ -181,6 +487,7 @@ class VectorDatabase:
         Execute a vector query on the specified collection and return the results.
 
         This method performs a vector similarity search in the given collection, using the provided vector, certainty threshold, and query limit. Results include items that meet the certainty criteria up to the specified limit.
+        Collections held by the local index are searched in process.
 
         Parameters:
         - collection_name (str): The name of the collection to query.
@@ -194,6 +501,9 @@ class VectorDatabase:
         Raises:
         - Exception: If an error occurs during the query execution.
         """
+        if self.local_index is not None and collection_name in self.local_index:
+            return self.local_index.query(collection_name, vector, certainty, query_limit)
+
         logger.info(" ")
 
         nearVector = {"vector": vector, "certainty": certainty}
@@ -245,6 +555,8 @@ class VectorDatabase:
         Returns:
         - bool: True if all classes are in the vector database, False otherwise.
         """
+        import weaviate
+
         logger.info(" ")
 
         for class_name, configs in classes.items():
@@ -344,6 +656,8 @@ class VectorDatabase:
         logger.info(f"Class '{class_name}' deleted.")
 
     def write_data_object(self, data: Dict, class_name: str) -> None:
+        from weaviate.util import generate_uuid5
+
         self.vector_db_client.data_object.create(
             data_object=data, class_name=class_name, uuid=generate_uuid5(data)
         )
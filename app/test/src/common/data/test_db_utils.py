@@ -1,38 +1,53 @@
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, patch
+
+from telefix.database import utils as db_utils
 
 
 class TestDatabaseFunctions(unittest.TestCase):
-    @patch("db_utils.create_db_connection")
+    @patch("telefix.database.utils.create_db_connection")
     def test_insert_new_user(self, mock_create_db_connection):
         # Mock the connection and cursor
-        mock_conn = Mock()
-        mock_cursor = Mock()
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+
+        # The connection is used as a context manager
+        mock_conn.__enter__.return_value = mock_conn
 
         # Set the return_value of the connection's cursor() method
         mock_conn.cursor.return_value = mock_cursor
 
-        # Set the return_value of the cursor's fetchone() method
-        mock_cursor.fetchone.return_value = None
-
         # Set the return value of create_db_connection() to the mock connection
         mock_create_db_connection.return_value = mock_conn
 
         # Call the function you're testing
-        db_utils.insert_new_user(123, "username", "first", "last")
+        db_utils.insert_new_user(123, "username", "first", "last", {})
 
-        # Check that the execute() method was called with the right arguments
-        mock_cursor.execute.assert_any_call(
-            "select * from users where user_id = %s", (123,)
-        )
-        mock_cursor.execute.assert_any_call(
-            "insert into users (user_id, user_name, first_name, last_name) values (%s, %s, %s, %s);",
-            (123, "username", "first", "last"),
+        # A single upsert, no prior lookup of the user
+        mock_cursor.execute.assert_called_once_with(
+            db_utils.USER_UPSERT_QUERY, (123, "username", "first", "last")
         )
 
         # Check that commit() was called on the connection
         mock_conn.commit.assert_called_once()
 
+    @patch("telefix.database.utils.create_db_connection")
+    def test_insert_message(self, mock_create_db_connection):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.__enter__.return_value = mock_conn
+        mock_conn.cursor.return_value = mock_cursor
+        mock_create_db_connection.return_value = mock_conn
+
+        db_utils.insert_message(456, 7, "callback_query", 123, "page_2", {})
+
+        # Duplicates are skipped by the query itself, no retry nor rollback
+        mock_cursor.execute.assert_called_once_with(
+            db_utils.MESSAGE_INSERT_QUERY, (456, 7, "callback_query", 123, "page_2")
+        )
+        mock_conn.commit.assert_called_once()
+        mock_conn.rollback.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from telegram import CallbackQuery, Chat, Message, MessageEntity, Update, User
+
+from telefix.common.routing import CallbackQueryRouter, CommandFilter, text_filter
+
+_USER = User(1, "Test", False)
+_CHAT = Chat(1, Chat.PRIVATE)
+
+
+def _message_update(text: str) -> Update:
+    entities = (
+        [MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text.split()[0]))]
+        if text.startswith("/")
+        else None
+    )
+    message = Message(1, None, _CHAT, from_user=_USER, text=text, entities=entities)
+    return Update(1, message=message)
+
+
+def _callback_update(data: object) -> Update:
+    return Update(1, callback_query=CallbackQuery("1", _USER, "chat", data=data))
+
+
+async def _page(update, context):
+    return "page"
+
+
+async def _page_more(update, context):
+    return "page_more"
+
+
+async def _invoice(update, context):
+    return "invoice"
+
+
+class TestRouting(unittest.TestCase):
+    def test_command_filter(self):
+        known = CommandFilter(["wiki", "restart"])
+        self.assertTrue(known.check_update(_message_update("/wiki")))
+        self.assertTrue(known.check_update(_message_update("/restart hard")))
+        self.assertTrue(known.check_update(_message_update("/Wiki@telefix_bot")))
+        self.assertFalse(known.check_update(_message_update("/wikis")))
+        self.assertFalse(known.check_update(_message_update("wiki")))
+
+    def test_text_filter(self):
+        buttons = text_filter(["📖Справочник", "❌Отменить"])
+        self.assertTrue(buttons.check_update(_message_update("❌Отменить")))
+        self.assertFalse(buttons.check_update(_message_update("❌Отменить!")))
+
+    def test_callback_query_router(self):
+        router = CallbackQueryRouter()
+        router.add("Page", _page)
+        router.add("Page_more", _page_more)
+        router.add_pattern(r"Page_\w+_pay", _invoice)
+
+        # Exact routes, no longer shadowed by the routes they start with
+        self.assertIs(router.check_update(_callback_update("Page")), _page)
+        self.assertIs(router.check_update(_callback_update("Page_more")), _page_more)
+        # Patterns are only a fallback
+        self.assertIs(router.check_update(_callback_update("Page_more_pay")), _invoice)
+        self.assertIsNone(router.check_update(_callback_update("Other")))
+        self.assertIsNone(router.check_update(_callback_update({"page": 1})))
+        self.assertIsNone(router.check_update(_message_update("Page")))
+
+
+if __name__ == "__main__":
+    unittest.main()
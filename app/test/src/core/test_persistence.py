@@ -0,0 +1,93 @@
+import asyncio
+import pathlib
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from telefix.core.persistence import SqlitePersistence
+
+_DAY_S = 24 * 3600
+
+
+class TestSqlitePersistence(unittest.TestCase):
+    def test_purge_user_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = pathlib.Path(directory) / "persistence.sqlite"
+            now = time.time()
+            with sqlite3.connect(filepath) as conn:
+                conn.execute(
+                    "create table user_data ("
+                    "key integer primary key, data blob not null, updated_at real not null)"
+                )
+                conn.executemany(
+                    "insert into user_data values (?, ?, ?)",
+                    [
+                        (1, pickle.dumps({"name": 1}), now - 200 * _DAY_S),
+                        (2, pickle.dumps({"name": 2}), now - 200 * _DAY_S),
+                        (3, pickle.dumps({"name": 3}), now),
+                    ],
+                )
+            conn.close()
+
+            async def run():
+                persistence = SqlitePersistence(filepath, load_recent_days=30)
+                # 2 shows up again, its data is then evicted from memory by the maintenance
+                await persistence.refresh_user_data(2, {})
+                archived = {}
+                purged = await persistence.purge_user_data(
+                    now - 180 * _DAY_S, archived.update, batch_size=1
+                )
+                await persistence.flush()
+                return purged, archived
+
+            self.assertEqual(asyncio.run(run()), (1, {1: {"name": 1}}))
+            with sqlite3.connect(filepath) as conn:
+                keys = [key for key, in conn.execute("select key from user_data order by key")]
+            conn.close()
+            self.assertEqual(keys, [2, 3])
+
+    def test_rows_staged_during_write(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = pathlib.Path(directory) / "persistence.sqlite"
+
+            async def run():
+                persistence = SqlitePersistence(filepath)
+                writing, release = threading.Event(), threading.Event()
+                write_rows = persistence._write_rows
+
+                def blocking_write_rows(rows):
+                    writing.set()
+                    release.wait(5)
+                    write_rows(rows)
+
+                with patch.object(persistence, "_write_rows", blocking_write_rows):
+                    await persistence.update_user_data(1, {"name": 1})
+                    await asyncio.to_thread(writing.wait, 5)
+                    # Staged while the first row is being written, nothing is staged afterwards
+                    await persistence.update_user_data(2, {"name": 2})
+                    release.set()
+
+                    for _ in range(100):
+                        await asyncio.sleep(0.05)
+                        keys = await asyncio.to_thread(_stored_keys, filepath)
+                        if keys == [1, 2]:
+                            break
+                await persistence.flush()
+                return keys
+
+            self.assertEqual(asyncio.run(run()), [1, 2])
+
+
+def _stored_keys(filepath: pathlib.Path) -> list:
+    with sqlite3.connect(filepath) as conn:
+        keys = [key for key, in conn.execute("select key from user_data order by key")]
+    conn.close()
+    return keys
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import asyncio
+import queue
+import unittest
+
+from telegram import Bot, Chat, Message, Update, User
+
+from telefix.core.sharding import Shard, ShardUpdater, shard_index, shard_path
+
+from ..webhook_sender import make_text_update
+
+
+class TestShardIndex(unittest.TestCase):
+    def test_by_user(self):
+        user = User(10, "Test", False)
+        # Even in a group, the updates of a user go to the user's shard
+        message = Message(1, None, Chat(-1003, Chat.SUPERGROUP), from_user=user)
+        self.assertEqual(shard_index(Update(1, message=message), 4), 2)
+
+    def test_by_chat(self):
+        message = Message(1, None, Chat(-1003, Chat.CHANNEL))
+        self.assertEqual(shard_index(Update(1, channel_post=message), 4), -1003 % 4)
+
+    def test_without_user_nor_chat(self):
+        self.assertEqual(shard_index(Update(1), 4), 0)
+
+
+class TestShardPath(unittest.TestCase):
+    def test_shard_path(self):
+        shard = Shard(1, 4, None)
+        self.assertEqual(
+            shard_path("/app/persistence/dev.sqlite", shard),
+            "/app/persistence/dev.1-of-4.sqlite",
+        )
+        self.assertEqual(shard_path("/app/journal", shard), "/app/journal.1-of-4")
+
+
+class TestShardUpdater(unittest.IsolatedAsyncioTestCase):
+    async def test_feeds_update_queue_until_stopped(self):
+        shard = Shard(0, 2, queue.Queue())
+        stopped = asyncio.Event()
+        update_queue = asyncio.Queue()
+        updater = ShardUpdater(Bot("123:test"), update_queue, shard, on_stop=stopped.set)
+
+        await updater.start_polling()
+        try:
+            for update_id in range(3):
+                shard.queue.put(make_text_update(update_id, 1, "/start"))
+            for update_id in range(3):
+                update = await asyncio.wait_for(update_queue.get(), timeout=5)
+                self.assertIsInstance(update, Update)
+                self.assertEqual(update.update_id, update_id)
+                self.assertEqual(update.message.text, "/start")
+
+            shard.queue.put(None)
+            await asyncio.wait_for(stopped.wait(), timeout=5)
+        finally:
+            await updater.stop()
+        self.assertFalse(updater.running)
+        self.assertTrue(update_queue.empty())
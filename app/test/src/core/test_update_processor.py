@@ -0,0 +1,49 @@
+import asyncio
+import unittest
+
+from telegram import Chat, Message, Update, User
+
+from telefix.core.update_processor import UserOrderedUpdateProcessor
+
+
+def _update(update_id: int, user_id: int) -> Update:
+    user = User(user_id, "Test", False)
+    message = Message(update_id, None, Chat(user_id, Chat.PRIVATE), from_user=user)
+    return Update(update_id, message=message)
+
+
+class TestUserOrderedUpdateProcessor(unittest.IsolatedAsyncioTestCase):
+    async def test_ordering_and_concurrency(self):
+        processor = UserOrderedUpdateProcessor(max_concurrent_updates=4)
+        running = set()
+        overlapping = []
+        processed = []
+
+        async def handle(update: Update, delay: float) -> None:
+            user_id = update.effective_user.id
+            # Two updates of a same user never run at once
+            self.assertNotIn(user_id, running)
+            running.add(user_id)
+            overlapping.append(len(running))
+            await asyncio.sleep(delay)
+            running.remove(user_id)
+            processed.append((user_id, update.update_id))
+
+        updates = [_update(i, user_id=i % 2) for i in range(6)]
+        # The first updates are the slowest, they must still be processed first
+        await asyncio.gather(
+            *(
+                processor.process_update(update, handle(update, 0.06 - i / 100))
+                for i, update in enumerate(updates)
+            )
+        )
+
+        for user_id in (0, 1):
+            self.assertEqual(
+                [update_id for user, update_id in processed if user == user_id],
+                [update.update_id for update in updates if update.effective_user.id == user_id],
+            )
+        # The two users were processed concurrently
+        self.assertEqual(max(overlapping), 2)
+        self.assertEqual(processor.stats["pending"], 0)
+        self.assertEqual(processor.stats["processed"], 6)
@@ -0,0 +1,149 @@
+import asyncio
+import socket
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pydantic import ValidationError
+from telegram import Bot, Update
+from telegram.ext import Updater
+
+from telefix.core.bot_launcher import BotLauncher, get_webhook_settings
+from telefix.core.config_template import CoreConfig
+
+from ..webhook_sender import make_text_update, send_updates
+
+SECRET_TOKEN = "test-secret"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _core_config(**overrides) -> CoreConfig:
+    config = {
+        "contact": {
+            "tg_id": {"bot": 1, "admin": 2, "dev": 3, "contractor": 4},
+            "tg_username": {"bot": "test_bot"},
+            "email": {
+                "admin": "admin@example.com",
+                "dev": "dev@example.com",
+                "contractor": "contractor@example.com",
+                "smtp": {"url": "smtp.example.com", "port": 465},
+            },
+        },
+        "media": "media",
+        "persistence": "persistence",
+        "logs": "logs",
+        "docker": {"port": 8443},
+        "update_mode": "webhook",
+        "webhook": {"url": "https://example.com/"},
+        "secret": {
+            "api_openai": "openai",
+            "token_telegram": "123:test",
+            "token_payment_provider": "payment",
+            "password_smtp": "smtp",
+            "token_webhook": SECRET_TOKEN,
+        },
+    }
+    config.update(overrides)
+    return CoreConfig.model_validate(config)
+
+
+class TestWebhookSettings(unittest.TestCase):
+    def test_settings(self):
+        settings = get_webhook_settings(_core_config())
+
+        self.assertEqual(settings["listen"], "0.0.0.0")
+        self.assertEqual(settings["port"], 8443)
+        self.assertEqual(settings["url_path"], "telegram")
+        # The trailing slash of the url is not doubled
+        self.assertEqual(settings["webhook_url"], "https://example.com/telegram")
+        self.assertEqual(settings["secret_token"], SECRET_TOKEN)
+        self.assertEqual(settings["max_connections"], 40)
+        self.assertEqual(settings["allowed_updates"], Update.ALL_TYPES)
+
+    def test_custom_settings(self):
+        core_config = _core_config(
+            docker={"port": 80},
+            webhook={
+                "url": "https://example.com/bot",
+                "listen": "127.0.0.1",
+                "url_path": "updates",
+                "max_connections": 100,
+            },
+        )
+        settings = get_webhook_settings(core_config)
+
+        self.assertEqual(settings["listen"], "127.0.0.1")
+        self.assertEqual(settings["port"], 80)
+        self.assertEqual(settings["url_path"], "updates")
+        self.assertEqual(settings["webhook_url"], "https://example.com/bot/updates")
+        self.assertEqual(settings["max_connections"], 100)
+
+    def test_missing_config(self):
+        secret = _core_config().secret.model_dump()
+        secret["token_webhook"] = None
+        for overrides in ({"docker": None}, {"webhook": None}, {"secret": secret}):
+            with self.subTest(overrides=overrides):
+                with self.assertRaises(ValidationError):
+                    _core_config(**overrides)
+
+        # Only required by the webhook mode
+        _core_config(update_mode="polling", docker=None, webhook=None, secret=secret)
+
+    def test_run_webhook(self):
+        core_config = _core_config()
+        launcher = BotLauncher(SimpleNamespace(core=core_config), MagicMock())
+        application = MagicMock()
+
+        launcher.run_webhook(application)
+
+        application.run_webhook.assert_called_once_with(
+            **get_webhook_settings(core_config), close_loop=False
+        )
+
+
+class TestWebhook(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # No request is made to Telegram, the webhook is only served locally
+        for method in ("initialize", "shutdown", "set_webhook"):
+            patcher = patch.object(Bot, method, AsyncMock(return_value=True))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.port = _free_port()
+        core_config = _core_config(
+            docker={"port": self.port},
+            webhook={"url": "https://example.com", "listen": "127.0.0.1"},
+        )
+        self.update_queue = asyncio.Queue()
+        self.updater = Updater(Bot("123:test"), self.update_queue)
+        await self.updater.initialize()
+        await self.updater.start_webhook(**get_webhook_settings(core_config))
+
+    async def asyncTearDown(self):
+        await self.updater.stop()
+        await self.updater.shutdown()
+
+    async def test_updates_with_secret_token(self):
+        url = f"http://127.0.0.1:{self.port}/telegram"
+        statuses = await send_updates(
+            url, [make_text_update(i, 1, "/start") for i in range(5)], SECRET_TOKEN
+        )
+
+        self.assertEqual(statuses, [200] * 5)
+        self.assertEqual(self.update_queue.qsize(), 5)
+        update = self.update_queue.get_nowait()
+        self.assertEqual(update.message.text, "/start")
+
+    async def test_updates_without_secret_token(self):
+        url = f"http://127.0.0.1:{self.port}/telegram"
+        for secret_token in (None, "wrong"):
+            statuses = await send_updates(
+                url, [make_text_update(1, 1, "/start")], secret_token
+            )
+            self.assertEqual(statuses, [403])
+        self.assertTrue(self.update_queue.empty())
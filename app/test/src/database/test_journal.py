@@ -0,0 +1,28 @@
+import tempfile
+import unittest
+
+from telefix.database.journal import JournalReader, UpdateJournal
+
+
+def _journal(directory: str) -> UpdateJournal:
+    return UpdateJournal(directory, 64, 3600, 100, 100, 100, 3)
+
+
+class TestJournalReader(unittest.TestCase):
+    def test_read_after_interleaved_segments(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Two processes journaling into the same directory, their updates interleaved
+            first, second = _journal(directory), _journal(directory)
+            first._write_frame([{"update_id": 1}, {"update_id": 3}])
+            second._write_frame([{"update_id": 2}, {"update_id": 4}])
+            first._write_frame([{"update_id": 5}, {"update_id": 7}])
+            second._write_frame([{"update_id": 6}, {"update_id": 8}])
+            first._close_segment()
+            second._close_segment()
+
+            updates = [update["update_id"] for update in JournalReader(directory).read(4)]
+            self.assertEqual(sorted(updates), [5, 6, 7, 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Local stand-in for the Telegram Bot API and OpenAI's chat completions, for the load test.
+
+The bot's requests are answered as Telegram would, without sending anything: the sent messages get
+an id and are kept, by chat, so that the load test can press the buttons of their inline keyboards.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import tornado.httpserver
+import tornado.netutil
+import tornado.web
+
+# Methods answered with the sent message
+_SEND_METHODS = {
+    "sendmessage",
+    "sendphoto",
+    "senddocument",
+    "sendanimation",
+    "sendvideo",
+    "sendsticker",
+    "sendinvoice",
+    "copymessage",
+    "forwardmessage",
+}
+_EDIT_METHODS = {"editmessagetext", "editmessagereplymarkup", "editmessagecaption"}
+
+
+class FakeBotApi:
+    """
+    Serves the Bot API methods the bot calls, on `http://127.0.0.1:<port>/bot<token>/<method>`, and
+    OpenAI's `/v1/chat/completions`.
+
+    Attributes:
+        bot_user (dict): The JSON of the bot's own user, returned by getMe.
+        latency_s (float): Delay added to every answer, as the round trip to Telegram.
+        calls (Counter): Number of calls by method.
+        last_messages (Dict[int, dict]): The last message sent or edited with an inline keyboard,
+            by chat.
+
+    Methods:
+        start(port): Starts serving from a thread, returns the base URL for `core.bot_api_url`.
+        stop(): Stops serving.
+        answer(method, params): The result of a Bot API call.
+    """
+
+    def __init__(self, bot_user: dict, latency_s: float = 0.0):
+        self.bot_user = bot_user
+        self.latency_s = latency_s
+        self.calls: Counter = Counter()
+        self.last_messages: Dict[int, dict] = {}
+        self._message_ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    def start(self, port: int = 0) -> str:
+        sockets = tornado.netutil.bind_sockets(port, "127.0.0.1")
+        started = threading.Event()
+        # Served from a thread of its own, so that it does not compete with the bot for its event
+        # loop, as Telegram would not
+        self._thread = threading.Thread(
+            target=self._serve, args=(sockets, started), name="fake-bot-api", daemon=True
+        )
+        self._thread.start()
+        started.wait()
+        return f"http://127.0.0.1:{sockets[0].getsockname()[1]}"
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+        self._thread = None
+
+    def _serve(self, sockets: list, started: threading.Event) -> None:
+        async def serve() -> None:
+            self._loop = asyncio.get_running_loop()
+            self._stopped = asyncio.Event()
+            application = tornado.web.Application(
+                [
+                    (r"/bot[^/]+/(\w+)", _BotApiHandler, {"api": self}),
+                    (r"/v1/chat/completions", _ChatCompletionsHandler, {"api": self}),
+                ]
+            )
+            server = tornado.httpserver.HTTPServer(application)
+            server.add_sockets(sockets)
+            started.set()
+            await self._stopped.wait()
+            server.stop()
+            await server.close_all_connections()
+
+        asyncio.run(serve())
+
+    def answer(self, method: str, params: Dict[str, Any]) -> Any:
+        self.calls[method] += 1
+        method = method.lower()
+        if method == "getme":
+            return self.bot_user
+        if method == "getupdates":
+            return []
+        if method in _SEND_METHODS:
+            return self._message(method, params, next(self._message_ids))
+        if method in _EDIT_METHODS and "inline_message_id" not in params:
+            return self._message(method, params, int(params["message_id"]))
+        return True
+
+    def _message(self, method: str, params: Dict[str, Any], message_id: int) -> dict:
+        chat_id = int(params["chat_id"])
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": self.bot_user,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if method == "sendphoto":
+            message["photo"] = [
+                {"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}
+            ]
+        reply_markup = params.get("reply_markup")
+        if isinstance(reply_markup, dict) and "inline_keyboard" in reply_markup:
+            message["reply_markup"] = reply_markup
+            self.last_messages[chat_id] = message
+        return message
+
+
+class _BotApiHandler(tornado.web.RequestHandler):
+    def initialize(self, api: FakeBotApi) -> None:
+        self.api = api
+
+    async def post(self, method: str) -> None:
+        # PTB sends form data, its non-string values encoded as JSON
+        params = {
+            name: _decode(values[0].decode())
+            for name, values in self.request.body_arguments.items()
+        }
+        if self.api.latency_s:
+            await asyncio.sleep(self.api.latency_s)
+        self.write({"ok": True, "result": self.api.answer(method, params)})
+
+
+class _ChatCompletionsHandler(tornado.web.RequestHandler):
+    def initialize(self, api: FakeBotApi) -> None:
+        self.api = api
+
+    async def post(self) -> None:
+        request = json.loads(self.request.body)
+        self.api.calls["chat.completions"] += 1
+        if self.api.latency_s:
+            await asyncio.sleep(self.api.latency_s)
+        self.write(
+            {
+                "id": "chatcmpl-load-test",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-3.5-turbo"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Load test answer"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+
+def _decode(value: str) -> Any:
+    if value[:1] in ("{", "["):
+        return json.loads(value)
+    return value
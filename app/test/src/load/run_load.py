@@ -0,0 +1,367 @@
+"""
+Load test of the whole bot: virtual users replay scenarios, or recorded updates, into the real
+application built by the `BotLauncher` and `ModuleManager`, the Bot API and OpenAI being served by
+a local `FakeBotApi`, Weaviate, PostgreSQL and tiktoken's encodings replaced by local stand-ins.
+
+Reports the throughput and the p50/p95/p99 latencies of every update and handler, and compares
+them to a baseline report to catch regressions before deploy.
+
+Usage, from the test directory with telefix installed:
+    python -m src.load.run_load --app_config_path ../config/dev --users 200 --repeat 5
+    python -m src.load.run_load --app_config_path ../config/dev --save baseline.json
+    python -m src.load.run_load --app_config_path ../config/dev --baseline baseline.json
+    telefix-journal dump /app/journal | python -m src.load.run_load \
+        --app_config_path ../config/dev --replay -
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+from unittest.mock import patch
+
+import yaml
+from loguru import logger
+
+from telegram import Update
+from telegram.ext import Application, BaseHandler, ConversationHandler, ExtBot
+
+from telefix.common import helpers
+from telefix.common.routing import CallbackQueryRouter
+from telefix.common.types import StdModuleType, TgModuleType
+from telefix.telefix import create_bot_launcher, load_bot_config
+
+from .fake_bot_api import FakeBotApi
+from .scenarios import SCENARIOS, Step, UpdateFactory, read_recorded
+from .stand_ins import (
+    CountingErrorHandler,
+    FakeDatabasePool,
+    FakeEncoding,
+    FakeVectorDatabase,
+)
+
+BOT_USER = {
+    "id": 123456,
+    "is_bot": True,
+    "first_name": "Load test",
+    "username": "load_test_bot",
+}
+
+# Label of the end to end latency of the updates, from their reception to the last handler
+UPDATE_LABEL = "update"
+
+_FIRST_USER_ID = 10_000
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: Dict[str, List[float]], duration_s: float) -> dict:
+    """
+    Builds the report of a run.
+
+    Parameters:
+    - latencies : Dict[str, List[float]] : The latencies in seconds, by label.
+    - duration_s : float : The duration of the run.
+
+    Returns:
+    - dict : The throughput and, by label, the count and the mean/p50/p95/p99 latencies in ms.
+    """
+    labels = {}
+    for label, values in sorted(latencies.items()):
+        values = sorted(values)
+        labels[label] = {
+            "count": len(values),
+            "mean_ms": 1000 * sum(values) / len(values),
+            **{
+                f"p{q}_ms": 1000 * percentile(values, q)
+                for q in (50, 95, 99)
+            },
+        }
+    updates = len(latencies.get(UPDATE_LABEL, []))
+    return {
+        "updates": updates,
+        "duration_s": duration_s,
+        "updates_per_s": updates / duration_s if duration_s else 0.0,
+        "errors": dict(CountingErrorHandler.errors),
+        "labels": labels,
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['updates']} updates in {report['duration_s']:.2f}s: "
+        f"{report['updates_per_s']:.1f} updates/s, errors: {report['errors'] or 'none'}, "
+        f"skipped steps: {report.get('skipped_steps', 0)}",
+        f"{'':60} {'count':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)",
+    ]
+    for label, stats in report["labels"].items():
+        lines.append(
+            f"{label[:60]:60} {stats['count']:>7} {stats['mean_ms']:>8.2f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Compares a report to a baseline report.
+
+    Parameters:
+    - report : dict : The report of the run.
+    - baseline : dict : The report of a reference run, e.g. of the deployed version.
+    - tolerance : float : Relative slowdown tolerated, e.g. 0.2 for 20%.
+
+    Returns:
+    - List[str] : The throughput and p95 latencies worse than the baseline beyond the tolerance.
+    """
+    regressions = []
+    if report["updates_per_s"] < baseline["updates_per_s"] * (1 - tolerance):
+        regressions.append(
+            f"throughput: {report['updates_per_s']:.1f} updates/s "
+            f"(baseline {baseline['updates_per_s']:.1f})"
+        )
+    for label, stats in report["labels"].items():
+        reference = baseline["labels"].get(label)
+        if reference and stats["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label} p95: {stats['p95_ms']:.2f}ms (baseline {reference['p95_ms']:.2f}ms)"
+            )
+    return regressions
+
+
+def handler_label(handler: BaseHandler, check_result: object) -> str:
+    if isinstance(handler, CallbackQueryRouter):
+        callback = check_result
+    elif isinstance(handler, ConversationHandler):
+        return f"ConversationHandler:{handler.name or 'conversation'}"
+    else:
+        callback = handler.callback
+    # Unwrap the partials the modules pass their settings with
+    callback = getattr(callback, "func", callback)
+    name = getattr(callback, "__qualname__", type(callback).__name__)
+    return f"{type(handler).__name__}:{name}"
+
+
+def instrument_handlers(
+    application: Application, latencies: Dict[str, List[float]]
+) -> contextlib.ExitStack:
+    """
+    Times every handler of the application, including those nested in conversations, by patching
+    the `handle_update` of their classes for as long as the returned stack is open.
+    """
+    classes = set()
+    pending = [handler for group in application.handlers.values() for handler in group]
+    while pending:
+        handler = pending.pop()
+        classes.add(type(handler))
+        if isinstance(handler, ConversationHandler):
+            pending.extend(handler.entry_points)
+            pending.extend(handler.fallbacks)
+            for state_handlers in handler.states.values():
+                pending.extend(state_handlers)
+
+    stack = contextlib.ExitStack()
+    for cls in classes:
+        handle_update = cls.handle_update
+
+        async def timed(
+            self, update, application, check_result, context, handle_update=handle_update
+        ):
+            start = time.perf_counter()
+            try:
+                return await handle_update(self, update, application, check_result, context)
+            finally:
+                latencies[handler_label(self, check_result)].append(
+                    time.perf_counter() - start
+                )
+
+        stack.enter_context(patch.object(cls, "handle_update", timed))
+    return stack
+
+
+async def run_user(
+    application: Application,
+    factory: UpdateFactory,
+    user_id: int,
+    steps: List[Step],
+    latencies: Dict[str, List[float]],
+) -> None:
+    """Sends the steps of a virtual user one after the other, each once the previous is processed"""
+    for step in steps:
+        data = factory.make(user_id, step)
+        if data is None:
+            continue
+        start = time.perf_counter()
+        # As done by PTB's updaters
+        update = Update.de_json(data, application.bot)
+        if isinstance(application.bot, ExtBot):
+            application.bot.insert_callback_data(update)
+        await application.update_processor.process_update(
+            update, application.process_update(update)
+        )
+        elapsed = time.perf_counter() - start
+        latencies[UPDATE_LABEL].append(elapsed)
+        latencies[f"{UPDATE_LABEL}:{type(step).__name__}"].append(elapsed)
+
+
+def prepare_config(app_config_path: pathlib.Path, api_url: str, work_dir: str, media: str):
+    """
+    Loads the bot's configuration, with dummy secrets where the environment has none, pointing the
+    bot to the fake Bot API and its persistence to the work directory.
+    """
+    with open(app_config_path / "core.yaml") as file:
+        secret_names = yaml.safe_load(file)["core"]["secret"].values()
+    with open(app_config_path / "database.yaml") as file:
+        secret_names = [*secret_names, *yaml.safe_load(file)["database"]["secret"].values()]
+    for name in secret_names:
+        os.environ.setdefault(name, f"{BOT_USER['id']}:load-test")
+
+    config = load_bot_config(app_config_path)
+    config.core.bot_api_url = api_url
+    config.core.persistence = str(pathlib.Path(work_dir) / "persistence.sqlite")
+    config.core.maintenance.first_run_delay_s = 3600
+    config.database.journal.enabled = False
+    if media is not None:
+        config.core.media = media
+    return config
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    api = FakeBotApi(BOT_USER, latency_s=args.api_latency_ms / 1000)
+    api_url = api.start()
+    try:
+        import openai
+
+        openai.api_base = f"{api_url}/v1"
+        openai.api_key = "load-test"
+    except ImportError:
+        pass
+
+    # Counted without the network, tiktoken downloading its encodings
+    encoding = FakeEncoding()
+    with tempfile.TemporaryDirectory() as work_dir, patch.object(
+        helpers, "_get_encoding", lambda model_name: encoding
+    ):
+        config = prepare_config(
+            pathlib.Path(args.app_config_path), api_url, work_dir, args.media
+        )
+        launcher = create_bot_launcher(
+            pathlib.Path(args.app_config_path), config, "WARNING"
+        )
+        module_manager = launcher.module_manager
+        CountingErrorHandler.errors.clear()
+        module_manager.tg_modules = [
+            CountingErrorHandler if module.TYPE == TgModuleType.ERROR_LOGGING else module
+            for module in module_manager.tg_modules
+        ]
+        # Taken instead of creating the standard modules, which would connect to the services
+        module_manager.std_module_instances = {
+            StdModuleType.VECTOR_DATABASE: FakeVectorDatabase(
+                encode_latency_s=args.encode_latency_ms / 1000
+            ),
+            StdModuleType.DATABASE: FakeDatabasePool(
+                latency_s=args.db_latency_ms / 1000
+            ),
+        }
+        application = launcher.build_application(launcher.create_persistence())
+
+        rng = random.Random(args.seed)
+        if args.replay:
+            with (sys.stdin if args.replay == "-" else open(args.replay)) as file:
+                users = read_recorded(file)
+        else:
+            scenarios = [SCENARIOS[name] for name in args.scenarios.split(",")]
+            users = {
+                _FIRST_USER_ID + i: [
+                    step for _ in range(args.repeat) for step in scenarios[i % len(scenarios)]
+                ]
+                for i in range(args.users)
+            }
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        factory = UpdateFactory(api, application.bot, rng)
+        await application.initialize()
+        await application.post_init(application)
+        await application.start()
+        try:
+            with instrument_handlers(application, latencies):
+                start = time.perf_counter()
+                await asyncio.gather(
+                    *(
+                        run_user(application, factory, user_id, steps, latencies)
+                        for user_id, steps in users.items()
+                    )
+                )
+                duration_s = time.perf_counter() - start
+        finally:
+            await application.stop()
+            await application.shutdown()
+            await application.post_shutdown(application)
+            api.stop()
+
+    report = summarize(latencies, duration_s)
+    report["skipped_steps"] = factory.skipped
+    report["bot_api_calls"] = dict(api.calls)
+    return report
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test of the bot")
+    parser.add_argument("--app_config_path", required=True, help="e.g. ../config/dev")
+    parser.add_argument("--media", help="Media directory, instead of the configured one")
+    parser.add_argument("--users", type=int, default=100, help="Number of virtual users")
+    parser.add_argument("--repeat", type=int, default=3, help="Scenario runs by user")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma separated, among {', '.join(SCENARIOS)}, given round robin to the users",
+    )
+    parser.add_argument(
+        "--replay", help="File of recorded updates, one JSON by line, - for stdin"
+    )
+    parser.add_argument("--api_latency_ms", type=float, default=0.0)
+    parser.add_argument("--db_latency_ms", type=float, default=0.0)
+    parser.add_argument("--encode_latency_ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Writes the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    report = asyncio.run(run_load_test(args))
+    print(format_report(report))
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+The user journeys replayed by the load test, and the updates they send.
+
+A scenario is a list of steps, sent one after the other by a virtual user, every step waiting for
+the previous update to be processed, as a user waits for the bot's answer before going on.
+"""
+
+import itertools
+import json
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from telegram.ext import ExtBot
+
+from ..webhook_sender import make_text_update, make_user
+from .fake_bot_api import FakeBotApi
+
+
+class Text(NamedTuple):
+    """A text message, or a command when starting with "/" """
+
+    text: str
+
+
+class Press(NamedTuple):
+    """
+    A press on a button of the last inline keyboard sent to the user, found by its callback_data,
+    or picked among the buttons not in `skip` when None
+    """
+
+    data: Optional[str] = None
+    skip: tuple = ()
+
+
+class Inline(NamedTuple):
+    """An inline query"""
+
+    query: str
+
+
+class Recorded(NamedTuple):
+    """A recorded update, e.g. from the update journal"""
+
+    update: dict
+
+
+Step = Union[Text, Press, Inline, Recorded]
+
+# Navigation buttons of the wiki pages, see telefix.user.wiki.constants
+_WIKI_NAVIGATION = ("<< НАЗАД", "❌ЗАКРЫТЬ")
+
+SCENARIOS: Dict[str, List[Step]] = {
+    "start": [Text("/start")],
+    "wiki": [
+        Text("/wiki"),
+        Press(skip=_WIKI_NAVIGATION),
+        Press(skip=_WIKI_NAVIGATION),
+        Press(_WIKI_NAVIGATION[0]),
+        Press(_WIKI_NAVIGATION[1]),
+    ],
+    "chat": [
+        Text("/chat"),
+        Text("Компьютер стал медленно работать, что делать?"),
+        Text("Как обновить драйверы видеокарты?"),
+        Text("/chat_stop"),
+    ],
+    "request": [Text("/request"), Press("REQUEST_CALL_CONFIRM")],
+    "inline": [Inline("windows")],
+}
+
+
+def read_recorded(lines: Iterable[str]) -> Dict[int, List[Step]]:
+    """
+    Reads recorded updates, one JSON object by line (e.g. `telefix-journal dump`), into the steps
+    of every user, in order.
+    """
+    steps: Dict[int, List[Step]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        update = json.loads(line)
+        content = next(
+            (value for key, value in update.items() if key != "update_id"), {}
+        )
+        sender = content.get("from") or content.get("chat") or {"id": 0}
+        steps.setdefault(sender["id"], []).append(Recorded(update))
+    return steps
+
+
+class UpdateFactory:
+    """
+    Makes the JSON of the updates of the steps, as Telegram would send them.
+
+    Button presses are made from the last inline keyboard the fake Bot API got for the chat. With
+    the arbitrary callback data of the bot, the keyboard holds the keys of the bot's cache: the
+    button is then found by its original callback_data through the bot's cache.
+
+    Attributes:
+        api (FakeBotApi): The fake Bot API the bot sends its messages to.
+        bot (ExtBot): The bot, for its callback data cache.
+        rng (random.Random): Picks the buttons of the `Press` steps without callback_data.
+        skipped (int): Number of steps without an update, their button not being found.
+
+    Methods:
+        make(user_id, step): The update of the step, None if it cannot be made (e.g. no keyboard).
+    """
+
+    def __init__(self, api: FakeBotApi, bot: ExtBot, rng: random.Random):
+        self.api = api
+        self.bot = bot
+        self.rng = rng
+        self.skipped = 0
+        self._update_ids: Iterator[int] = itertools.count(1)
+
+    def make(self, user_id: int, step: Step) -> Optional[dict]:
+        update_id = next(self._update_ids)
+        if isinstance(step, Text):
+            return make_text_update(update_id, user_id, step.text)
+        if isinstance(step, Inline):
+            return {
+                "update_id": update_id,
+                "inline_query": {
+                    "id": str(update_id),
+                    "from": make_user(user_id),
+                    "query": step.query,
+                    "offset": "",
+                },
+            }
+        if isinstance(step, Recorded):
+            update = dict(step.update, update_id=update_id)
+            callback_query = update.get("callback_query")
+            if callback_query and isinstance(callback_query.get("data"), str):
+                pressed = self._press(callback_query["from"]["id"], callback_query["data"], ())
+                if pressed is not None:
+                    update["callback_query"] = dict(
+                        callback_query, data=pressed[0], message=pressed[1]
+                    )
+            return update
+
+        pressed = self._press(user_id, step.data, step.skip)
+        if pressed is None:
+            self.skipped += 1
+            return None
+        data, message = pressed
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": make_user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": message,
+            },
+        }
+
+    def _press(self, chat_id: int, data: Optional[str], skip: tuple):
+        message = self.api.last_messages.get(chat_id)
+        if message is None:
+            return None
+        resolved = self._resolve_callback_data()
+        buttons = [
+            button["callback_data"]
+            for row in message["reply_markup"]["inline_keyboard"]
+            for button in row
+            if "callback_data" in button
+        ]
+        original = {sent: resolved.get(sent, sent) for sent in buttons}
+        if data is None:
+            candidates = [sent for sent in buttons if original[sent] not in skip]
+        else:
+            candidates = [sent for sent in buttons if original[sent] == data]
+        if not candidates:
+            return None
+        message = dict(message, date=int(time.time()))
+        return self.rng.choice(candidates), message
+
+    def _resolve_callback_data(self) -> Dict[str, object]:
+        cache = self.bot.callback_data_cache
+        if cache is None:
+            return {}
+        keyboards, _ = cache.persistence_data
+        return {
+            keyboard_uuid + button_uuid: original
+            for keyboard_uuid, _, buttons in keyboards
+            for button_uuid, original in buttons.items()
+        }
@@ -0,0 +1,161 @@
+"""
+Local stand-ins for the services the bot's modules depend on, for the load test.
+
+They replace the standard modules reaching out to Weaviate and PostgreSQL, the error handler
+connecting to the SMTP server and tiktoken's encodings downloaded on first use, keeping the
+interface the modules use.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, List, Optional
+
+from loguru import logger
+
+from telegram.ext import ContextTypes
+
+from telefix.common.types import StdModuleType, TgModuleType
+from telefix.vector_database.embedding_service import EmbeddingService
+
+
+class _FakeEmbeddingModel:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        # The CPU time of the sentence transformer, blocking like the model does, by batch
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return [[float(len(text) % 7), 1.0, 0.0] for text in texts]
+
+
+class FakeEncoding:
+    """Stand-in for tiktoken's encodings, counting a token by word"""
+
+    def encode(self, text: str) -> List[str]:
+        return text.split()
+
+
+class FakeVectorDatabase:
+    """
+    Stand-in for the `VectorDatabase`, every prompt being close to the filters by `certainty`.
+
+    Attributes:
+        semantic_threshold (float): Certainty required for a prompt to be valid.
+        certainty (float): Certainty of every query result.
+        embedding_model: Encodes the prompts, taking `encode_latency_s` by batch.
+        embedding_service (EmbeddingService): Encodes the prompts with `embedding_model`, as the
+            `VectorDatabase` does.
+        ready (asyncio.Event): Always set, there is no model to load.
+
+    Methods:
+        embed(text): Encodes a text through `embedding_service`, awaited.
+        vector_query(class_name, embeddings): The query result, with `certainty`.
+    """
+
+    TYPE = StdModuleType.VECTOR_DATABASE
+
+    def __init__(
+        self,
+        semantic_threshold: float = 0.5,
+        certainty: float = 0.9,
+        encode_latency_s: float = 0.0,
+    ):
+        self.semantic_threshold = semantic_threshold
+        self.certainty = certainty
+        self.embedding_model = _FakeEmbeddingModel(encode_latency_s)
+        self.embedding_service = EmbeddingService(self.embedding_model.encode)
+        self.ready = asyncio.Event()
+        self.ready.set()
+
+    async def embed(self, text: str) -> List[float]:
+        return await self.embedding_service.embed(text)
+
+    def vector_query(self, class_name: str, embeddings: Any) -> List[dict]:
+        return [{"_additional": {"certainty": self.certainty}}]
+
+
+class _FakeCursor:
+    def __init__(self, pool: "FakeDatabasePool"):
+        self.pool = pool
+
+    async def __aenter__(self) -> "_FakeCursor":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        pass
+
+    async def execute(self, query: str, params: Optional[tuple] = None) -> "_FakeCursor":
+        await self.pool.query()
+        return self
+
+    async def executemany(self, query: str, params_seq: List[tuple]) -> None:
+        await self.pool.query()
+
+    async def fetchone(self) -> None:
+        return None
+
+    async def fetchall(self) -> List[tuple]:
+        return []
+
+
+class _FakeConnection(_FakeCursor):
+    def cursor(self) -> _FakeCursor:
+        return _FakeCursor(self.pool)
+
+
+class FakeDatabasePool:
+    """
+    Stand-in for the `DatabasePool`, whose queries all succeed without returning rows.
+
+    Attributes:
+        db_auth (dict): Empty, there is no database to connect to.
+        latency_s (float): Duration of every query.
+        queries (int): Number of queries run.
+
+    Methods:
+        connection(): Async context manager yielding a connection.
+    """
+
+    TYPE = StdModuleType.DATABASE
+
+    def __init__(self, latency_s: float = 0.0):
+        self.db_auth = {}
+        self.latency_s = latency_s
+        self.queries = 0
+
+    def connection(self) -> _FakeConnection:
+        return _FakeConnection(self)
+
+    async def query(self) -> None:
+        self.queries += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+
+class CountingErrorHandler:
+    """
+    Stand-in for the `ErrorHandler`, counting the errors raised by the handlers instead of mailing
+    them.
+
+    Attributes:
+        errors (Counter): Number of errors by exception type.
+    """
+
+    TYPE = TgModuleType.ERROR_LOGGING
+    errors: Counter = Counter()
+
+    def __init__(self, *_):
+        pass
+
+    def get_handler(self):
+        return self.count_error
+
+    @classmethod
+    async def count_error(cls, _: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        name = type(context.error).__name__
+        cls.errors[name] += 1
+        if cls.errors[name] == 1:
+            # The first of a kind only, the report counts them all
+            logger.opt(exception=context.error).warning("Error while handling an update")
@@ -0,0 +1,48 @@
+import pathlib
+import tempfile
+import unittest
+
+from .run_load import UPDATE_LABEL, parse_args, run_load_test
+from .scenarios import SCENARIOS
+
+APP_DIR = pathlib.Path(__file__).resolve().parents[3]
+
+# The request scenario fails on users without a last name, reported by the load test itself
+SMOKE_SCENARIOS = ["start", "wiki", "chat", "inline"]
+
+
+def _local_config(directory: pathlib.Path) -> pathlib.Path:
+    """The dev configuration, its media paths of the container pointed to the repository's"""
+    for source in (APP_DIR / "config" / "dev").glob("*.yaml"):
+        text = source.read_text().replace("/app/telefix/media", str(APP_DIR / "media"))
+        (directory / source.name).write_text(text)
+    return directory
+
+
+class TestRunLoad(unittest.IsolatedAsyncioTestCase):
+    async def test_smoke(self):
+        users = 2 * len(SMOKE_SCENARIOS)
+        with tempfile.TemporaryDirectory() as directory:
+            args = parse_args(
+                [
+                    "--app_config_path",
+                    str(_local_config(pathlib.Path(directory))),
+                    "--users",
+                    str(users),
+                    "--repeat",
+                    "1",
+                    "--scenarios",
+                    ",".join(SMOKE_SCENARIOS),
+                ]
+            )
+            report = await run_load_test(args)
+
+        steps = sum(len(SCENARIOS[name]) for name in SMOKE_SCENARIOS) * 2
+        self.assertEqual(report["updates"], steps)
+        self.assertEqual(report["skipped_steps"], 0)
+        self.assertEqual(report["errors"], {})
+        # Every update went through the real application's handlers
+        self.assertEqual(report["labels"]["TypeHandler:collect_data"]["count"], steps)
+        self.assertIn("CommandHandler:start", report["labels"])
+        self.assertIn(UPDATE_LABEL, report["labels"])
+        self.assertGreater(report["bot_api_calls"].get("sendMessage", 0), 0)
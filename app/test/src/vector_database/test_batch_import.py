@@ -0,0 +1,34 @@
+import unittest
+
+from telefix.vector_database.batch_import import BatchImportReport, ObjectImportError
+
+
+def _result(uuid: str, *messages: str) -> dict:
+    result = {"id": uuid, "class": "EnglishFilters", "result": {}}
+    if messages:
+        result["result"]["errors"] = {"error": [{"message": message} for message in messages]}
+    return result
+
+
+class TestBatchImportReport(unittest.TestCase):
+    def test_errors_by_batch(self):
+        report = BatchImportReport("EnglishFilters")
+        report.add_results([_result("a"), _result("b")])
+        report.add_results([_result("c", "invalid vector length")])
+        # A batch whose request failed altogether
+        report.add_results(None)
+
+        self.assertEqual(report.batches, 3)
+        self.assertEqual(report.objects, 3)
+        self.assertEqual(
+            report.errors[0],
+            ObjectImportError(2, "EnglishFilters", "c", "invalid vector length"),
+        )
+        # Recorded, so that the import is not taken for a success
+        self.assertEqual(len(report.errors), 2)
+        self.assertEqual(report.errors[1].batch, 3)
+        self.assertEqual(report.errors[1].uuid, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from telefix.vector_database.embedding_cache import EmbeddingCache
+
+MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class _Model:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text: str) -> np.ndarray:
+        self.encoded.append(text)
+        return np.full(4, len(text), dtype=np.float32)
+
+
+def _encode(cache: EmbeddingCache, model: _Model, text: str) -> np.ndarray:
+    vector = cache.get(text)
+    if vector is None:
+        vector = model.encode(text)
+        cache.put(text, vector)
+    return vector
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_memory(self):
+        cache = EmbeddingCache(MODEL, max_size=2)
+        model = _Model()
+        _encode(cache, model, "Hello")
+        _encode(cache, model, "  hello ")
+        _encode(cache, model, "How to update drivers?")
+        _encode(cache, model, "My phone is slow")
+        _encode(cache, model, "hello")
+
+        # Normalized duplicates hit, the least recently used is evicted
+        self.assertEqual(
+            model.encoded, ["Hello", "How to update drivers?", "My phone is slow", "hello"]
+        )
+        self.assertEqual(cache.stats, {"hits": 1, "disk_hits": 0, "misses": 4, "evictions": 2})
+        self.assertAlmostEqual(cache.hit_rate(), 0.2)
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = EmbeddingCache(MODEL, max_size=1, path=path, disk_size=2)
+            cache.open()
+            for text in ("first", "second", "third"):
+                cache.put(text, np.full(4, len(text), dtype=np.float32))
+            cache.flush()
+
+            # Restarted, the disk tier holds the last disk_size encodings
+            restarted = EmbeddingCache(MODEL, max_size=1, path=path, disk_size=2)
+            restarted.open()
+            self.assertIsNone(restarted.get("first"))
+            np.testing.assert_array_equal(restarted.get("SECOND"), np.full(4, 6))
+            np.testing.assert_array_equal(restarted.get("third"), np.full(4, 5))
+            self.assertEqual(restarted.stats["disk_hits"], 2)
+
+            other_model = EmbeddingCache("other", path=path, disk_size=2)
+            other_model.open()
+            self.assertIsNone(other_model.get("third"))
+
+    def test_slot_overwritten(self):
+        with tempfile.TemporaryDirectory() as path:
+            first = EmbeddingCache(MODEL, max_size=0, path=path, disk_size=2)
+            first.open()
+            first.put("hello", np.full(4, 1, dtype=np.float32))
+            second = EmbeddingCache(MODEL, max_size=0, path=path, disk_size=2)
+            second.open()
+            second.put("world", np.full(4, 2, dtype=np.float32))
+
+            # Both writing from the same slot, the one of "hello" now holds "world": a miss, not the vector of "world"
+            self.assertIsNone(first.get("hello"))
+            np.testing.assert_array_equal(second.get("world"), np.full(4, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from telefix.vector_database.embedding_service import EmbeddingService
+
+
+class _Model:
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.batches = []
+        self.threads = set()
+
+    def encode(self, texts):
+        self.batches.append(texts)
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.latency_s)
+        if "fail" in texts:
+            raise ValueError("cannot encode")
+        return [[float(len(text))] for text in texts]
+
+
+class TestEmbeddingService(unittest.TestCase):
+    def test_batches(self):
+        model = _Model(latency_s=0.05)
+        service = EmbeddingService(model.encode, max_batch_size=3, max_wait_ms=10)
+
+        async def run():
+            first = await asyncio.gather(*(service.embed(text) for text in ("a", "bb", "a")))
+            # Requested while the first batch of the three is encoded, batched in the next one
+            later = asyncio.gather(*(service.embed(text) for text in ("ccc", "dddd", "e", "ff")))
+            ticks = 0
+            while not later.done():
+                await asyncio.sleep(0.005)
+                ticks += 1
+            return first, await later, ticks
+
+        first, later, ticks = asyncio.run(run())
+        service.close()
+
+        self.assertEqual(first, [[1.0], [2.0], [1.0]])
+        self.assertEqual(later, [[3.0], [4.0], [1.0], [2.0]])
+        self.assertEqual(model.batches, [["a", "bb"], ["ccc", "dddd", "e"], ["ff"]])
+        self.assertEqual(service.stats, {"texts": 7, "batches": 3})
+        self.assertTrue(all(name.startswith("embedding") for name in model.threads))
+        # The event loop kept running during the encodings
+        self.assertGreater(ticks, 5)
+
+    def test_error(self):
+        service = EmbeddingService(_Model().encode, max_wait_ms=1)
+
+        async def run():
+            return await asyncio.gather(
+                service.embed("fail"), service.embed("ok"), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        service.close()
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
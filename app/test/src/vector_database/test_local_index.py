@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from telefix.vector_database.local_index import LocalIndex
+
+
+class TestLocalIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = LocalIndex(
+            {
+                "EnglishFilters": (["drivers", "phone"], np.array([[2.0, 0.0], [0.0, 1.0]])),
+                "RussianFilters": (["драйверы"], np.array([[1.0, 1.0]])),
+                "EmptyFilters": ([], np.empty((0, 2))),
+            }
+        )
+
+    def test_certainty(self):
+        results = self.index.query("EnglishFilters", [1.0, 0.0], certainty=0.0)
+        self.assertEqual([result["content"] for result in results], ["drivers", "phone"])
+        # (1 + cosine) / 2, as Weaviate's certainty
+        self.assertAlmostEqual(results[0]["_additional"]["certainty"], 1.0)
+        self.assertAlmostEqual(results[1]["_additional"]["certainty"], 0.5)
+
+    def test_threshold_and_limit(self):
+        self.assertEqual(len(self.index.query("EnglishFilters", [1.0, 0.0], 0.75)), 1)
+        self.assertEqual(len(self.index.query("EnglishFilters", [1.0, 1.0], 0.0, 1)), 1)
+        results = self.index.query("RussianFilters", [3.0, 0.0], 0.8)
+        self.assertEqual(results[0]["content"], "драйверы")
+        self.assertEqual(self.index.query("EmptyFilters", [1.0, 0.0]), [])
+
+    def test_float16(self):
+        index = LocalIndex({"EnglishFilters": (["drivers"], np.array([[3.0, 4.0]]))}, "float16")
+        self.assertEqual(index.matrix.dtype, np.float16)
+        certainty = index.query("EnglishFilters", [3.0, 4.0])[0]["_additional"]["certainty"]
+        self.assertAlmostEqual(certainty, 1.0, places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from telefix.vector_database.vector_database import diff_objects
+
+
+class TestDiffObjects(unittest.TestCase):
+    def test_only_changes(self):
+        expected = {"1": "How to update drivers?", "2": "My phone is slow", "4": "Windows"}
+        to_insert, to_delete = diff_objects(expected, {"1", "2", "3", "5"})
+
+        self.assertEqual(to_insert, ["Windows"])
+        self.assertEqual(to_delete, ["3", "5"])
+
+    def test_unchanged(self):
+        self.assertEqual(diff_objects({"1": "Windows"}, {"1"}), ([], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Local stand-in for Telegram's webhook requests, to feed updates to a bot served in webhook mode.
+
+Usage: python -m test.src.webhook_sender -u http://127.0.0.1:8081/telegram -s SECRET -n 100
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from typing import Iterable, List, Optional
+
+import httpx
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def make_text_update(update_id: int, user_id: int, text: str) -> dict:
+    """Returns the JSON of an update of a private text message, as Telegram sends it"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": "Test"},
+        "from": make_user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        # Telegram marks the command, which the CommandHandlers rely on
+        command_length = len(text.split(maxsplit=1)[0])
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": command_length}]
+    return {"update_id": update_id, "message": message}
+
+
+def make_user(user_id: int) -> dict:
+    """Returns the JSON of a test user"""
+    return {"id": user_id, "is_bot": False, "first_name": "Test", "username": f"user{user_id}"}
+
+
+async def send_updates(
+    url: str,
+    updates: Iterable[dict],
+    secret_token: Optional[str],
+    concurrency: int = 10,
+) -> List[int]:
+    """
+    Posts the updates to the webhook, like Telegram does.
+
+    Parameters:
+    - url : str : The webhook URL.
+    - updates : Iterable[dict] : The JSON of the updates.
+    - secret_token : Optional[str] : Sent in the secret token header when set.
+    - concurrency : int : Maximum number of requests in flight.
+
+    Returns:
+    - List[int] : The HTTP status of every request, in order.
+    """
+    headers = {SECRET_TOKEN_HEADER: secret_token} if secret_token else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(headers=headers) as client:
+
+        async def send(update: dict) -> int:
+            async with semaphore:
+                response = await client.post(url, json=update)
+                return response.status_code
+
+        return list(await asyncio.gather(*(send(update) for update in updates)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Posts test updates to a webhook")
+    parser.add_argument("-u", "--url", default="http://127.0.0.1:8081/telegram")
+    parser.add_argument("-s", "--secret_token", help="Webhook secret token")
+    parser.add_argument("-n", "--count", type=int, default=1, help="Number of updates")
+    parser.add_argument("--user_id", type=int, default=1, help="Sender of the messages")
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--first_update_id", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    update_ids = itertools.count(args.first_update_id)
+    updates = [
+        make_text_update(next(update_ids), args.user_id, args.text)
+        for _ in range(args.count)
+    ]
+    statuses = asyncio.run(send_updates(args.url, updates, args.secret_token))
+    print({status: statuses.count(status) for status in set(statuses)})
+
+
+if __name__ == "__main__":
+    main()